@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖记录内存占用对比: 普通 dict 记录 vs 紧凑的 Draw
+
+用法:
+    # 默认 100 万期合成历史
+    python benchmarks/draw_memory.py
+    
+    # 指定期数和彩种，输出 JSON
+    python benchmarks/draw_memory.py --count 100000 --type dlt --json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+from draw_store import Draw
+from synthetic_history import synthetic_draws
+
+
+def synthetic_records(count: int, lottery_type: str):
+    """逐条产出与存储格式一致的普通 dict 记录（最新一期在前）"""
+    return (dict(draw) for draw in synthetic_draws(lottery_type, count))
+
+
+def measure(build) -> int:
+    """build() 构造的对象常驻占用的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    gc.collect()
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="开奖记录内存占用对比")
+    parser.add_argument("--count", "-n", type=int, default=1_000_000, help="合成历史期数")
+    parser.add_argument("--type", "-t", choices=["ssq", "dlt"], default="ssq", help="彩票类型")
+    parser.add_argument("--json", "-j", action="store_true", help="输出JSON格式")
+    args = parser.parse_args()
+    
+    dict_bytes = measure(lambda: list(synthetic_records(args.count, args.type)))
+    draw_bytes = measure(lambda: [Draw.from_dict(r) for r in synthetic_records(args.count, args.type)])
+    
+    result = {
+        "lottery_type": args.type,
+        "count": args.count,
+        "dict_bytes_per_draw": round(dict_bytes / args.count, 1),
+        "draw_bytes_per_draw": round(draw_bytes / args.count, 1),
+        "reduction": round(1 - draw_bytes / dict_bytes, 3),
+    }
+    
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"📊 {args.count} 期合成历史 ({args.type})")
+        print(f"   dict 记录: {result['dict_bytes_per_draw']} 字节/期")
+        print(f"   Draw 记录: {result['draw_bytes_per_draw']} 字节/期")
+        print(f"   节省: {result['reduction']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
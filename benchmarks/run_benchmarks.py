@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试: 数据加载、各项分析、固定号码分析、号码生成和报告渲染
+
+在合成历史（1千 / 10万 / 100万期）上逐项计时，输出中位数、p95 延迟和峰值内存（JSON），
+并可与保存的基线比较，超过阈值视为性能回退（退出码 1）。全程离线运行。
+报告渲染固定取最近 REPORT_PERIODS 期（与 --periods 相同），成本不随历史总期数增长。
+
+合成数据由 scripts/synthetic_history.py 生成，按 (彩种, 期数, 种子) 缓存在
+benchmarks/.data/ 下，重复运行不必重新生成；生成规则变化时 DATA_VERSION 加一，旧缓存不再使用。
+
+用法:
+    # 默认: 双色球，1千/10万/100万期
+    python benchmarks/run_benchmarks.py
+    
+    # 只跑小规模，结果写入文件
+    python benchmarks/run_benchmarks.py --sizes 1000,100000 --output /tmp/bench.json
+    
+    # 冒烟测试: 极小规模、只跑指定项
+    python benchmarks/run_benchmarks.py --sizes 200 --repeat 1 --only load_data,report_generate
+    
+    # 保存为基线；之后的运行与基线比较（默认阈值 20%）
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --threshold 0.3
+"""
+
+import argparse
+import gc
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = Path(__file__).parent
+sys.path.insert(0, str(BENCH_DIR.parent / "scripts"))
+
+from analyze_history import LotteryAnalyzer
+from draw_store import has_draws, save_draws
+from generate_fixed_numbers import LotteryPredictor
+from generate_report import ReportGenerator
+from synthetic_history import DEFAULT_SEED, synthetic_draws
+
+DATA_CACHE = BENCH_DIR / ".data"
+DATA_VERSION = 2            # 合成数据生成规则的版本，参与缓存目录名
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2     # 中位数比基线慢 20% 以上视为回退
+REPORT_PERIODS = 1000       # 报告渲染的分析期数
+
+# 固定号码分析用的号码
+FIXED_NUMBERS = {
+    "ssq": ([3, 11, 25], [8]),
+    "dlt": ([3, 11, 25], [8]),
+}
+
+ANALYZE_METRICS = ["hot_cold", "missing", "odd_even", "big_small", "consecutive", "zones", "sum", "span"]
+
+
+def dataset(lottery_type: str, size: int, seed: int = DEFAULT_SEED, cache_dir: Path = DATA_CACHE) -> Path:
+    """合成历史的分片存储目录，不存在时生成"""
+    data_dir = cache_dir / f"{lottery_type}-{size}-{seed}-v{DATA_VERSION}"
+    if not has_draws(data_dir):
+        print(f"🔧 生成 {size} 期合成数据: {data_dir}", file=sys.stderr)
+        save_draws(data_dir, synthetic_draws(lottery_type, size, seed=seed), lottery_type)
+    return data_dir
+
+
+def build_cases(lottery_type: str, data_dir: Path, size: int) -> List[Tuple[str, Callable[[], object]]]:
+    """
+    待测的 (名称, 调用)；准备工作（加载数据、算出分析结果）在这里完成，不计入计时
+    
+    分析期数取整个历史，衡量各项计算随数据量的变化；关闭分析结果缓存，每次都实际计算。
+    报告渲染例外，只取最近 REPORT_PERIODS 期。
+    """
+    analyzer = LotteryAnalyzer(lottery_type, data_dir, cache=None)
+    analyzer.get_periods(size)
+    predictor = LotteryPredictor(lottery_type, data_dir)
+    generator = ReportGenerator(lottery_type, data_dir)
+    analysis = analyzer.full_analysis(min(size, REPORT_PERIODS))
+    fixed_red, fixed_blue = FIXED_NUMBERS[lottery_type]
+    
+    cases = [("load_data", lambda: LotteryAnalyzer(lottery_type, data_dir, cache=None)._load_data())]
+    for metric in ANALYZE_METRICS:
+        method = getattr(analyzer, f"analyze_{metric}")
+        cases.append((f"analyze_{metric}", lambda method=method: method(size)))
+    cases += [
+        ("full_analysis", lambda: analyzer.full_analysis(size)),
+        ("analyze_fixed_numbers", lambda: predictor.analyze_fixed_numbers(fixed_red, fixed_blue)),
+        ("generate_combinations", lambda: predictor.generate_combinations(fixed_red, fixed_blue, count=10,
+                                                                          mode="weighted")),
+        ("report_generate", lambda: generator.generate(analysis)),
+    ]
+    return cases
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """最近秩法百分位数"""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict:
+    """
+    先计时 repeat 次，再单独跑一次统计峰值内存
+    
+    tracemalloc 会明显拖慢执行，所以不与计时混在一起。
+    """
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "min_ms": round(min(samples), 3),
+        "peak_kib": round(peak / 1024, 1),
+        "runs": repeat,
+    }
+
+
+def run(lottery_type: str, sizes: List[int], repeat: int, only: Optional[List[str]] = None,
+        cache_dir: Path = DATA_CACHE) -> Dict:
+    """运行全部基准，返回可序列化的结果"""
+    results = {}
+    for size in sizes:
+        data_dir = dataset(lottery_type, size, cache_dir=cache_dir)
+        results[str(size)] = {}
+        for name, func in build_cases(lottery_type, data_dir, size):
+            if only and name not in only:
+                continue
+            stats = measure(func, repeat)
+            results[str(size)][name] = stats
+            print(f"  {size:>9} {name:<24} 中位数 {stats['median_ms']:>10.2f} ms  "
+                  f"p95 {stats['p95_ms']:>10.2f} ms  峰值 {stats['peak_kib']:>10.1f} KiB", file=sys.stderr)
+    
+    return {
+        "meta": {
+            "lottery_type": lottery_type,
+            "sizes": sizes,
+            "repeat": repeat,
+            "report_periods": REPORT_PERIODS,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """与基线逐项比较中位数，返回超过阈值的回退项"""
+    regressions = []
+    for size, cases in current["results"].items():
+        for name, stats in cases.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base or base["median_ms"] <= 0:
+                continue
+            ratio = stats["median_ms"] / base["median_ms"]
+            if ratio > 1 + threshold:
+                regressions.append({
+                    "size": int(size),
+                    "case": name,
+                    "baseline_ms": base["median_ms"],
+                    "current_ms": stats["median_ms"],
+                    "ratio": round(ratio, 3),
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="彩票分析性能基准测试")
+    parser.add_argument("--type", "-t", choices=["ssq", "dlt"], default="ssq", help="彩票类型")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="合成历史期数，逗号分隔 (默认: 1000,100000,1000000)")
+    parser.add_argument("--repeat", "-r", type=int, default=DEFAULT_REPEAT, help="每项计时次数")
+    parser.add_argument("--only", help="只运行指定项，逗号分隔，如: full_analysis,report_generate")
+    parser.add_argument("--output", "-o", help="结果 JSON 输出文件（默认标准输出）")
+    parser.add_argument("--data-cache", default=str(DATA_CACHE), help="合成数据缓存目录")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="基线文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="回退阈值，中位数超过基线的比例 (默认: 0.2)")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    
+    args = parser.parse_args()
+    
+    sizes = [int(s) for s in args.sizes.split(",")]
+    only = args.only.split(",") if args.only else None
+    result = run(args.type, sizes, args.repeat, only, Path(args.data_cache))
+    
+    baseline_file = Path(args.baseline)
+    exit_code = 0
+    if args.save_baseline:
+        baseline_file.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✅ 基线已保存: {baseline_file}", file=sys.stderr)
+    elif baseline_file.exists():
+        baseline = json.loads(baseline_file.read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.threshold)
+        result["regressions"] = regressions
+        for item in regressions:
+            print(f"❌ 性能回退: {item['size']} 期 {item['case']} "
+                  f"{item['baseline_ms']:.2f} ms -> {item['current_ms']:.2f} ms (x{item['ratio']})", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"✅ 与基线相比无回退 (阈值 {args.threshold:.0%})", file=sys.stderr)
+    
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 #!/usr/bin/env python3
 # 运行分析报告
-import json
+import sys
 from collections import Counter
 from pathlib import Path
 
+sys.path.insert(0, 'scripts')
+from draw_store import load_draws
+
 print("="*70)
 print("🎱 彩票分析助手 - 运行演示")
 print("="*70)
 print()
 
 # 读取双色球数据
-with open('data/ssq/history.json', 'r', encoding='utf-8') as f:
-    ssq_data = json.load(f)
+ssq_data = load_draws(Path('data/ssq'))
 
 print(f"📊 双色球数据: {len(ssq_data)} 期")
 print(f"   期号范围: {ssq_data[-1]['issue']} → {ssq_data[0]['issue']}")
@@ -63,8 +65,7 @@ print()
 print("="*70)
 
 # 大乐透数据
-with open('data/dlt/history.json', 'r', encoding='utf-8') as f:
-    dlt_data = json.load(f)
+dlt_data = load_draws(Path('data/dlt'))
 
 print(f"📊 大乐透数据: {len(dlt_data)} 期")
 print(f"   期号范围: {dlt_data[-1]['issue']} → {dlt_data[0]['issue']}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析结果缓存
+按 (彩票类型, 期数, 指标, 数据集版本) 缓存 LotteryAnalyzer 的分析结果
+
+内存层按最近最少使用 (LRU) 淘汰，同时限制条目数和字节数；可选磁盘层，
+进程重启或多个进程之间也能复用。数据集版本取自分片清单的摘要，新数据入库后
+旧结果自然失效，无需手动清理；键中还带有分析代码源文件的摘要，代码更新后
+磁盘层里的旧结果同样不再命中。共享缓存默认使用 data/cache/analysis 磁盘层，
+调度器开奖后预计算的结果由之后的分析、报告进程直接读取。
+
+结果以 pickle 字节保存，命中时反序列化出新对象，调用方修改返回值不会污染缓存。
+
+用法:
+    from analysis_cache import AnalysisCache
+    
+    cache = AnalysisCache(max_entries=128, disk_dir=Path("data/cache/analysis"))
+    analyzer = LotteryAnalyzer("ssq", cache=cache)
+    analyzer.full_analysis(100)        # 计算并缓存
+    analyzer.full_analysis(100)        # 命中
+    print(cache.stats())
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import metrics
+from draw_store import dataset_version
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_DIR = Path(__file__).parent.parent / "data" / "cache" / "analysis"
+
+CacheKey = Tuple[Hashable, ...]
+_MISSING = object()
+
+
+class AnalysisCache:
+    """LRU 内存缓存 + 可选磁盘层"""
+    
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 disk_dir: Optional[Path] = None, name: str = "analysis"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.name = name
+        self._entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _disk_path(self, key: CacheKey) -> Path:
+        return self.disk_dir / f"{hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:32]}.pkl"
+    
+    def _read_disk(self, key: CacheKey) -> Optional[bytes]:
+        """从磁盘层读取；文件损坏或键不符（摘要碰撞）视为未命中"""
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                stored_key, payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ 缓存文件损坏，忽略: {e}", file=sys.stderr)
+            return None
+        return payload if stored_key == key else None
+    
+    def _write_disk(self, key: CacheKey, payload: bytes):
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with open(tmp, 'wb') as f:
+                pickle.dump((key, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ 缓存写入磁盘失败: {e}", file=sys.stderr)
+    
+    def _store(self, key: CacheKey, payload: bytes):
+        """放入内存层并按条目数、字节数淘汰最久未用的条目（调用方持有锁）"""
+        if len(payload) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+    
+    def get(self, key: CacheKey, default=None):
+        """查询缓存，未命中返回 default"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if payload is None:
+            payload = self._read_disk(key)
+            with self._lock:
+                if payload is None:
+                    self.misses += 1
+                else:
+                    self.disk_hits += 1
+                    self._store(key, payload)
+        metrics.record_cache(self.name, payload is not None)
+        return default if payload is None else pickle.loads(payload)
+    
+    def put(self, key: CacheKey, value):
+        """写入缓存（内存层和磁盘层）"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store(key, payload)
+        if self.disk_dir is not None:
+            self._write_disk(key, payload)
+    
+    def get_or_compute(self, key: CacheKey, compute: Callable[[], object]):
+        """命中则返回缓存结果，否则计算并写入缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+    
+    def clear(self, disk: bool = False):
+        """清空内存层，disk=True 时同时删除磁盘层文件"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.disk_dir is not None and self.disk_dir.exists():
+            for path in self.disk_dir.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+    
+    def stats(self) -> Dict:
+        """命中统计和当前占用"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk_dir": str(self.disk_dir) if self.disk_dir else None,
+            }
+
+
+# 共享缓存: 未显式指定时 LotteryAnalyzer 都使用它，磁盘层在进程之间共享
+SHARED_CACHE = AnalysisCache(disk_dir=DEFAULT_DISK_DIR)
+
+
+def _source_version(func) -> str:
+    """定义 func 的源文件摘要，读不到源文件时为空"""
+    try:
+        return hashlib.sha256(Path(inspect.getsourcefile(func)).read_bytes()).hexdigest()[:12]
+    except (OSError, TypeError):
+        return ""
+
+
+def cached_analysis(metric: str):
+    """
+    LotteryAnalyzer 方法装饰器: 按 (彩票类型, 期数, metric, 数据集版本, 代码版本) 缓存结果
+    
+    参数按方法签名绑定并补全默认值，位置参数和关键字参数写法不同也得到同一个键；
+    期数以外的参数（如滚动窗口）按签名顺序追加到键末尾。实例的 cache 为 None 时直接计算。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        source = _source_version(func)
+        
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = list(bound.arguments.items())[1:]
+            periods = bound.arguments.get("periods")
+            key = (self.lottery_type, periods, metric, dataset_version(self.data_dir), source)
+            options = tuple(item for item in arguments if item[0] != "periods")
+            if options:
+                key += (options,)
+            return cache.get_or_compute(key, lambda: func(*bound.args, **bound.kwargs))
+        return wrapper
+    return decorator
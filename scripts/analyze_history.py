@@ -8,21 +8,45 @@
     python analyze_history.py --type ssq --periods 100
     python analyze_history.py --type dlt --metric hot-cold
     python analyze_history.py --type ssq --all
+    python analyze_history.py --type ssq --metric expected --distribution sum
+    python analyze_history.py --type ssq --metric sum --group-by weekday --from 2020-01-01 --to 2023-12-31
 """
 
 import argparse
+import functools
 import json
 import os
 import sys
 from collections import Counter, defaultdict
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import date, datetime
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 
+import exact_distributions
+from analysis_cache import SHARED_CACHE, AnalysisCache, cached_analysis
+from bootstrap import DEFAULT_RESAMPLES, block_bootstrap
+from date_groups import GROUP_BY, grouped_stats
+from draw_bits import (ZONE_SIZES, ac_value, draw_relations, mask_numbers, omission_rows, tail_counts,
+                       zone_masks)
+from draw_store import has_draws, load_draws
+from monte_carlo import DEFAULT_SEED, DEFAULT_SIMULATIONS, compare, exact_baseline, simulate
+from profiling import StageProfiler, profiled
+from randomness import randomness_tests
+from rolling_stats import DEFAULT_WINDOWS, rolling_series, write_ndjson, write_npy
+from transitions import transition_stats
+
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 
+# 走势图向前多读的期数: 窗口第一期的遗漏值需要从更早的开奖算起
+TREND_LOOKBACK = 200
+
+# 精确概率分布的磁盘缓存: 只取决于彩种配置，与开奖数据无关
+DISTRIBUTION_CACHE = AnalysisCache(max_entries=64, disk_dir=DATA_DIR / "cache" / "distributions",
+                                   name="distribution")
+
 # 彩票配置
 LOTTERY_CONFIG = {
     "ssq": {
@@ -31,7 +55,7 @@ LOTTERY_CONFIG = {
         "blue_range": (1, 16),
         "red_count": 6,
         "blue_count": 1,
-        "data_file": DATA_DIR / "ssq" / "history.json",
+        "data_dir": DATA_DIR / "ssq",
         "big_boundary": 17,  # 大小分界
         "zones": [(1, 11), (12, 22), (23, 33)]  # 三区
     },
@@ -41,7 +65,7 @@ LOTTERY_CONFIG = {
         "back_range": (1, 12),
         "front_count": 5,
         "back_count": 2,
-        "data_file": DATA_DIR / "dlt" / "history.json",
+        "data_dir": DATA_DIR / "dlt",
         "big_boundary": 18,  # 大小分界
         "zones": [(1, 7), (8, 14), (15, 21), (22, 28), (29, 35)]  # 五区
     }
@@ -51,31 +75,55 @@ LOTTERY_CONFIG = {
 class LotteryAnalyzer:
     """彩票数据分析器"""
     
-    def __init__(self, lottery_type: str):
+    def __init__(self, lottery_type: str, data_dir: Optional[Path] = None,
+                 profiler: Optional[StageProfiler] = None,
+                 cache: Optional[AnalysisCache] = SHARED_CACHE):
         self.lottery_type = lottery_type.lower()
         config = LOTTERY_CONFIG.get(self.lottery_type)
         if not config:
             raise ValueError(f"不支持的彩票类型: {lottery_type}")
         
         self.config: Dict = config
-        self.data: List[Dict] = self._load_data()
-    
-    def _load_data(self) -> List[Dict]:
-        """加载历史数据"""
-        if not self.config["data_file"].exists():
-            raise FileNotFoundError(f"数据文件不存在: {self.config['data_file']}")
+        self.data_dir: Path = data_dir or config["data_dir"]
+        if not has_draws(self.data_dir):
+            raise FileNotFoundError(f"数据文件不存在: {self.data_dir}")
         
-        with open(self.config["data_file"], 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # 按需加载: 只打开覆盖所需期数的年份分片
+        self.data: List[Dict] = []
+        self._loaded_all = False
         
-        # 按期号降序排序
-        data.sort(key=lambda x: x.get("issue", ""), reverse=True)
-        return data
+        # 分阶段剖析（None 时只通知全局钩子）
+        self.profiler = profiler
+        # 分析结果缓存（None 为不缓存）
+        self.cache = cache
+    
+    @profiled("load")
+    def _load_data(self, periods: Optional[int] = None) -> List[Dict]:
+        """加载最近 periods 期历史数据（None 为全部）"""
+        # 存储按期号降序，无需再排序
+        return load_draws(self.data_dir, periods=periods)
     
     def get_periods(self, n: int) -> List[Dict]:
         """获取最近N期数据"""
+        if len(self.data) < n and not self._loaded_all:
+            self.data = self._load_data(n)
+            self._loaded_all = len(self.data) < n
         return self.data[:n]
     
+    @profiled("load")
+    def get_date_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                       periods: Optional[int] = None) -> List[Dict]:
+        """获取开奖日期在 [start, end] 内的数据（YYYY-MM-DD，在开奖日期上二分查找），periods 只取其中最近 N 期"""
+        for value in (start, end):
+            if value is not None:
+                try:
+                    date.fromisoformat(value)
+                except ValueError:
+                    raise ValueError(f"日期格式应为 YYYY-MM-DD: {value}") from None
+        return load_draws(self.data_dir, periods=periods, start=start, end=end)
+    
+    @profiled("analyze.hot_cold")
+    @cached_analysis("hot_cold")
     def analyze_hot_cold(self, periods: int = 100) -> Dict:
         """热号冷号分析"""
         data = self.get_periods(periods)
@@ -122,6 +170,26 @@ class LotteryAnalyzer:
                 }
             }
     
+    @profiled("analyze.bootstrap")
+    @cached_analysis("bootstrap")
+    def analyze_bootstrap(self, periods: int = 100, resamples: int = DEFAULT_RESAMPLES,
+                          block: Optional[int] = None) -> Dict:
+        """
+        各号码出现频率的块 bootstrap 置信区间
+        
+        每个号码给出次数、频率、区间和标签: 区间整体高于/低于理论频率才标为 hot/cold。
+        """
+        history = self.get_periods(periods)[::-1]
+        if self.lottery_type == "ssq":
+            fields = ("red_balls", "blue_ball")
+            picks = (self.config["red_count"], self.config["blue_count"])
+        else:
+            fields = ("front_zone", "back_zone")
+            picks = (self.config["front_count"], self.config["back_count"])
+        return block_bootstrap(history, self.lottery_type, fields, picks, resamples=resamples, block=block)
+    
+    @profiled("analyze.missing")
+    @cached_analysis("missing")
     def analyze_missing(self, periods: int = 100) -> Dict:
         """遗漏值分析"""
         data = self.get_periods(periods)
@@ -167,6 +235,8 @@ class LotteryAnalyzer:
                 "back_zone": dict(sorted(back_missing.items(), key=lambda x: -x[1])[:5])
             }
     
+    @profiled("analyze.odd_even")
+    @cached_analysis("odd_even")
     def analyze_odd_even(self, periods: int = 100) -> Dict:
         """奇偶比分析"""
         data = self.get_periods(periods)
@@ -185,6 +255,8 @@ class LotteryAnalyzer:
         
         return dict(ratios.most_common())
     
+    @profiled("analyze.big_small")
+    @cached_analysis("big_small")
     def analyze_big_small(self, periods: int = 100) -> Dict:
         """大小比分析"""
         data = self.get_periods(periods)
@@ -204,6 +276,8 @@ class LotteryAnalyzer:
         
         return dict(ratios.most_common())
     
+    @profiled("analyze.consecutive")
+    @cached_analysis("consecutive")
     def analyze_consecutive(self, periods: int = 100) -> Dict:
         """连号分析"""
         data = self.get_periods(periods)
@@ -241,6 +315,8 @@ class LotteryAnalyzer:
             "top_patterns": consecutive_patterns.most_common(5)
         }
     
+    @profiled("analyze.zones")
+    @cached_analysis("zones")
     def analyze_zones(self, periods: int = 100) -> Dict:
         """区间分布分析"""
         data = self.get_periods(periods)
@@ -265,6 +341,8 @@ class LotteryAnalyzer:
             for i in range(len(zones))
         }
     
+    @profiled("analyze.sum")
+    @cached_analysis("sum")
     def analyze_sum(self, periods: int = 100) -> Dict:
         """和值分析"""
         data = self.get_periods(periods)
@@ -287,6 +365,8 @@ class LotteryAnalyzer:
             }
         return {}
     
+    @profiled("analyze.span")
+    @cached_analysis("span")
     def analyze_span(self, periods: int = 100) -> Dict:
         """跨度分析"""
         data = self.get_periods(periods)
@@ -309,14 +389,277 @@ class LotteryAnalyzer:
             }
         return {}
     
-    def full_analysis(self, periods: int = 100) -> Dict:
-        """全面分析"""
+    @profiled("analyze.repeats")
+    @cached_analysis("repeats")
+    def analyze_repeats(self, periods: int = 100) -> Dict:
+        """
+        重号、邻号、斜连号分析（前区）
+        
+        每期与前两期的位掩码做与、移位运算一次得到，向前多读 2 期作为第一期的参照。
+        """
+        history = self.get_periods(periods + 2)[::-1]
+        front_masks = zone_masks(history, self.lottery_type)[0]
+        relations = list(draw_relations(front_masks))
+        
+        result = {"periods": len(relations)}
+        for index, name in enumerate(("repeat", "neighbor", "diagonal")):
+            counts = [masks[index].bit_count() for masks in relations]
+            result[name] = {
+                "distribution": dict(sorted(Counter(counts).items())),
+                "average": round(sum(counts) / len(counts), 3) if counts else 0,
+                "rate": round(sum(1 for c in counts if c) / len(counts) * 100, 2) if counts else 0
+            }
+        if relations:
+            result["latest"] = {
+                "issue": history[-1]["issue"],
+                "repeat": mask_numbers(relations[-1][0]),
+                "neighbor": mask_numbers(relations[-1][1]),
+                "diagonal": mask_numbers(relations[-1][2])
+            }
+        return result
+    
+    @profiled("analyze.ac")
+    @cached_analysis("ac")
+    def analyze_ac(self, periods: int = 100) -> Dict:
+        """AC 值（号码两两之差去重后的个数减去号码个数 - 1）分布（前区）"""
+        data = self.get_periods(periods)
+        values = [ac_value(mask) for mask in zone_masks(data, self.lottery_type)[0]]
+        if not values:
+            return {}
+        return {
+            "distribution": dict(sorted(Counter(values).items())),
+            "min": min(values),
+            "max": max(values),
+            "average": round(sum(values) / len(values), 2),
+            "latest": values[0]
+        }
+    
+    @profiled("analyze.tails")
+    @cached_analysis("tails")
+    def analyze_tails(self, periods: int = 100) -> Dict:
+        """尾数分析（前区）: 各尾数号码的出现次数、每期不同尾数的个数、同尾号出现的期数"""
         data = self.get_periods(periods)
+        digit_counts = [0] * 10
+        distinct = Counter()
+        same_tail = 0
+        for mask in zone_masks(data, self.lottery_type)[0]:
+            tails = tail_counts(mask)
+            for digit, count in enumerate(tails):
+                digit_counts[digit] += count
+            distinct[sum(1 for count in tails if count)] += 1
+            same_tail += any(count > 1 for count in tails)
+        return {
+            "digits": {digit: count for digit, count in enumerate(digit_counts)},
+            "distinct": dict(sorted(distinct.items())),
+            "same_tail_rate": round(same_tail / len(data) * 100, 2) if data else 0
+        }
+    
+    @profiled("analyze.transitions")
+    @cached_analysis("transitions")
+    def analyze_transitions(self, periods: int = 100) -> Dict:
+        """
+        相邻两期的号码转移统计（前区）: K×K 转移矩阵、每个号码的重复概率、按间隔期数的开出概率
+        """
+        history = self.get_periods(periods)[::-1]
+        pick = self.config["red_count"] if self.lottery_type == "ssq" else self.config["front_count"]
+        front_masks = zone_masks(history, self.lottery_type)[0]
+        return transition_stats(front_masks, ZONE_SIZES[self.lottery_type][0], pick)
+    
+    @profiled("analyze.grouped")
+    @cached_analysis("grouped")
+    def analyze_grouped(self, periods: Optional[int] = 100, group_by: str = "weekday", metric: str = "hot_cold",
+                        start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+        """
+        按开奖日期分组统计: group_by 为 weekday / month / year，metric 为 hot_cold / odd_even / big_small / sum
         
+        给出 start/end 时只统计开奖日期在 [start, end] 内的记录，periods 为 None 时取区间内全部；
+        否则统计最近 periods 期（None 为全部历史）。
+        """
+        if start is not None or end is not None:
+            data = self.get_date_range(start, end, periods)
+        elif periods is None:
+            data = self._load_data()
+        else:
+            data = self.get_periods(periods)
         if not data:
             raise ValueError("没有可用的历史数据")
         
+        if self.lottery_type == "ssq":
+            fields = ("red_balls", "blue_ball")
+            picks = (self.config["red_count"], self.config["blue_count"])
+        else:
+            fields = ("front_zone", "back_zone")
+            picks = (self.config["front_count"], self.config["back_count"])
+        result = grouped_stats(data, self.lottery_type, group_by, metric, fields, picks, self.config["big_boundary"])
+        result["start_date"] = data[-1]["draw_date"]
+        result["end_date"] = data[0]["draw_date"]
+        return result
+    
+    @profiled("analyze.trend")
+    @cached_analysis("trend")
+    def analyze_trend(self, periods: int = 100) -> Dict:
+        """
+        遗漏走势图: 最近 periods 期每一期所有号码的遗漏值（当期开出为 0）
+        
+        行按时间正序（最早一期在前）。向前多读 TREND_LOOKBACK 期作为起点，
+        在此之前仍未开出的号码遗漏值为下限。
+        """
+        data = self.get_periods(periods + TREND_LOOKBACK)
+        shown = min(periods, len(data))
+        history = data[::-1]
+        fields = ("red_balls", "blue_ball") if self.lottery_type == "ssq" else ("front_zone", "back_zone")
+        
+        result = {"periods": shown, "issues": [record["issue"] for record in history[len(history) - shown:]]}
+        for field, masks, size in zip(fields, zone_masks(history, self.lottery_type), ZONE_SIZES[self.lottery_type]):
+            rows = list(omission_rows(masks, size))
+            result[field] = {"numbers": size, "rows": rows[len(rows) - shown:]}
+        return result
+    
+    @profiled("analyze.rolling")
+    @cached_analysis("rolling")
+    def analyze_rolling(self, periods: int = 100, windows: Tuple[int, ...] = DEFAULT_WINDOWS) -> Dict:
+        """
+        滚动窗口时间序列: 最近 periods 期每一期的窗口内各号码出现次数、和值/跨度滚动均值和标准差
+        
+        向前多读 max(windows) - 1 期，让每一期的窗口都是满的。
+        """
+        windows = tuple(sorted(set(windows)))
+        history = self.get_periods(periods + windows[-1] - 1)[::-1]
+        fields = ("red_balls", "blue_ball") if self.lottery_type == "ssq" else ("front_zone", "back_zone")
+        result = rolling_series(history, self.lottery_type, windows, periods)
+        result["zones"] = {"front": fields[0], "back": fields[1]}
+        return result
+    
+    def export_rolling(self, path: str, periods: int = 100, windows: Tuple[int, ...] = DEFAULT_WINDOWS) -> int:
+        """
+        把滚动窗口统计边算边写到文件: .npy 为 float64 数组，其他为 NDJSON
+        
+        Returns: 写出的行数
+        """
+        windows = tuple(sorted(set(windows)))
+        history = self.get_periods(periods + windows[-1] - 1)[::-1]
+        if str(path).endswith(".npy"):
+            with open(path, 'wb') as f:
+                shape = write_npy(f, history, self.lottery_type, windows, periods)
+            return shape[0] * shape[1]
+        with open(path, 'w', encoding='utf-8') as f:
+            return write_ndjson(f, history, self.lottery_type, windows, periods)
+    
+    @profiled("analyze.randomness")
+    @cached_analysis("randomness")
+    def analyze_randomness(self, periods: int = 100) -> Dict:
+        """随机性检验: 均匀性、游程、序列相关、间隔分布"""
+        history = self.get_periods(periods)[::-1]
+        if self.lottery_type == "ssq":
+            fields = ("red_balls", "blue_ball")
+            picks = (self.config["red_count"], self.config["blue_count"])
+        else:
+            fields = ("front_zone", "back_zone")
+            picks = (self.config["front_count"], self.config["back_count"])
+        return randomness_tests(history, self.lottery_type, fields, picks, self.config["big_boundary"])
+    
+    def expected_distribution(self, metric: str, pick: Optional[int] = None) -> Dict:
+        """
+        完全随机开奖下前区号码形态的精确概率分布
+        
+        Args:
+            metric: odd_even / big_small / zones / sum / span / consecutive
+            pick: 选出的号码个数，默认为每期开出的个数（双色球 6、大乐透 5）
+        
+        Returns: {取值: 概率}，比例类取值与 analyze_odd_even 等的键格式相同
+        """
+        if self.lottery_type == "ssq":
+            size, count = self.config["red_range"][1], self.config["red_count"]
+        else:
+            size, count = self.config["front_range"][1], self.config["front_count"]
+        pick = count if pick is None else pick
+        boundary = self.config["big_boundary"]
+        zones = tuple(self.config["zones"])
+        key = ("distribution", metric, size, pick, boundary, zones)
+        return DISTRIBUTION_CACHE.get_or_compute(
+            key, lambda: exact_distributions.expected_distribution(metric, size, pick, boundary, zones))
+    
+    @profiled("analyze.baseline")
+    def simulate_baseline(self, periods: int = 100, simulations: int = DEFAULT_SIMULATIONS,
+                          seed: int = DEFAULT_SEED, workers: Optional[int] = None) -> Dict:
+        """
+        蒙特卡洛随机基线: 完全随机开奖下各指标的期望分布和 periods 期窗口的置信区间
+        
+        只取决于彩种配置、窗口、模拟期数和种子，与开奖数据无关，缓存键不含数据集版本。
+        """
+        if self.lottery_type == "ssq":
+            size, pick = self.config["red_range"][1], self.config["red_count"]
+        else:
+            size, pick = self.config["front_range"][1], self.config["front_count"]
+        spec = (size, pick, self.config["big_boundary"])
+        compute = lambda: simulate(spec, periods, simulations, seed, workers, label=self.lottery_type)
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute((self.lottery_type, periods, "baseline", simulations, seed), compute)
+    
+    def exact_baseline(self, periods: int = 100) -> Dict:
+        """不模拟的随机基线（精确分布 + 区间近似），与 simulate_baseline 结构相同"""
+        if self.lottery_type == "ssq":
+            size, pick = self.config["red_range"][1], self.config["red_count"]
+        else:
+            size, pick = self.config["front_range"][1], self.config["front_count"]
+        spec = (size, pick, self.config["big_boundary"])
+        return DISTRIBUTION_CACHE.get_or_compute(("baseline", spec, periods),
+                                                 lambda: exact_baseline(spec, periods))
+    
+    @profiled("analyze.baseline_compare")
+    def analyze_baseline(self, periods: int = 100, simulations: int = DEFAULT_SIMULATIONS,
+                         seed: int = DEFAULT_SEED, workers: Optional[int] = None,
+                         exact: bool = False) -> Dict:
+        """
+        实际的奇偶比、大小比、连号、和值、跨度与随机基线对照
+        
+        exact 为 True 时不做蒙特卡洛模拟，改用 exact_baseline（simulations 为 0）。
+        """
+        window = len(self.get_periods(periods))
+        if not window:
+            raise ValueError("没有可用的历史数据")
+        if exact:
+            baseline = self.exact_baseline(window)
+        else:
+            baseline = self.simulate_baseline(window, simulations, seed, workers)
+        observed = {
+            "odd_even": self.analyze_odd_even(window),
+            "big_small": self.analyze_big_small(window),
+            "consecutive": self.analyze_consecutive(window)["consecutive_periods"],
+            "sum": self.analyze_sum(window).get("average"),
+            "span": self.analyze_span(window).get("average"),
+        }
         return {
+            "periods": window,
+            "simulations": baseline["simulations"],
+            "seed": baseline["seed"],
+            "confidence": baseline["confidence"],
+            "distributions": baseline["distributions"],
+            "comparison": compare(observed, baseline),
+        }
+    
+    @profiled("full_analysis")
+    def full_analysis(self, periods: int = 100, intervals: bool = False) -> Dict:
+        """
+        全面分析（结果可能来自缓存，analysis_time 总是本次调用的时间）
+        
+        intervals=True 时附带热冷号的 bootstrap 置信区间（hot_cold_intervals）。
+        重抽样占全面分析的大部分耗时，默认不算；需要完整重抽样时用 --metric bootstrap。
+        """
+        result = self._full_analysis(periods, intervals)
+        result["analysis_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return result
+    
+    @cached_analysis("full")
+    def _full_analysis(self, periods: int = 100, intervals: bool = False) -> Dict:
+        """全面分析的各项结果，analysis_time 由 full_analysis 填入"""
+        data = self.get_periods(periods)
+        
+        if not data:
+            raise ValueError("没有可用的历史数据")
+        
+        result = {
             "lottery_type": self.lottery_type,
             "lottery_name": self.config["name"],
             "periods_analyzed": len(data),
@@ -326,7 +669,7 @@ class LotteryAnalyzer:
                 "start_date": data[-1]["draw_date"],
                 "end_date": data[0]["draw_date"]
             },
-            "analysis_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "analysis_time": None,
             "hot_cold": self.analyze_hot_cold(periods),
             "missing": self.analyze_missing(periods),
             "odd_even": self.analyze_odd_even(periods),
@@ -336,6 +679,9 @@ class LotteryAnalyzer:
             "sum": self.analyze_sum(periods),
             "span": self.analyze_span(periods)
         }
+        if intervals:
+            result["hot_cold_intervals"] = self.analyze_bootstrap(periods)
+        return result
     
     def generate_report(self, analysis_result: Dict) -> str:
         """生成文本报告"""
@@ -444,45 +790,116 @@ class LotteryAnalyzer:
 def main():
     parser = argparse.ArgumentParser(description="彩票历史数据分析工具")
     parser.add_argument("--type", "-t", choices=["ssq", "dlt"], required=True, help="彩票类型")
-    parser.add_argument("--periods", "-p", type=int, default=100, help="分析期数")
-    parser.add_argument("--metric", "-m", choices=["hot-cold", "missing", "odd-even", "big-small", "consecutive", "zone", "sum", "span", "all"], default="all", help="分析指标")
+    parser.add_argument("--periods", "-p", type=int, help="分析期数 (默认: 100；--from/--to 时默认为区间内全部)")
+    parser.add_argument("--metric", "-m", choices=["hot-cold", "missing", "odd-even", "big-small", "consecutive", "zone", "sum", "span", "trend", "rolling", "randomness", "baseline", "expected", "bootstrap", "repeat", "ac", "tail", "transitions", "all"], default="all", help="分析指标")
     parser.add_argument("--output", "-o", help="输出文件路径")
     parser.add_argument("--json", "-j", action="store_true", help="输出JSON格式")
+    parser.add_argument("--profile", action="store_true",
+                        help="记录各阶段耗时和内存分配（JSON 输出中的 timings，文本输出时打印到标准错误）")
+    parser.add_argument("--profile-dump", metavar="PREFIX",
+                        help="导出 cProfile 统计和 tracemalloc 快照到 PREFIX.prof / PREFIX.tracemalloc")
+    parser.add_argument("--windows", default=",".join(map(str, DEFAULT_WINDOWS)),
+                        help="滚动窗口期数，逗号分隔 (默认: 10,30,100)，用于 --metric rolling")
+    parser.add_argument("--export", help="--metric rolling 时把逐期统计写到文件（.npy 或 NDJSON）")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_SIMULATIONS,
+                        help=f"--metric baseline 的模拟期数 (默认: {DEFAULT_SIMULATIONS})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="--metric baseline 的随机种子")
+    parser.add_argument("--workers", type=int, help="--metric baseline 的进程数 (默认: CPU 核数)")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES,
+                        help=f"--metric bootstrap 的重抽样次数 (默认: {DEFAULT_RESAMPLES})")
+    parser.add_argument("--block", type=int, help="--metric bootstrap 的块长（期数），默认为期数的立方根")
+    parser.add_argument("--intervals", action="store_true",
+                        help="--metric all 时附带热冷号的 bootstrap 置信区间（较慢）")
+    parser.add_argument("--distribution", choices=exact_distributions.METRICS, default="odd_even",
+                        help="--metric expected 输出的精确分布 (默认: odd_even)")
+    parser.add_argument("--group-by", choices=GROUP_BY,
+                        help="按开奖日期分组统计 --metric 指定的 hot-cold / odd-even / big-small / sum（默认 hot-cold）")
+    parser.add_argument("--from", dest="start", metavar="YYYY-MM-DD", help="--group-by 只统计此日期及以后的开奖")
+    parser.add_argument("--to", dest="end", metavar="YYYY-MM-DD", help="--group-by 只统计此日期及以前的开奖")
+    parser.add_argument("--cache-dir", help="分析结果磁盘缓存目录，相同查询直接读取缓存")
+    parser.add_argument("--no-cache", action="store_true", help="不使用分析结果缓存")
+    parser.add_argument("--cache-stats", action="store_true", help="在标准错误输出缓存命中统计")
     
     args = parser.parse_args()
+    grouped_metrics = {"all": "hot_cold", "hot-cold": "hot_cold", "odd-even": "odd_even",
+                       "big-small": "big_small", "sum": "sum"}
+    if args.group_by and args.metric not in grouped_metrics:
+        parser.error("--group-by 只支持 --metric hot-cold / odd-even / big-small / sum")
+    if (args.start or args.end) and not args.group_by:
+        parser.error("--from/--to 需要与 --group-by 一起使用")
+    dated = args.start is not None or args.end is not None
+    periods = args.periods if args.periods is not None or dated else 100
     
     try:
-        analyzer = LotteryAnalyzer(args.type)
+        cache = None if args.no_cache else SHARED_CACHE
+        if cache and args.cache_dir:
+            cache.disk_dir = Path(args.cache_dir)
         
-        if args.metric == "all":
-            result = analyzer.full_analysis(args.periods)
-            if args.json:
-                output = json.dumps(result, ensure_ascii=False, indent=2)
+        profiler = StageProfiler(cprofile=bool(args.profile_dump)) if args.profile or args.profile_dump else None
+        with profiler or nullcontext():
+            analyzer = LotteryAnalyzer(args.type, profiler=profiler, cache=cache)
+            windows = tuple(int(w) for w in args.windows.split(","))
+            
+            if args.group_by:
+                result = analyzer.analyze_grouped(periods, group_by=args.group_by,
+                                                  metric=grouped_metrics[args.metric], start=args.start, end=args.end)
+            elif args.metric == "rolling" and args.export:
+                rows = analyzer.export_rolling(args.export, periods, windows)
+                print(f"✅ 滚动窗口统计已导出: {args.export} ({rows} 行)")
+                return
+            elif args.metric == "all":
+                result = analyzer.full_analysis(periods, intervals=args.intervals)
             else:
-                output = analyzer.generate_report(result)
-        else:
-            # 单项分析
-            metric_map = {
-                "hot-cold": analyzer.analyze_hot_cold,
-                "missing": analyzer.analyze_missing,
-                "odd-even": analyzer.analyze_odd_even,
-                "big-small": analyzer.analyze_big_small,
-                "consecutive": analyzer.analyze_consecutive,
-                "zone": analyzer.analyze_zones,
-                "sum": analyzer.analyze_sum,
-                "span": analyzer.analyze_span
-            }
+                # 单项分析
+                metric_map = {
+                    "hot-cold": analyzer.analyze_hot_cold,
+                    "missing": analyzer.analyze_missing,
+                    "odd-even": analyzer.analyze_odd_even,
+                    "big-small": analyzer.analyze_big_small,
+                    "consecutive": analyzer.analyze_consecutive,
+                    "zone": analyzer.analyze_zones,
+                    "sum": analyzer.analyze_sum,
+                    "span": analyzer.analyze_span,
+                    "trend": analyzer.analyze_trend,
+                    "rolling": functools.partial(analyzer.analyze_rolling, windows=windows),
+                    "randomness": analyzer.analyze_randomness,
+                    "baseline": functools.partial(analyzer.analyze_baseline, simulations=args.simulations,
+                                                  seed=args.seed, workers=args.workers),
+                    "expected": lambda _: analyzer.expected_distribution(args.distribution),
+                    "bootstrap": functools.partial(analyzer.analyze_bootstrap, resamples=args.resamples,
+                                                   block=args.block),
+                    "repeat": analyzer.analyze_repeats,
+                    "ac": analyzer.analyze_ac,
+                    "tail": analyzer.analyze_tails,
+                    "transitions": analyzer.analyze_transitions
+                }
+                
+                result = metric_map[args.metric](periods)
             
-            result = metric_map[args.metric](args.periods)
+            if profiler and args.profile_dump:
+                for path in profiler.dump(args.profile_dump):
+                    print(f"📝 剖析数据已导出: {path}", file=sys.stderr)
+        
+        if profiler and args.json:
+            result["timings"] = profiler.report()
+        
+        if args.metric == "all" and not args.group_by and not args.json:
+            output = analyzer.generate_report(result)
+        else:
             output = json.dumps(result, ensure_ascii=False, indent=2) if args.json else str(result)
         
+        if profiler and not args.json:
+            print(profiler.format_table(), file=sys.stderr)
+        if cache and args.cache_stats:
+            print(f"🗃️ 缓存统计: {json.dumps(cache.stats(), ensure_ascii=False)}", file=sys.stderr)
+        
         if args.output:
             with open(args.output, 'w', encoding='utf-8') as f:
                 f.write(output)
             print(f"✅ 分析结果已保存到: {args.output}")
         else:
             print(output)
-            
+    
     except Exception as e:
         print(f"❌ 错误: {e}", file=sys.stderr)
         sys.exit(1)
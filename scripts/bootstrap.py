@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码出现频率的 bootstrap 置信区间
+对开奖序列做循环块重抽样（circular block bootstrap），估计每个号码出现频率的波动范围，
+让"热号/冷号"的标签区分真实偏离和随机噪声
+
+每个号码的出现次数打包在一个大整数的固定宽度字段里（号码 n 占第 n-1 个字段），
+一个块内各号码的次数就是两个前缀和之差，一次重抽样的全部号码次数是若干个块的
+整数加法，不逐个号码累加。重抽样按批分给进程池，每批使用独立派生的随机流，
+结果与进程数无关；总抽块次数有上限，期数很多时自动减少重抽样次数。
+
+用法:
+    python analyze_history.py --type ssq --metric bootstrap --periods 200 --resamples 2000
+"""
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from draw_bits import ZONE_SIZES, spread_mask, zone_masks
+
+DEFAULT_RESAMPLES = 1000
+MIN_RESAMPLES = 200
+MAX_BLOCK_DRAWS = 2_000_000     # 每次计算的总抽块次数上限（重抽样次数 × 每次的块数）
+CHUNK_RESAMPLES = 250           # 每批重抽样次数（派生随机流的单位）
+PARALLEL_BLOCK_DRAWS = 500_000  # 总抽块次数超过此值才启用进程池
+DEFAULT_SEED = 20240101
+CONFIDENCE = 0.95
+
+
+def default_block(periods: int) -> int:
+    """默认块长: 期数的立方根"""
+    return max(1, round(periods ** (1 / 3)))
+
+
+def _packed_prefix(masks: Sequence[int], offset: int, width: int, prefix: List[int]):
+    """把一个区的位掩码按号码累加进打包前缀和（就地修改，prefix[i] 为前 i 期之和）"""
+    total = 0
+    for i, mask in enumerate(masks):
+        total += spread_mask(mask, width, offset)
+        prefix[i + 1] += total
+
+
+def _block_sums(prefix: List[int], length: int) -> List[int]:
+    """循环序列上从每个位置开始、长度为 length 的块的打包次数"""
+    n = len(prefix) - 1
+    full = prefix[n]
+    return [prefix[s + length] - prefix[s] if s + length <= n
+            else full - prefix[s] + prefix[s + length - n] for s in range(n)]
+
+
+def _resample_chunk(blocks: List[int], tail: List[int], full_blocks: int, count: int, stream: str) -> List[int]:
+    """count 次重抽样，每次 full_blocks 个整块加一个截短的尾块，返回打包的各号码次数"""
+    rng = random.Random(stream)
+    n = len(blocks)
+    randrange = rng.randrange
+    totals = []
+    for _ in range(count):
+        total = tail[randrange(n)] if tail else 0
+        for _ in range(full_blocks):
+            total += blocks[randrange(n)]
+        totals.append(total)
+    return totals
+
+
+def block_bootstrap(history: Sequence, lottery_type: str, fields: Sequence[str], picks: Sequence[int],
+                    resamples: int = DEFAULT_RESAMPLES, block: Optional[int] = None,
+                    seed: int = DEFAULT_SEED, workers: Optional[int] = None) -> Dict:
+    """
+    history 中每个号码出现频率的 bootstrap 置信区间
+    
+    Args:
+        fields: 前区、后区字段名（结果按字段名分组）
+        picks: 前区、后区每期开出的号码个数（理论频率 = pick / 号码个数）
+        block: 块长，默认 default_block(期数)
+    
+    标签: 区间下限高于理论频率为 hot，上限低于理论频率为 cold，否则 normal（在随机波动之内）。
+    """
+    n = len(history)
+    if n < 2:
+        raise ValueError("bootstrap 至少需要 2 期历史数据")
+    block = min(block or default_block(n), n)
+    full_blocks, remainder = divmod(n, block)
+    draws_per_resample = full_blocks + (1 if remainder else 0)
+    resamples = max(MIN_RESAMPLES, min(resamples, MAX_BLOCK_DRAWS // draws_per_resample))
+    
+    # 字段宽度能容纳最大次数 n
+    width = n.bit_length() + 1
+    sizes = ZONE_SIZES[lottery_type]
+    prefix = [0] * (n + 1)
+    for masks, offset in zip(zone_masks(history, lottery_type), (0, sizes[0])):
+        _packed_prefix(masks, offset, width, prefix)
+    blocks = _block_sums(prefix, block)
+    tail = _block_sums(prefix, remainder) if remainder else []
+    
+    chunks = [(blocks, tail, full_blocks, min(CHUNK_RESAMPLES, resamples - start),
+               f"{seed}:{lottery_type}:{n}:{block}:{i}")
+              for i, start in enumerate(range(0, resamples, CHUNK_RESAMPLES))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    if workers == 1 or resamples * draws_per_resample < PARALLEL_BLOCK_DRAWS:
+        totals = [total for chunk in chunks for total in _resample_chunk(*chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            totals = [total for result in pool.map(_resample_chunk, *zip(*chunks)) for total in result]
+    
+    field_mask = (1 << width) - 1
+    tail_rank = (1 - CONFIDENCE) / 2
+    low_index = int(math.floor(tail_rank * (resamples - 1)))
+    high_index = int(math.ceil((1 - tail_rank) * (resamples - 1)))
+    observed = prefix[n]
+    
+    result = {"periods": n, "block": block, "resamples": resamples, "confidence": CONFIDENCE}
+    for field, size, pick, offset in zip(fields, sizes, picks, (0, sizes[0])):
+        expected = pick / size
+        numbers = []
+        for number in range(1, size + 1):
+            shift = width * (offset + number - 1)
+            samples = sorted((total >> shift) & field_mask for total in totals)
+            count = (observed >> shift) & field_mask
+            low, high = samples[low_index] / n, samples[high_index] / n
+            numbers.append({
+                "number": number,
+                "count": count,
+                "frequency": round(count / n, 4),
+                "low": round(low, 4),
+                "high": round(high, 4),
+                "label": "hot" if low > expected else "cold" if high < expected else "normal",
+            })
+        result[field] = {"expected": round(expected, 4), "numbers": numbers}
+    return result
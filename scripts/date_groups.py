@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按开奖日期分组的统计（星期、月份、年份）
+- hot_cold: 各组内号码出现次数的热号、冷号
+- odd_even / big_small: 各组内奇偶比、大小比的期数
+- sum: 各组内前区和值的最小、最大、均值、中位数
+
+每期先算出分组编号（日期序数 date.toordinal 直接换算，星期为 (序数 - 1) % 7），
+再一次遍历把每期的统计量散列累加到所在组的累加器上: 号码次数用打包计数
+（一次整数加法累加所有号码），比例和和值用按取值下标的直方图。
+没有开奖日期的记录不计入任何分组，单独计数。
+
+用法:
+    python analyze_history.py --type ssq --group-by weekday --metric hot-cold
+    python analyze_history.py --type dlt --group-by year --metric sum --from 2020-01-01 --to 2023-12-31
+"""
+
+from datetime import date
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from draw_bits import ZONE_SIZES, mask_of, mask_sum, spread_mask, unpack_counts, zone_masks
+from draw_store import Draw
+
+GROUP_BY = ("weekday", "month", "year")
+METRICS = ("hot_cold", "odd_even", "big_small", "sum")
+WEEKDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+# 热号、冷号各列出的个数（前区、后区），与 analyze_hot_cold 一致
+HOT_COLD_TOP = (10, 5)
+
+
+def draw_ordinals(records: Sequence[Mapping]) -> List[int]:
+    """各期开奖日期的序数（date.toordinal），缺失日期为 0"""
+    ordinals = []
+    for record in records:
+        if isinstance(record, Draw):
+            ordinals.append(record.ordinal)
+        else:
+            draw_date = record.get("draw_date")
+            ordinals.append(date.fromisoformat(draw_date).toordinal() if draw_date else 0)
+    return ordinals
+
+
+def group_ids(ordinals: Sequence[int], group_by: str) -> Tuple[List[int], List[str]]:
+    """
+    每期的分组编号（缺失日期为 -1）和各组标签
+    
+    星期、月份的组是固定的 7 组、12 组；年份按出现的年份升序编号。
+    """
+    if group_by == "weekday":
+        # 序数 1（0001-01-01）是星期一
+        return [(o - 1) % 7 if o else -1 for o in ordinals], list(WEEKDAY_NAMES)
+    if group_by == "month":
+        return [date.fromordinal(o).month - 1 if o else -1 for o in ordinals], [f"{m}月" for m in range(1, 13)]
+    if group_by == "year":
+        years = [date.fromordinal(o).year if o else 0 for o in ordinals]
+        labels = sorted({year for year in years if year})
+        index = {year: i for i, year in enumerate(labels)}
+        return [index[year] if year else -1 for year in years], [str(year) for year in labels]
+    raise ValueError(f"不支持的分组方式: {group_by}（可选: {', '.join(GROUP_BY)}）")
+
+
+def _ranked(counts: Sequence[int], top: int) -> Dict[str, List[Tuple[int, int]]]:
+    """号码次数列表（号码 n 在下标 n-1）的热号、冷号，次数相同按号码升序"""
+    ranked = sorted(enumerate(counts, 1), key=lambda item: (-item[1], item[0]))
+    return {"hot": ranked[:top], "cold": sorted(ranked, key=lambda item: (item[1], item[0]))[:top]}
+
+
+def _median(histogram: Sequence[int], count: int) -> int:
+    """直方图（取值 -> 期数）的中位数，与 sorted(values)[count // 2] 相同"""
+    seen = 0
+    for value, c in enumerate(histogram):
+        seen += c
+        if seen > count // 2:
+            return value
+    return 0
+
+
+def grouped_stats(records: Sequence[Mapping], lottery_type: str, group_by: str, metric: str,
+                  fields: Tuple[str, str], picks: Tuple[int, int], big_boundary: int) -> Dict:
+    """
+    按开奖日期分组统计 records 的 metric
+    
+    Args:
+        fields: 前区、后区字段名（hot_cold 结果按字段名分组）
+        picks: 前区、后区每期开出的号码个数
+        big_boundary: 大号下限（大小比的分界）
+    
+    Returns: groups 按组的顺序列出有开奖的组，每组含期数和统计结果
+    """
+    if metric not in METRICS:
+        raise ValueError(f"不支持的分组统计指标: {metric}（可选: {', '.join(METRICS)}）")
+    ids, labels = group_ids(draw_ordinals(records), group_by)
+    front, back = zone_masks(records, lottery_type)
+    sizes = ZONE_SIZES[lottery_type]
+    periods = [0] * len(labels)
+    for g in ids:
+        if g >= 0:
+            periods[g] += 1
+    
+    if metric == "hot_cold":
+        # 每组一个打包计数: 前区号码占前 sizes[0] 个字段，后区紧随其后
+        width = max(len(records), 1).bit_length() + 1
+        totals = [0] * len(labels)
+        for g, f, b in zip(ids, front, back):
+            if g >= 0:
+                totals[g] += spread_mask(f, width) + spread_mask(b, width, sizes[0])
+        stats = [{field: _ranked(unpack_counts(total, width, size, offset), top)
+                  for field, size, offset, top in zip(fields, sizes, (0, sizes[0]), HOT_COLD_TOP)}
+                 for total in totals]
+    elif metric in ("odd_even", "big_small"):
+        pick = picks[0]
+        if metric == "odd_even":
+            selector = mask_of(range(1, sizes[0] + 1, 2))
+        else:
+            selector = mask_of(range(big_boundary, sizes[0] + 1))
+        # histograms[g][k]: 组 g 内恰有 k 个奇数（大号）的期数
+        histograms = [[0] * (pick + 1) for _ in labels]
+        for g, f in zip(ids, front):
+            if g >= 0:
+                histograms[g][(f & selector).bit_count()] += 1
+        stats = []
+        for histogram in histograms:
+            ratios = sorted(((f"{k}:{pick - k}", c) for k, c in enumerate(histogram) if c),
+                            key=lambda item: -item[1])
+            stats.append(dict(ratios))
+    else:
+        max_sum = sum(range(sizes[0] - picks[0] + 1, sizes[0] + 1))
+        histograms = [[0] * (max_sum + 1) for _ in labels]
+        for g, f in zip(ids, front):
+            if g >= 0:
+                histograms[g][mask_sum(f)] += 1
+        stats = []
+        for histogram, count in zip(histograms, periods):
+            if not count:
+                stats.append({})
+                continue
+            values = [s for s, c in enumerate(histogram) if c]
+            stats.append({
+                "min": values[0],
+                "max": values[-1],
+                "average": round(sum(s * c for s, c in enumerate(histogram)) / count, 2),
+                "median": _median(histogram, count),
+            })
+    
+    return {
+        "group_by": group_by,
+        "metric": metric,
+        "periods": len(records),
+        "undated": ids.count(-1),
+        "groups": [{"group": label, "periods": count, "stats": stat}
+                   for label, count, stat in zip(labels, periods, stats) if count],
+    }
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖号码位掩码
+把每期的前区/后区号码编码为整数位掩码（号码 n 对应第 n 位），供逐期统计使用
+
+位掩码上的集合运算（与、或、移位、popcount）代替逐个号码的列表比较；
+Draw 记录直接从打包的号码字节构造掩码，不经过字典字段。
+"""
+
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from draw_store import BALL_FIELDS, Draw
+
+# 各彩种前区、后区号码个数（号码从 1 开始）
+ZONE_SIZES: Dict[str, Tuple[int, int]] = {
+    "ssq": (33, 16),
+    "dlt": (35, 12),
+}
+
+BIT = [1 << n for n in range(64)]
+
+# 尾数查找表: TAIL_MASKS[d] 为个位数为 d 的号码掩码（覆盖两个彩种的号码范围）
+TAIL_MASKS = [sum(BIT[n] for n in range(1, 64) if n % 10 == d) for d in range(10)]
+
+
+def _zone_numbers(record: Mapping, field: str) -> Iterable[int]:
+    value = record.get(field)
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, int) else value
+
+
+def zone_masks(records: Iterable[Mapping], lottery_type: str) -> Tuple[List[int], List[int]]:
+    """各期前区、后区号码的位掩码，顺序与 records 相同"""
+    (front_field, f0, f1, _), (back_field, b0, b1, _) = BALL_FIELDS[lottery_type]
+    front, back = [], []
+    for record in records:
+        if isinstance(record, Draw):
+            balls = record.balls
+            a, b = balls[f0:f1], balls[b0:b1]
+        else:
+            a, b = _zone_numbers(record, front_field), _zone_numbers(record, back_field)
+        mask = 0
+        for n in a:
+            mask |= BIT[n]
+        front.append(mask)
+        mask = 0
+        for n in b:
+            mask |= BIT[n]
+        back.append(mask)
+    return front, back
+
+
+def mask_of(numbers: Iterable[int]) -> int:
+    """号码集合的位掩码"""
+    mask = 0
+    for n in numbers:
+        mask |= BIT[n]
+    return mask
+
+
+def mask_numbers(mask: int) -> List[int]:
+    """位掩码中的号码（升序）"""
+    numbers = []
+    while mask:
+        low = mask & -mask
+        numbers.append(low.bit_length() - 1)
+        mask ^= low
+    return numbers
+
+
+def mask_sum(mask: int) -> int:
+    """位掩码中号码之和"""
+    total = 0
+    while mask:
+        low = mask & -mask
+        total += low.bit_length() - 1
+        mask ^= low
+    return total
+
+
+def spread_mask(mask: int, width: int, offset: int = 0) -> int:
+    """
+    把位掩码展开为打包计数: 号码 n 对应第 offset + n - 1 个 width 位字段，值为 1
+    
+    多期的展开结果直接相加就是各号码的出现次数（字段宽度需容纳最大次数），
+    一次整数加法同时累加所有号码。
+    """
+    packed = 0
+    while mask:
+        low = mask & -mask
+        packed |= 1 << (width * (offset + low.bit_length() - 2))
+        mask ^= low
+    return packed
+
+
+def unpack_counts(packed: int, width: int, count: int, offset: int = 0) -> List[int]:
+    """取出第 offset 到 offset + count - 1 个字段的计数"""
+    field = (1 << width) - 1
+    return [(packed >> (width * i)) & field for i in range(offset, offset + count)]
+
+
+def difference_mask(mask: int) -> int:
+    """
+    号码两两之差的集合（差 d 对应第 d 位）
+    
+    对每个号码 n，mask >> n 的第 d 位为 1 当且仅当 n + d 也在掩码中，
+    k 个号码只需 k 次移位或运算，不必枚举 k(k-1)/2 个号码对。
+    """
+    differences = 0
+    remaining = mask
+    while remaining:
+        low = remaining & -remaining
+        differences |= mask >> (low.bit_length() - 1)
+        remaining ^= low
+    return differences & ~1
+
+
+def ac_value(mask: int) -> int:
+    """AC 值（算术复杂度）: 不同正差值的个数减去 (号码个数 - 1)"""
+    count = mask.bit_count()
+    if count < 2:
+        return 0
+    return difference_mask(mask).bit_count() - (count - 1)
+
+
+def tail_counts(mask: int) -> List[int]:
+    """个位数为 0-9 的号码个数"""
+    return [(mask & tail).bit_count() for tail in TAIL_MASKS]
+
+
+def draw_relations(masks: List[int]) -> Iterator[Tuple[int, int, int]]:
+    """
+    按时间正序（最早一期在前）从第 3 期起逐期产出与前两期的关系掩码 (重号, 邻号, 斜连号)
+    
+    重号: 本期与上期相同的号码；邻号: 本期中与上期某个号码相差 1 的号码；
+    斜连号: 本期号码与前两期构成同向斜线 (n, n±1, n±2)。移位越界的位与本期掩码
+    相与后自然消失，无需再截断。
+    """
+    for i in range(2, len(masks)):
+        before, previous, current = masks[i - 2], masks[i - 1], masks[i]
+        yield (
+            current & previous,
+            current & (previous << 1 | previous >> 1),
+            current & (previous << 1 & before << 2 | previous >> 1 & before >> 2),
+        )
+
+
+def omission_rows(masks: List[int], size: int,
+                  last_seen: Optional[List[int]] = None) -> Iterator[List[int]]:
+    """
+    按时间正序（最早一期在前）逐期产出号码 1..size 的遗漏值，本期开出的号码为 0
+    
+    维护每个号码最近一次开出的位置，遗漏值即当前位置与它的差；只更新本期开出的几个号码。
+    last_seen 为起始前各号码最近开出的位置（下标 0 不用），默认 -1: 在数据范围内
+    尚未开出的号码从第一期起计数，是实际遗漏的下限。
+    """
+    last = list(last_seen) if last_seen is not None else [-1] * (size + 1)
+    for i, mask in enumerate(masks):
+        while mask:
+            low = mask & -mask
+            last[low.bit_length() - 1] = i
+            mask ^= low
+        yield [i - seen for seen in last[1:]]
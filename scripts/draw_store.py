@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖数据存储公共模块
+期号归一化、按期号降序的存储不变量、按年份分片、按期号二分查找、按开奖日期二分查找
+
+存储不变量: 写入时统一期号格式、按期号严格降序排列（最新一期在最前）、同一期号只保留一条。
+读取方因此可以直接切片取最近 N 期、取第一条作为最新一期，不必再排序。
+开奖日期随期号单调不增; 少数日期与期号对不上的记录在写入时找出并记入分片清单
+（unordered: 期号 -> 日期），按日期查询时在其余记录上二分查找，再单独核对这些记录。
+
+存储布局: 每个彩种目录下按期号年份分片（2026.json、2025.json ...），manifest.json
+记录各分片的期号范围、记录数和校验和。读取最近 N 期或某个日期范围时只打开需要的分片，
+追加新一期时只改写当年的分片。每个分片旁有一个偏移索引（<year>.idx），
+最新一期、最近 N 期、按期号查询只需 seek 到对应记录解析，不必解析整个分片。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import textwrap
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from datetime import date
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 各彩种官方期号位数: 双色球 yyyyNNN，大乐透 yyNNN
+ISSUE_DIGITS = {
+    "ssq": 7,
+    "dlt": 5,
+}
+
+# 紧凑记录中号码的打包布局: (字段名, 起始, 结束, 是否为列表)
+BALL_FIELDS = {
+    "ssq": (("red_balls", 0, 6, True), ("blue_ball", 6, 7, False)),
+    "dlt": (("front_zone", 0, 5, True), ("back_zone", 5, 7, True)),
+}
+_CORE_KEYS = {
+    lottery_type: ("lottery_type", "issue", "draw_date") + tuple(f[0] for f in fields)
+    for lottery_type, fields in BALL_FIELDS.items()
+}
+_DEFAULT_EXTRA = {"prize_info": {}}
+
+# 按年份分片存储: data/<type>/manifest.json + data/<type>/<year>.json
+MANIFEST_FILE = "manifest.json"
+LEGACY_FILE = "history.json"   # 分片之前的单文件存储，首次保存时迁移
+
+# 分片旁的偏移索引 <year>.idx: 记录序号 -> 字节偏移、期号，按序号/期号读取时只解析命中的记录
+INDEX_SUFFIX = ".idx"
+RECORD_MARK = b"\n  {"
+_INDEX_HEADER = struct.Struct("<32sQQ")  # 分片 sha256、分片字节数、记录数
+
+
+def issue_key(issue) -> int:
+    """
+    期号归一化为整数 yyyyNNN，用于比较先后
+    
+    5位期号 yyNNN 补全世纪，例如 "26016" -> 2026016，"2026016" -> 2026016
+    """
+    text = str(issue).strip()
+    if len(text) == 5:
+        text = "20" + text
+    return int(text)
+
+
+def format_issue(key: int, lottery_type: str) -> str:
+    """
+    把整数期号格式化为彩种的官方期号字符串
+    
+    短期号 yyNNN 按 20yy 年补全世纪，只能表示 2000-2099 年；其他年份（如合成历史）
+    保留 7 位期号，保证 issue_key 还原后期号不重复。
+    """
+    digits = ISSUE_DIGITS.get(lottery_type, 7)
+    if digits < 7 and key // 10 ** digits != 20:
+        digits = 7
+    return f"{key % 10 ** digits:0{digits}d}"
+
+
+def _neg_issue_key(record: Dict) -> int:
+    """降序列表上二分查找用的键"""
+    return -issue_key(record["issue"])
+
+
+def is_newest_first(records: List[Dict]) -> bool:
+    """检查是否满足按期号严格降序的不变量（线性比较，不排序）"""
+    keys = [issue_key(r["issue"]) for r in records]
+    return all(a > b for a, b in zip(keys, keys[1:]))
+
+
+def normalize_records(records: Iterable[Dict], lottery_type: str) -> List[Dict]:
+    """
+    建立存储不变量: 统一期号格式、按期号降序、期号去重
+    
+    期号冲突时优先保留期号本来就是官方格式的记录（如双色球 7 位期号的正式开奖，
+    而不是补全世纪后与之相撞的 5 位演示记录）；格式相同时保留先出现的记录。
+    """
+    keyed = {}
+    canonical = set()
+    for record in records:
+        key = issue_key(record["issue"])
+        issue = format_issue(key, lottery_type)
+        is_canonical = str(record["issue"]).strip() == issue
+        if key in keyed and (key in canonical or not is_canonical):
+            continue
+        record = dict(record)
+        record["issue"] = issue
+        keyed[key] = record
+        if is_canonical:
+            canonical.add(key)
+    return [keyed[key] for key in sorted(keyed, reverse=True)]
+
+
+class Draw(Mapping):
+    """
+    紧凑的不可变开奖记录
+    
+    整数期号、开奖日期序数（date.toordinal，缺失日期为 0）、号码打包为 bytes，
+    奖金信息等其余字段保存为紧凑 JSON 文本，访问时才解析。
+    实现只读映射接口，record["red_balls"]、record.get("blue_ball") 等原有写法照常可用，
+    与同内容的 dict 比较相等，dict(record) 可还原为普通记录。
+    """
+    
+    __slots__ = ("lottery_type", "key", "ordinal", "balls", "_extra")
+    
+    def __init__(self, lottery_type: str, key: int, ordinal: int, balls: bytes,
+                 extra: Optional[str] = None):
+        object.__setattr__(self, "lottery_type", lottery_type)
+        object.__setattr__(self, "key", key)
+        object.__setattr__(self, "ordinal", ordinal)
+        object.__setattr__(self, "balls", balls)
+        object.__setattr__(self, "_extra", extra)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Draw 为不可变对象")
+    
+    def __delattr__(self, name):
+        raise AttributeError("Draw 为不可变对象")
+    
+    def __reduce__(self):
+        return (Draw, (self.lottery_type, self.key, self.ordinal, self.balls, self._extra))
+    
+    @classmethod
+    def from_dict(cls, record: Mapping) -> "Draw":
+        """由普通记录构造；号码个数或日期格式不符合彩种规则时抛出 ValueError"""
+        if isinstance(record, Draw):
+            return record
+        
+        lottery_type = record.get("lottery_type") or ("ssq" if "red_balls" in record else "dlt")
+        fields = BALL_FIELDS[lottery_type]
+        packed = []
+        for name, start, end, is_list in fields:
+            value = record[name]
+            numbers = list(value) if is_list else [value]
+            if len(numbers) != end - start:
+                raise ValueError(f"{name} 号码个数错误: {value}")
+            packed.extend(numbers)
+        
+        draw_date = record.get("draw_date") or ""
+        ordinal = date.fromisoformat(draw_date).toordinal() if draw_date else 0
+        
+        core = _CORE_KEYS[lottery_type]
+        extra = {k: v for k, v in record.items() if k not in core}
+        extra_text = None if extra == _DEFAULT_EXTRA else json.dumps(extra, ensure_ascii=False, separators=(",", ":"))
+        return cls(lottery_type, issue_key(record["issue"]), ordinal, bytes(packed), extra_text)
+    
+    @property
+    def issue(self) -> str:
+        return format_issue(self.key, self.lottery_type)
+    
+    @property
+    def draw_date(self) -> str:
+        return date.fromordinal(self.ordinal).isoformat() if self.ordinal else ""
+    
+    def _extras(self) -> Dict:
+        return {"prize_info": {}} if self._extra is None else json.loads(self._extra)
+    
+    def __getitem__(self, name: str):
+        if name == "issue":
+            return self.issue
+        if name == "draw_date":
+            return self.draw_date
+        if name == "lottery_type":
+            return self.lottery_type
+        for field, start, end, is_list in BALL_FIELDS[self.lottery_type]:
+            if field == name:
+                return list(self.balls[start:end]) if is_list else self.balls[start]
+        return self._extras()[name]
+    
+    def __iter__(self):
+        yield from _CORE_KEYS[self.lottery_type]
+        yield from self._extras()
+    
+    def __len__(self) -> int:
+        return len(_CORE_KEYS[self.lottery_type]) + len(self._extras())
+    
+    def __repr__(self) -> str:
+        return f"Draw({self.lottery_type} {self.issue} {self.draw_date} {list(self.balls)})"
+
+
+def to_draw(record: Mapping) -> Mapping:
+    """尽量转换为紧凑的 Draw，不符合彩种规则的记录保持原样"""
+    try:
+        return Draw.from_dict(record)
+    except (KeyError, TypeError, ValueError):
+        return record
+
+
+def shard_year(issue) -> int:
+    """记录所属分片的年份（取自期号，缺失开奖日期的记录同样可以归档）"""
+    return issue_key(issue) // 1000
+
+
+def load_manifest(data_dir: Path) -> Optional[Dict]:
+    """读取分片清单，未分片时返回 None"""
+    manifest_file = data_dir / MANIFEST_FILE
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_atomic(path: Path, text: str):
+    """先写临时文件再替换，避免中途失败留下半个文件"""
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+
+
+def _save_manifest(data_dir: Path, lottery_type: str, shards: List[Dict], latest_ordinal: int):
+    """写入分片清单，分片按年份降序排列，附带最近一条日期正常记录的开奖日期"""
+    shards = sorted(shards, key=lambda x: x["year"], reverse=True)
+    manifest = {
+        "lottery_type": lottery_type,
+        "total": sum(shard["count"] for shard in shards),
+        "latest_date": date.fromordinal(latest_ordinal).isoformat() if latest_ordinal else "",
+        "shards": shards
+    }
+    _write_atomic(data_dir / MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+def _shard_entry(year: int, records: List[Dict], digest: str,
+                 unordered: Optional[Dict[str, str]] = None) -> Dict:
+    """分片清单中的一项: 期号范围、记录数、校验和，以及开奖日期乱序的期号 -> 日期（有时才写）"""
+    entry = {
+        "year": year,
+        "file": f"{year}.json",
+        "count": len(records),
+        "newest_issue": records[0]["issue"],
+        "oldest_issue": records[-1]["issue"],
+        "sha256": digest
+    }
+    if unordered:
+        entry["unordered"] = {issue: unordered[issue]
+                              for issue in sorted(unordered, key=issue_key, reverse=True)}
+    return entry
+
+
+def _read_shard_bytes(data_dir: Path, shard: Dict) -> bytes:
+    """读取单个分片的原始字节并校验"""
+    path = data_dir / shard["file"]
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if hashlib.sha256(raw).hexdigest() != shard["sha256"]:
+        raise ValueError(f"分片校验失败，文件可能已损坏: {path}")
+    return raw
+
+
+def _read_shard(data_dir: Path, shard: Dict) -> List[Dict]:
+    """读取单个分片并校验，记录转换为紧凑的 Draw"""
+    return [to_draw(r) for r in json.loads(_read_shard_bytes(data_dir, shard))]
+
+
+def read_shard(data_dir: Path, shard: Dict) -> List[Dict]:
+    """读取分片清单中的一个分片（校验后转换为 Draw），供按分片增量维护的派生索引使用"""
+    return _read_shard(data_dir, shard)
+
+
+def _index_path(data_dir: Path, shard: Dict) -> Path:
+    return data_dir / (Path(shard["file"]).stem + INDEX_SUFFIX)
+
+
+def _record_offsets(raw: bytes) -> array:
+    """
+    分片中每条记录起始 "{" 的字节偏移，末尾追加文件长度作为哨兵
+    
+    分片由 json.dump(indent=2) 写出，顶层记录以独占一行的 "  {" 开始，
+    嵌套对象缩进更深，直接在字节层面查找即可，无需解析 JSON。
+    """
+    offsets = array('q')
+    pos = raw.find(RECORD_MARK)
+    while pos >= 0:
+        offsets.append(pos + len(RECORD_MARK) - 1)
+        pos = raw.find(RECORD_MARK, pos + 1)
+    offsets.append(len(raw))
+    return offsets
+
+
+def _write_index(data_dir: Path, shard: Dict, raw: bytes, keys: array) -> Tuple[array, array]:
+    """写入分片的偏移索引: 头部（分片校验和、字节数、记录数）+ 期号数组 + 偏移数组"""
+    offsets = _record_offsets(raw)
+    if len(keys) != shard["count"] or len(offsets) != shard["count"] + 1:
+        raise ValueError(f"分片记录数与清单不一致: {data_dir / shard['file']}")
+    
+    header = _INDEX_HEADER.pack(bytes.fromhex(shard["sha256"]), len(raw), len(keys))
+    path = _index_path(data_dir, shard)
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, 'wb') as f:
+        f.write(header + keys.tobytes() + offsets.tobytes())
+    os.replace(tmp_file, path)
+    return keys, offsets
+
+
+def _load_index(data_dir: Path, shard: Dict) -> Tuple[array, array]:
+    """
+    读取分片的偏移索引 (期号数组, 偏移数组)
+    
+    索引头部记录了对应分片的校验和与字节数；索引缺失或与分片不一致时，
+    完整读取一次分片重建索引。
+    """
+    try:
+        with open(_index_path(data_dir, shard), 'rb') as f:
+            blob = f.read()
+        digest, size, count = _INDEX_HEADER.unpack_from(blob)
+        if (digest.hex() == shard["sha256"] and count == shard["count"]
+                and size == (data_dir / shard["file"]).stat().st_size):
+            keys = array('q')
+            offsets = array('q')
+            body = _INDEX_HEADER.size
+            keys.frombytes(blob[body:body + 8 * count])
+            offsets.frombytes(blob[body + 8 * count:])
+            if len(offsets) == count + 1:
+                return keys, offsets
+    except (OSError, struct.error):
+        pass
+    
+    raw = _read_shard_bytes(data_dir, shard)
+    keys = array('q', (issue_key(r["issue"]) for r in json.loads(raw)))
+    return _write_index(data_dir, shard, raw, keys)
+
+
+def _read_span(data_dir: Path, shard: Dict, offsets: array, i: int, j: int) -> List[Dict]:
+    """按偏移索引只读取并解析分片中的第 i 到 j-1 条记录"""
+    if i >= j:
+        return []
+    with open(data_dir / shard["file"], 'rb') as f:
+        f.seek(offsets[i])
+        chunk = f.read(offsets[j] - offsets[i]).decode("utf-8")
+    # 片段以 "},\n  " 或末条记录的 "}\n]" 结尾
+    return [to_draw(r) for r in json.loads("[" + chunk.rstrip(" \n,]") + "]")]
+
+
+def _select_shards(shards: List[Dict], periods: Optional[int],
+                   start: Optional[str], end: Optional[str]) -> List[Dict]:
+    """
+    根据期数或日期范围挑出需要打开的分片
+    
+    开奖年份与期号年份一致，日期范围直接换算成年份范围，另加上乱序记录日期落在范围内的分片；
+    最近 N 期从最新分片往前累加记录数，够数即停。
+    """
+    if start is not None or end is not None:
+        first_year = int(start[:4]) if start else 0
+        last_year = int(end[:4]) if end else 9999
+        return [s for s in shards if first_year <= s["year"] <= last_year
+                or any((start is None or d >= start) and (end is None or d <= end)
+                       for d in s.get("unordered", {}).values())]
+    
+    if periods is None:
+        return shards
+    
+    selected = []
+    count = 0
+    for shard in shards:
+        if count >= periods:
+            break
+        selected.append(shard)
+        count += shard["count"]
+    return selected
+
+
+def _load_legacy(data_file: Path) -> List[Dict]:
+    """读取未分片的旧版单文件存储"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    
+    if not is_newest_first(records):
+        logger.warning(f"数据文件未按期号降序存储，已在内存中排序: {data_file}")
+        records.sort(key=lambda x: issue_key(x["issue"]), reverse=True)
+    return [to_draw(r) for r in records]
+
+
+def has_draws(data_dir: Path) -> bool:
+    """数据目录中是否存在开奖数据（分片或旧版单文件）"""
+    return (data_dir / MANIFEST_FILE).exists() or (data_dir / LEGACY_FILE).exists()
+
+
+def load_draws(data_dir: Path, periods: Optional[int] = None,
+               start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+    """
+    加载开奖数据（最新一期在前）
+    
+    Args:
+        data_dir: 彩种数据目录（data/<type>）
+        periods: 只取最近 N 期，只打开覆盖这 N 期的分片
+        start/end: 只取开奖日期在 [start, end] 内的记录（YYYY-MM-DD），只打开对应年份的分片
+    
+    各分片由 save_draws/append_draws 写入时已保证顺序，拼接后无需排序;
+    日期乱序的记录也已记入清单，按日期筛选时直接二分查找。
+    """
+    manifest = load_manifest(data_dir)
+    unordered = None
+    if manifest is not None:
+        records = []
+        unordered = set()
+        for shard in _select_shards(manifest["shards"], periods, start, end):
+            unordered.update(issue_key(i) for i in shard.get("unordered", {}))
+            need = None if periods is None else periods - len(records)
+            if start is None and end is None and need is not None and need < shard["count"]:
+                # 只需要分片开头的几期: 按偏移索引读取，不解析整个分片
+                _, offsets = _load_index(data_dir, shard)
+                records.extend(_read_span(data_dir, shard, offsets, 0, need))
+            else:
+                records.extend(_read_shard(data_dir, shard))
+    elif (data_dir / LEGACY_FILE).exists():
+        records = _load_legacy(data_dir / LEGACY_FILE)
+    else:
+        return []
+    
+    if start is not None or end is not None:
+        if unordered is None:
+            # 旧版单文件没有清单，现场找出日期乱序的记录
+            unordered = {issue_key(records[k]["issue"]) for k in date_violations(records)}
+        records = date_range_filter(records, start, end, unordered)
+    if periods is not None:
+        records = records[:periods]
+    return records
+
+
+def save_draws(data_dir: Path, records: Iterable[Dict], lottery_type: str) -> List[Dict]:
+    """
+    保存全部开奖数据，写入前建立存储不变量，按年份分片
+    
+    内容未变化的分片（校验和一致）不会重写；旧版单文件存储在分片写入后删除。
+    
+    Returns: 实际写入的记录（已归一化）
+    """
+    records = normalize_records(records, lottery_type)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    unordered = {records[k]["issue"]: records[k]["draw_date"] for k in date_violations(records)}
+    _warn_unordered(data_dir, unordered)
+    latest = next((_record_ordinal(r) for r in records
+                   if r["issue"] not in unordered and _record_ordinal(r)), 0)
+    
+    manifest = load_manifest(data_dir) or {"shards": []}
+    old_shards = {shard["year"]: shard for shard in manifest["shards"]}
+    
+    shards = []
+    for year, group in groupby(records, key=lambda x: shard_year(x["issue"])):
+        group = list(group)
+        text = json.dumps(group, ensure_ascii=False, indent=2)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        entry = _shard_entry(year, group, digest,
+                             {r["issue"]: unordered[r["issue"]] for r in group if r["issue"] in unordered})
+        old = old_shards.pop(year, None)
+        if old is None or old["sha256"] != digest or not (data_dir / entry["file"]).exists():
+            _write_atomic(data_dir / entry["file"], text)
+            _write_index(data_dir, entry, text.encode("utf-8"),
+                         array('q', (issue_key(r["issue"]) for r in group)))
+        shards.append(entry)
+    
+    _save_manifest(data_dir, lottery_type, shards, latest)
+    
+    # 清理已经没有记录的年份分片和旧版单文件
+    for shard in old_shards.values():
+        (data_dir / shard["file"]).unlink(missing_ok=True)
+        _index_path(data_dir, shard).unlink(missing_ok=True)
+    (data_dir / LEGACY_FILE).unlink(missing_ok=True)
+    return records
+
+
+def append_draws(data_dir: Path, records: Iterable[Dict], lottery_type: str) -> int:
+    """
+    追加比现有最新一期更新的记录
+    
+    只改写新记录所在年份的分片（通常只有当年分片），其他分片不读不写。
+    开奖日期早于现有最近一条正常记录（或前一条新记录）的新记录记入清单的乱序期号。
+    
+    Returns: 追加后的总记录数
+    """
+    records = normalize_records(records, lottery_type)
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        # 首次写入或旧版单文件存储: 整体写成分片
+        existing = load_draws(data_dir)
+        return len(save_draws(data_dir, records + existing, lottery_type))
+    if not records:
+        return manifest["total"]
+    
+    shards = {shard["year"]: shard for shard in manifest["shards"]}
+    if manifest["shards"]:
+        head_issue = manifest["shards"][0]["newest_issue"]
+        if issue_key(records[-1]["issue"]) <= issue_key(head_issue):
+            raise ValueError(f"追加的记录必须比现有最新一期 {head_issue} 更新")
+    
+    latest = _latest_ordinal(data_dir, manifest)
+    unordered = {}
+    for record in reversed(records):
+        ordinal = _record_ordinal(record)
+        if ordinal and ordinal < latest:
+            unordered[record["issue"]] = record["draw_date"]
+        latest = max(latest, ordinal)
+    _warn_unordered(data_dir, unordered)
+    
+    for year, group in groupby(records, key=lambda x: shard_year(x["issue"])):
+        group = list(group)
+        keys = array('q', (issue_key(r["issue"]) for r in group))
+        old = shards.get(year)
+        if old is not None:
+            _read_shard_bytes(data_dir, old)  # 先校验，避免在损坏的分片上继续追加
+            keys.extend(_load_index(data_dir, old)[0])
+        
+        shard_file = data_dir / f"{year}.json"
+        prepend_records(shard_file, group)
+        with open(shard_file, 'rb') as f:
+            raw = f.read()
+        
+        flagged = {r["issue"]: unordered[r["issue"]] for r in group if r["issue"] in unordered}
+        if old is not None:
+            flagged.update(old.get("unordered", {}))
+        entry = _shard_entry(year, group, hashlib.sha256(raw).hexdigest(), flagged)
+        if old is not None:
+            entry["count"] += old["count"]
+            entry["oldest_issue"] = old["oldest_issue"]
+        _write_index(data_dir, entry, raw, keys)
+        shards[year] = entry
+    
+    _save_manifest(data_dir, lottery_type, list(shards.values()), latest)
+    return sum(shard["count"] for shard in shards.values())
+
+
+def read_draw(data_dir: Path, ordinal: int) -> Optional[Dict]:
+    """
+    按序号读取单条记录（0 为最新一期，-1 为最早一期），超出范围返回 None
+    
+    由分片清单定位分片，再按偏移索引只解析这一条记录。
+    """
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        records = load_draws(data_dir)
+        return records[ordinal] if -len(records) <= ordinal < len(records) else None
+    
+    if ordinal < 0:
+        ordinal += manifest["total"]
+    if not 0 <= ordinal < manifest["total"]:
+        return None
+    for shard in manifest["shards"]:
+        if ordinal < shard["count"]:
+            _, offsets = _load_index(data_dir, shard)
+            return _read_span(data_dir, shard, offsets, ordinal, ordinal + 1)[0]
+        ordinal -= shard["count"]
+    return None
+
+
+def read_head(data_dir: Path) -> Optional[Dict]:
+    """最新一期记录，只解析最新分片的第一条"""
+    return read_draw(data_dir, 0)
+
+
+def find_draw(data_dir: Path, issue) -> Optional[Dict]:
+    """
+    按期号读取单条记录
+    
+    期号年份确定分片，在索引的期号数组上二分查找，只解析命中的那一条。
+    """
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        return find_by_issue(load_draws(data_dir), issue)
+    
+    year = shard_year(issue)
+    shard = next((s for s in manifest["shards"] if s["year"] == year), None)
+    if shard is None:
+        return None
+    keys, offsets = _load_index(data_dir, shard)
+    target = issue_key(issue)
+    index = bisect_left(keys, -target, key=lambda k: -k)
+    if index < len(keys) and keys[index] == target:
+        return _read_span(data_dir, shard, offsets, index, index + 1)[0]
+    return None
+
+
+def latest_draw_date(data_dir: Path) -> str:
+    """
+    最近一条开奖日期正常的记录的日期（YYYY-MM-DD），无数据时为空字符串
+    
+    直接取自分片清单，不受清单中标记为乱序的记录影响。
+    """
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        records = load_draws(data_dir)
+        unordered = set(date_violations(records))
+        return next((r["draw_date"] for k, r in enumerate(records) if k not in unordered and r["draw_date"]), "")
+    ordinal = _latest_ordinal(data_dir, manifest)
+    return date.fromordinal(ordinal).isoformat() if ordinal else ""
+
+
+def count_draws(data_dir: Path) -> int:
+    """记录总数，直接取自分片清单"""
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        return len(load_draws(data_dir))
+    return manifest["total"]
+
+
+# 数据集版本缓存: 路径 -> (修改时间, 大小, 版本)
+_versions: Dict[str, Tuple[int, int, str]] = {}
+
+
+def dataset_version(data_dir: Path) -> str:
+    """
+    数据集版本: 分片清单（未分片时为旧版单文件）内容的摘要
+    
+    清单记录了各分片的记录数和校验和，任何写入都会改变版本。
+    按文件修改时间和大小缓存，清单不变时不重复读取。
+    """
+    path = data_dir / MANIFEST_FILE
+    if not path.exists():
+        path = data_dir / LEGACY_FILE
+    stat = path.stat()
+    cached = _versions.get(str(path))
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    version = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+    _versions[str(path)] = (stat.st_mtime_ns, stat.st_size, version)
+    return version
+
+
+def prepend_records(data_file: Path, records: List[Dict]):
+    """
+    把更新的记录写入 JSON 数组文件头部
+    
+    只序列化新增记录，已有内容按原始字节拷贝，不重新解析和排序。
+    """
+    data_file.parent.mkdir(parents=True, exist_ok=True)
+    block = ",\n".join(
+        textwrap.indent(json.dumps(record, ensure_ascii=False, indent=2), "  ")
+        for record in records
+    )
+    
+    tmp_file = data_file.with_name(data_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as dst:
+        if not data_file.exists():
+            dst.write("[\n" + block + "\n]")
+        else:
+            with open(data_file, 'r', encoding='utf-8') as src:
+                head = src.read(4096)
+                start = head.find("[")
+                if start < 0 or head[start + 1:].lstrip().startswith("]"):
+                    dst.write("[\n" + block + "\n]")
+                else:
+                    # 原文件 "[" 之后是 "\n  {"，接上新记录后格式与 json.dump 一致
+                    dst.write("[\n" + block + "," + head[start + 1:])
+                    shutil.copyfileobj(src, dst)
+    
+    os.replace(tmp_file, data_file)
+
+
+def find_by_issue(records: List[Dict], issue) -> Optional[Dict]:
+    """在降序记录中二分查找指定期号"""
+    target = -issue_key(issue)
+    index = bisect_left(records, target, key=_neg_issue_key)
+    if index < len(records) and _neg_issue_key(records[index]) == target:
+        return records[index]
+    return None
+
+
+def _record_ordinal(record: Mapping) -> int:
+    """开奖日期序数，缺失或无法解析时为 0"""
+    if isinstance(record, Draw):
+        return record.ordinal
+    try:
+        return date.fromisoformat(record.get("draw_date") or "").toordinal()
+    except ValueError:
+        return 0
+
+
+def date_violations(records: List[Dict]) -> List[int]:
+    """
+    降序记录中开奖日期与期号顺序不一致的记录下标（升序）
+    
+    从最早一期往最新一期求开奖日期不减的最长子序列（O(n log n)），
+    不在其中的有日期记录即为乱序记录，这样标记的记录数最少。缺失日期的记录不参与。
+    """
+    dated = [(k, o) for k, o in ((k, _record_ordinal(r)) for k, r in enumerate(records)) if o]
+    dated.reverse()
+    tails = []      # tails[n]: 长度为 n + 1 的子序列末尾的最小日期
+    tail_at = []    # 该末尾在 dated 中的位置
+    parent = [-1] * len(dated)
+    for n, (_, ordinal) in enumerate(dated):
+        length = bisect_right(tails, ordinal)
+        parent[n] = tail_at[length - 1] if length else -1
+        if length == len(tails):
+            tails.append(ordinal)
+            tail_at.append(n)
+        else:
+            tails[length] = ordinal
+            tail_at[length] = n
+    
+    kept = set()
+    n = tail_at[-1] if tail_at else -1
+    while n >= 0:
+        kept.add(n)
+        n = parent[n]
+    return sorted(dated[n][0] for n in range(len(dated)) if n not in kept)
+
+
+def _warn_unordered(data_dir: Path, unordered: Dict[str, str]):
+    if unordered:
+        sample = ", ".join(sorted(unordered, reverse=True)[:5])
+        logger.warning(f"{len(unordered)} 条记录的开奖日期与期号顺序不一致，已记入分片清单: "
+                       f"{sample}{' ...' if len(unordered) > 5 else ''} ({data_dir})")
+
+
+def _latest_ordinal(data_dir: Path, manifest: Dict) -> int:
+    """现有最近一条日期正常（未标记乱序）记录的日期序数，先取清单，旧版清单再按索引逐条解析"""
+    if manifest.get("latest_date"):
+        return date.fromisoformat(manifest["latest_date"]).toordinal()
+    for shard in manifest["shards"]:
+        unordered = shard.get("unordered", {})
+        _, offsets = _load_index(data_dir, shard)
+        for k in range(shard["count"]):
+            record = _read_span(data_dir, shard, offsets, k, k + 1)[0]
+            if record["issue"] not in unordered and _record_ordinal(record):
+                return _record_ordinal(record)
+    return 0
+
+
+def date_range_slice(records: List[Dict], start: Optional[str] = None,
+                     end: Optional[str] = None, unordered: Iterable[int] = ()) -> Tuple[int, int]:
+    """
+    降序记录中开奖日期位于 [start, end] 的下标区间 [i, j)，在日期上二分查找
+    
+    unordered 为日期乱序记录的整数期号，二分时与缺失日期的记录一样，
+    取其后（更早）最近一条正常记录的日期，保证比较键单调。
+    """
+    unordered = unordered if isinstance(unordered, (set, frozenset)) else set(unordered)
+    
+    def neg_effective(k: int) -> int:
+        while k < len(records):
+            record = records[k]
+            if issue_key(record["issue"]) not in unordered:
+                ordinal = _record_ordinal(record)
+                if ordinal:
+                    return -ordinal
+            k += 1
+        return 0
+    
+    positions = range(len(records))
+    i = 0 if end is None else bisect_left(
+        positions, -date.fromisoformat(end).toordinal(), key=neg_effective)
+    j = len(records) if start is None else bisect_right(
+        positions, -date.fromisoformat(start).toordinal(), key=neg_effective)
+    return i, max(i, j)
+
+
+def date_range_filter(records: List[Dict], start: Optional[str] = None,
+                      end: Optional[str] = None, unordered: Iterable[int] = ()) -> List[Dict]:
+    """
+    开奖日期位于 [start, end] 的记录（日期格式 YYYY-MM-DD），保持原有顺序
+    
+    先由 date_range_slice 二分出区间，再按真实日期核对乱序记录:
+    区间内日期不符的剔除，区间外日期相符的按期号二分定位后补回。
+    缺失日期的记录取其后（更早）最近一条有日期记录的日期。
+    """
+    unordered = unordered if isinstance(unordered, (set, frozenset)) else set(unordered)
+    i, j = date_range_slice(records, start, end, unordered)
+    if not unordered:
+        return records[i:j]
+    
+    low = date.fromisoformat(start).toordinal() if start else 1
+    high = date.fromisoformat(end).toordinal() if end else date.max.toordinal()
+    
+    def in_range(record: Dict) -> bool:
+        return low <= _record_ordinal(record) <= high
+    
+    picked = [k for k in range(i, j)
+              if issue_key(records[k]["issue"]) not in unordered or in_range(records[k])]
+    for key in unordered:
+        k = bisect_left(records, -key, key=_neg_issue_key)
+        if k < len(records) and _neg_issue_key(records[k]) == -key \
+                and not i <= k < j and in_range(records[k]):
+            picked.append(k)
+    return [records[k] for k in sorted(picked)]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史开奖号码组合索引
+判断一注红球/前区组合（可连同蓝球/后区）在历史上是否开出过
+
+每期开奖编码为一个整数键: 前区位掩码 | 后区位掩码 << BACK_SHIFT。全部键放进一个集合，
+前区组合另有一个集合（键的低 BACK_SHIFT 位），每次查询是一次哈希查找。
+
+索引按分片持久化到彩种目录下的 drawn.idx: 每个分片一节，记录年份、分片校验和与
+该分片各期的键。加载时校验和与分片清单一致的节直接复用，只重新读取变化的分片；
+追加新一期只改写当年分片，索引也只重建当年这一节。同一数据集版本在进程内只加载一次。
+只有写入数据的路径（导入/同步，persist=True）才写索引文件；号码生成、批量查询等
+只读命令在内存中补齐变化的分片，不修改数据目录。
+未分片的旧版单文件存储不写索引文件，从全部记录构建。
+"""
+
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from draw_bits import zone_masks
+from draw_store import dataset_version, load_draws, load_manifest, read_shard
+
+INDEX_FILE = "drawn.idx"
+BACK_SHIFT = 40                         # 前区号码不超过 35，后区掩码从第 40 位开始
+FRONT_MASK = (1 << BACK_SHIFT) - 1
+_SECTION_HEADER = struct.Struct("<I32sI")   # 分片年份、分片 sha256、键个数
+
+# 进程内缓存: 数据目录 -> (数据集版本, 索引)
+_indexes: Dict[str, Tuple[str, "DrawnIndex"]] = {}
+
+
+def draw_keys(records: Iterable[Mapping], lottery_type: str) -> array:
+    """各期开奖的组合键，顺序与 records 相同"""
+    front, back = zone_masks(records, lottery_type)
+    return array('q', (f | b << BACK_SHIFT for f, b in zip(front, back)))
+
+
+class DrawnIndex:
+    """历史开奖组合的精确集合"""
+    
+    def __init__(self, keys: Iterable[int] = ()):
+        self.combinations = set(keys)
+        self.fronts = {key & FRONT_MASK for key in self.combinations}
+    
+    def __len__(self) -> int:
+        return len(self.combinations)
+    
+    def contains(self, front: int, back: Optional[int] = None) -> bool:
+        """前区位掩码（给出 back 时连同后区位掩码）是否开出过"""
+        if back is None:
+            return front in self.fronts
+        return (front | back << BACK_SHIFT) in self.combinations
+    
+    def contains_batch(self, fronts: Sequence[int], backs: Optional[Sequence[int]] = None) -> List[bool]:
+        """批量查询，backs 为 None 时只比较前区"""
+        if backs is None:
+            drawn = self.fronts
+            return [front in drawn for front in fronts]
+        drawn = self.combinations
+        return [(front | back << BACK_SHIFT) in drawn for front, back in zip(fronts, backs)]
+
+
+def _read_sections(path: Path) -> Dict[int, Tuple[str, array]]:
+    """读取索引文件的各节: 年份 -> (分片校验和, 键数组)；文件缺失或不完整时返回空"""
+    try:
+        blob = path.read_bytes()
+    except OSError:
+        return {}
+    sections = {}
+    pos = 0
+    try:
+        while pos < len(blob):
+            year, digest, count = _SECTION_HEADER.unpack_from(blob, pos)
+            pos += _SECTION_HEADER.size
+            keys = array('q')
+            keys.frombytes(blob[pos:pos + 8 * count])
+            if len(keys) != count:
+                return {}
+            pos += 8 * count
+            sections[year] = (digest.hex(), keys)
+    except (struct.error, ValueError):
+        return {}
+    return sections
+
+
+def _write_sections(path: Path, sections: Dict[int, Tuple[str, array]]):
+    tmp_file = path.with_name(path.name + ".tmp")
+    with open(tmp_file, 'wb') as f:
+        for year, (digest, keys) in sections.items():
+            f.write(_SECTION_HEADER.pack(year, bytes.fromhex(digest), len(keys)) + keys.tobytes())
+    os.replace(tmp_file, path)
+
+
+def load_drawn_index(data_dir: Path, lottery_type: str, persist: bool = False) -> DrawnIndex:
+    """
+    数据目录的历史开奖组合索引（同一数据集版本只构建一次，只重建变化的分片）
+    
+    persist 为 True 时把重建的节写回 drawn.idx，只应由写入数据的路径使用。
+    """
+    version = dataset_version(data_dir)
+    cached = _indexes.get(str(data_dir))
+    if cached and cached[0] == version and not persist:
+        return cached[1]
+    
+    manifest = load_manifest(data_dir)
+    if manifest is None:
+        index = DrawnIndex(draw_keys(load_draws(data_dir), lottery_type))
+    else:
+        path = data_dir / INDEX_FILE
+        stored = _read_sections(path)
+        sections = {}
+        for shard in manifest["shards"]:
+            old = stored.get(shard["year"])
+            if old is not None and old[0] == shard["sha256"]:
+                sections[shard["year"]] = old
+            else:
+                sections[shard["year"]] = (shard["sha256"], draw_keys(read_shard(data_dir, shard), lottery_type))
+        if persist and sections != stored:
+            _write_sections(path, sections)
+        index = DrawnIndex(key for _, keys in sections.values() for key in keys)
+    
+    _indexes[str(data_dir)] = (version, index)
+    return index
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+号码形态的精确概率分布
+从 1..size 中等概率选 pick 个号码时，奇偶比、大小比、区间分布、和值、跨度、
+连号组数的精确概率（如双色球 33 选 6、大乐透 35 选 5）
+
+奇偶比、大小比、区间分布是（多元）超几何分布，跨度有闭式解；和值与连号组数
+对号码范围逐个做动态规划，统计每种取值的组合数。全部为整数运算，结果按配置
+记忆化，概率之和严格为 1（浮点舍入前）。
+
+用法:
+    python analyze_history.py --type ssq --metric expected --distribution sum
+"""
+
+import functools
+from itertools import product
+from math import comb
+from typing import Dict, Sequence, Tuple
+
+METRICS = ("odd_even", "big_small", "zones", "sum", "span", "consecutive")
+
+
+def _probabilities(counts: Dict, total: int) -> Dict:
+    return {value: count / total for value, count in counts.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def odd_even(size: int, pick: int) -> Dict[str, float]:
+    """奇偶比 "奇:偶" 的概率（超几何分布）"""
+    odds = (size + 1) // 2
+    counts = {f"{k}:{pick - k}": comb(odds, k) * comb(size - odds, pick - k) for k in range(pick, -1, -1)}
+    return _probabilities({k: v for k, v in counts.items() if v}, comb(size, pick))
+
+
+@functools.lru_cache(maxsize=None)
+def big_small(size: int, pick: int, big_boundary: int) -> Dict[str, float]:
+    """大小比 "大:小" 的概率，号码 >= big_boundary 为大号"""
+    bigs = size - big_boundary + 1
+    counts = {f"{k}:{pick - k}": comb(bigs, k) * comb(size - bigs, pick - k) for k in range(pick, -1, -1)}
+    return _probabilities({k: v for k, v in counts.items() if v}, comb(size, pick))
+
+
+@functools.lru_cache(maxsize=None)
+def zones(size: int, pick: int, zone_ranges: Tuple[Tuple[int, int], ...]) -> Dict[str, float]:
+    """区间分布向量 "a:b:c..." 的概率（多元超几何分布）"""
+    lengths = [end - start + 1 for start, end in zone_ranges]
+    counts = {}
+    for vector in product(*(range(min(length, pick) + 1) for length in lengths)):
+        if sum(vector) != pick:
+            continue
+        count = 1
+        for length, k in zip(lengths, vector):
+            count *= comb(length, k)
+        counts[":".join(map(str, vector))] = count
+    ordered = dict(sorted(counts.items(), key=lambda item: -item[1]))
+    return _probabilities(ordered, comb(size, pick))
+
+
+@functools.lru_cache(maxsize=None)
+def sum_distribution(size: int, pick: int) -> Dict[int, float]:
+    """
+    和值的概率
+    
+    ways[k][s] 为已考察的号码中选 k 个、和为 s 的组合数，逐个号码加入时
+    k 从大到小更新（0/1 背包），避免同一号码被选两次。
+    """
+    max_sum = sum(range(size - pick + 1, size + 1))
+    ways = [[0] * (max_sum + 1) for _ in range(pick + 1)]
+    ways[0][0] = 1
+    for n in range(1, size + 1):
+        for k in range(min(n, pick), 0, -1):
+            row, previous = ways[k], ways[k - 1]
+            for s in range(max_sum, n - 1, -1):
+                if previous[s - n]:
+                    row[s] += previous[s - n]
+    return _probabilities({s: c for s, c in enumerate(ways[pick]) if c}, comb(size, pick))
+
+
+@functools.lru_cache(maxsize=None)
+def span(size: int, pick: int) -> Dict[int, float]:
+    """跨度（最大号 - 最小号）的概率: 跨度 d 有 (size - d) 个起点，中间 d - 1 个号码里再选 pick - 2 个"""
+    if pick == 1:
+        return {0: 1.0}
+    counts = {d: (size - d) * comb(d - 1, pick - 2) for d in range(pick - 1, size)}
+    return _probabilities(counts, comb(size, pick))
+
+
+@functools.lru_cache(maxsize=None)
+def consecutive(size: int, pick: int) -> Dict[int, float]:
+    """
+    连号组数（长度 >= 2 的连续号码段个数）的概率
+    
+    按号码从小到大做动态规划，状态为 (已选个数, 当前连续段长度（2 及以上记为 2）, 连号组数)。
+    """
+    states = {(0, 0, 0): 1}
+    for _ in range(size):
+        following: Dict[Tuple[int, int, int], int] = {}
+        for (k, run, runs), count in states.items():
+            # 不选当前号码: 连续段中断
+            key = (k, 0, runs)
+            following[key] = following.get(key, 0) + count
+            if k < pick:
+                # 选当前号码: 段长从 1 变为 2 时新增一组连号
+                key = (k + 1, min(run + 1, 2), runs + (run == 1))
+                following[key] = following.get(key, 0) + count
+        states = following
+    counts: Dict[int, int] = {}
+    for (k, _, runs), count in states.items():
+        if k == pick:
+            counts[runs] = counts.get(runs, 0) + count
+    return _probabilities(dict(sorted(counts.items())), comb(size, pick))
+
+
+def expected_distribution(metric: str, size: int, pick: int, big_boundary: int,
+                          zone_ranges: Sequence[Tuple[int, int]]) -> Dict:
+    """按指标名取精确分布"""
+    if metric == "odd_even":
+        return odd_even(size, pick)
+    if metric == "big_small":
+        return big_small(size, pick, big_boundary)
+    if metric == "zones":
+        return zones(size, pick, tuple(tuple(zone) for zone in zone_ranges))
+    if metric == "sum":
+        return sum_distribution(size, pick)
+    if metric == "span":
+        return span(size, pick)
+    if metric == "consecutive":
+        return consecutive(size, pick)
+    raise ValueError(f"不支持的分布指标: {metric}（可选: {', '.join(METRICS)}）")
+
+
+def tail_probability(distribution: Dict, value) -> float:
+    """
+    取值的"典型程度": 概率不高于该取值的所有取值的概率之和（精确检验的 p 值）
+    
+    最常见的取值为 1，越罕见越接近 0；不可能出现的取值为 0。
+    """
+    p = distribution.get(value, 0.0)
+    if not p:
+        return 0.0
+    return min(1.0, sum(q for q in distribution.values() if q <= p * (1 + 1e-9)))
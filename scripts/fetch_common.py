@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据获取脚本共用的工具
+- ConnectionPool: HTTP 长连接池，按 (scheme, host) 复用连接
+- report_progress: 按彩种前缀输出进度，多线程并发时每行完整输出
+"""
+
+import http.client
+import threading
+from typing import Dict, List, Tuple
+
+DEFAULT_TIMEOUT = 30        # 连接超时秒数
+MAX_IDLE_PER_HOST = 4       # 连接池中每个主机保留的空闲连接数
+
+
+class ConnectionPool:
+    """
+    HTTP 长连接池，按 (scheme, host) 复用连接，线程安全
+    
+    多个彩种的数据源在同一主机上，并发同步时共享连接，省去重复的 TCP/TLS 握手。
+    """
+    
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST, timeout: float = DEFAULT_TIMEOUT):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        """取出一个空闲连接，没有则新建"""
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop()
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+    
+    def release(self, scheme: str, netloc: str, conn: http.client.HTTPConnection, reusable: bool = True):
+        """归还连接；响应未读完或出错的连接直接关闭"""
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault((scheme, netloc), [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+    
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+_print_lock = threading.Lock()
+
+
+def report_progress(name: str, message: str):
+    """按彩种输出进度，多线程并发时保证每行完整输出"""
+    with _print_lock:
+        print(f"[{name}] {message}", flush=True)
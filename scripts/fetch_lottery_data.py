@@ -16,6 +16,9 @@
     
     # 查看最新开奖
     python fetch_lottery_data.py --type ssq --latest
+    
+    # 查看指定期号
+    python fetch_lottery_data.py --type ssq --issue 2026016
 """
 
 import argparse
@@ -24,10 +27,18 @@ import os
 import sys
 import csv
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from draw_store import (
+    count_draws, find_by_issue, find_draw, issue_key, load_draws, read_draw, read_head, save_draws
+)
+from drawn_index import load_drawn_index
+from fetch_common import report_progress
+from synthetic_history import synthetic_draws
 
 # 配置日志
 logging.basicConfig(
@@ -40,17 +51,20 @@ logger = logging.getLogger(__name__)
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 
+# 并发处理的彩种数上限
+MAX_WORKERS = 4
+
 # 彩票配置
 LOTTERY_CONFIG = {
     "ssq": {
         "name": "双色球",
-        "data_file": DATA_DIR / "ssq" / "history.json",
+        "data_dir": DATA_DIR / "ssq",
         "red_range": (1, 33),
         "blue_range": (1, 16),
     },
     "dlt": {
         "name": "大乐透",
-        "data_file": DATA_DIR / "dlt" / "history.json",
+        "data_dir": DATA_DIR / "dlt",
         "front_range": (1, 35),
         "back_range": (1, 12),
     }
@@ -60,30 +74,41 @@ LOTTERY_CONFIG = {
 class LotteryDataManager:
     """彩票数据管理器"""
     
-    def __init__(self, lottery_type: str):
+    def __init__(self, lottery_type: str, data_dir: Optional[Path] = None):
         self.lottery_type = lottery_type.lower()
         self.config = LOTTERY_CONFIG[self.lottery_type]
-        self.data_file = self.config["data_file"]
-        self.data = self._load_data()
+        self.data_dir = data_dir or self.config["data_dir"]
+        self._data: Optional[List[Dict]] = None
+    
+    def progress(self, message: str):
+        """输出带彩种前缀的进度行（并发时每行完整输出）"""
+        report_progress(self.config["name"], message)
+    
+    @property
+    def data(self) -> List[Dict]:
+        """全部已有数据，首次访问时加载（只查询最新一期或某一期时不加载）"""
+        if self._data is None:
+            self._data = self._load_data()
+        return self._data
+    
+    @data.setter
+    def data(self, records: List[Dict]):
+        self._data = records
     
     def _load_data(self) -> List[Dict]:
-        """加载已有数据"""
-        if self.data_file.exists():
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.warning(f"加载数据失败: {e}")
+        """加载已有数据（最新一期在前）"""
+        try:
+            return load_draws(self.data_dir)
+        except Exception as e:
+            logger.warning(f"加载数据失败: {e}")
         return []
     
     def _save_data(self):
-        """保存数据"""
-        self.data_file.parent.mkdir(parents=True, exist_ok=True)
-        # 按期号降序排序
-        self.data.sort(key=lambda x: x.get("issue", ""), reverse=True)
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
-        logger.info(f"数据已保存: {self.data_file} ({len(self.data)} 条)")
+        """保存数据（写入时统一期号格式并按期号降序）"""
+        self.data = save_draws(self.data_dir, self.data, self.lottery_type)
+        # 写入数据后同步更新历史开奖组合索引，只读命令不再写数据目录
+        load_drawn_index(self.data_dir, self.lottery_type, persist=True)
+        logger.info(f"数据已保存: {self.data_dir} ({len(self.data)} 条)")
     
     def fetch_history_data(self, limit: int = 1000) -> Tuple[int, int]:
         """
@@ -94,17 +119,18 @@ class LotteryDataManager:
         """
         logger.info(f"正在获取 {self.config['name']} 历史数据，目标 {limit} 期...")
         
-        # TODO: 这里应该调用真实的历史数据API
+        # TODO: 这里应该调用真实的历史数据API（可通过 fetch_common.ConnectionPool 复用连接）
         # 目前使用模拟数据演示
         new_data = self._generate_mock_history_data(limit)
         
         # 合并数据（去重）
-        existing_issues = {item["issue"] for item in self.data}
+        existing_issues = {issue_key(item["issue"]) for item in self.data}
         added = 0
         for record in new_data:
-            if record["issue"] not in existing_issues:
+            key = issue_key(record["issue"])
+            if key not in existing_issues:
                 self.data.append(record)
-                existing_issues.add(record["issue"])
+                existing_issues.add(key)
                 added += 1
         
         self._save_data()
@@ -123,17 +149,18 @@ class LotteryDataManager:
         """
         logger.info(f"正在检查 {self.config['name']} 最新数据（最近{days}天）...")
         
-        # TODO: 这里应该调用真实的最新数据API
+        # TODO: 这里应该调用真实的最新数据API（可通过 fetch_common.ConnectionPool 复用连接）
         # 目前使用模拟数据演示
         new_data = self._generate_mock_latest_data(days)
         
         # 合并数据（去重）
-        existing_issues = {item["issue"] for item in self.data}
+        existing_issues = {issue_key(item["issue"]) for item in self.data}
         added = 0
         for record in new_data:
-            if record["issue"] not in existing_issues:
+            key = issue_key(record["issue"])
+            if key not in existing_issues:
                 self.data.append(record)
-                existing_issues.add(record["issue"])
+                existing_issues.add(key)
                 added += 1
         
         if added > 0:
@@ -159,6 +186,7 @@ class LotteryDataManager:
             raise FileNotFoundError(f"CSV文件不存在: {csv_file}")
         
         imported = 0
+        existing_issues = {issue_key(item["issue"]) for item in self.data}
         with open(csv_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             for row in reader:
@@ -183,8 +211,10 @@ class LotteryDataManager:
                         }
                     
                     # 检查是否已存在
-                    if not any(d["issue"] == record["issue"] for d in self.data):
+                    key = issue_key(record["issue"])
+                    if key not in existing_issues:
                         self.data.append(record)
+                        existing_issues.add(key)
                         imported += 1
                 except Exception as e:
                     logger.warning(f"导入行失败: {row}, 错误: {e}")
@@ -226,54 +256,43 @@ class LotteryDataManager:
         logger.info(f"导出完成: {len(data_to_export)} 条记录 -> {csv_file}")
     
     def get_stats(self) -> Dict:
-        """获取数据统计信息"""
-        if not self.data:
+        """获取数据统计信息（已加载到内存时以内存中的数据为准，可能尚未保存）"""
+        if self._data is not None:
+            count = len(self._data)
+            latest, oldest = (self._data[0], self._data[-1]) if self._data else (None, None)
+        else:
+            # 数据按期号降序存储: 第一条最新，最后一条最早，按偏移索引只读取这两条
+            count = count_draws(self.data_dir)
+            latest, oldest = read_head(self.data_dir), read_draw(self.data_dir, -1)
+        if latest is None or oldest is None:
             return {"count": 0, "latest_issue": None, "oldest_issue": None}
         
-        sorted_data = sorted(self.data, key=lambda x: x["issue"])
         return {
-            "count": len(self.data),
-            "latest_issue": sorted_data[-1]["issue"],
-            "latest_date": sorted_data[-1]["draw_date"],
-            "oldest_issue": sorted_data[0]["issue"],
-            "oldest_date": sorted_data[0]["draw_date"],
+            "count": count,
+            "latest_issue": latest["issue"],
+            "latest_date": latest["draw_date"],
+            "oldest_issue": oldest["issue"],
+            "oldest_date": oldest["draw_date"],
         }
     
+    def get_latest(self) -> Optional[Dict]:
+        """最新一期，不加载全部历史"""
+        if self._data is not None:
+            return self._data[0] if self._data else None
+        return read_head(self.data_dir)
+    
+    def get_draw(self, issue: str) -> Optional[Dict]:
+        """按期号查询单期开奖，不加载全部历史"""
+        if self._data is not None:
+            return find_by_issue(self._data, issue)
+        return find_draw(self.data_dir, issue)
+    
     def _generate_mock_history_data(self, limit: int) -> List[Dict]:
-        """生成模拟历史数据（用于测试）"""
+        """生成模拟历史数据（用于测试），按开奖日历截至今天，期号按年连续编号"""
         logger.info(f"生成 {limit} 条模拟历史数据...")
-        data = []
-        base_date = datetime.now() - timedelta(days=limit*3)
-        
-        for i in range(limit):
-            issue_date = base_date + timedelta(days=i*3)
-            
-            if self.lottery_type == "ssq":
-                year = issue_date.year
-                issue_num = i + 1
-                record = {
-                    "lottery_type": "ssq",
-                    "issue": f"{year}{issue_num:03d}",
-                    "draw_date": issue_date.strftime("%Y-%m-%d"),
-                    "red_balls": sorted(random.sample(range(1, 34), 6)),
-                    "blue_ball": random.randint(1, 16),
-                    "prize_info": {}
-                }
-            else:  # dlt
-                year = issue_date.year % 100
-                issue_num = i + 1
-                record = {
-                    "lottery_type": "dlt",
-                    "issue": f"{year}{issue_num:03d}",
-                    "draw_date": issue_date.strftime("%Y-%m-%d"),
-                    "front_zone": sorted(random.sample(range(1, 36), 5)),
-                    "back_zone": sorted(random.sample(range(1, 13), 2)),
-                    "prize_info": {}
-                }
-            
-            data.append(record)
-        
-        return data
+        draws = synthetic_draws(self.lottery_type, limit, end=date.today(),
+                                seed=random.randrange(2 ** 32))
+        return [dict(draw) for draw in draws]
     
     def _generate_mock_latest_data(self, days: int) -> List[Dict]:
         """生成模拟最新数据（用于测试）"""
@@ -313,6 +332,96 @@ class LotteryDataManager:
         return data
 
 
+def process_lottery(manager: LotteryDataManager, args) -> Optional[Tuple[int, int]]:
+    """
+    执行单个彩种的操作，结果逐行通过 manager.progress 实时输出
+    
+    Returns: 获取/更新/导入时为 (新增数量, 总数量)，其他操作为 None
+    """
+    progress = manager.progress
+    result = None
+    if args.history:
+        # 获取历史数据
+        result = manager.fetch_history_data(args.limit)
+        progress("✅ 历史数据获取完成")
+        progress(f"   新增: {result[0]} 条")
+        progress(f"   总计: {result[1]} 条")
+    
+    elif args.update:
+        # 增量更新
+        result = manager.fetch_latest_data(args.days)
+        progress("✅ 增量更新完成")
+        progress(f"   新增: {result[0]} 条")
+        progress(f"   总计: {result[1]} 条")
+    
+    elif args.import_file:
+        # 从CSV导入
+        result = manager.import_from_csv(args.import_file)
+        progress("✅ CSV导入完成")
+        progress(f"   导入: {result[0]} 条")
+        progress(f"   总计: {result[1]} 条")
+    
+    elif args.export_file:
+        # 导出到CSV
+        manager.export_to_csv(args.export_file, args.export_limit)
+    
+    elif args.stats:
+        # 显示统计
+        stats = manager.get_stats()
+        progress("📊 数据统计")
+        progress(f"   总记录数: {stats['count']}")
+        if stats['count'] > 0:
+            progress(f"   最新期号: {stats['latest_issue']} ({stats['latest_date']})")
+            progress(f"   最早期号: {stats['oldest_issue']} ({stats['oldest_date']})")
+    
+    elif args.latest or args.issue:
+        # 显示最新开奖 / 指定期号
+        if args.issue:
+            draw = manager.get_draw(args.issue)
+            title = f"第 {args.issue} 期开奖"
+        else:
+            draw = manager.get_latest()
+            title = "最新开奖"
+        if draw:
+            progress(f"🎱 {title}")
+            progress(f"   期号: {draw['issue']}")
+            progress(f"   日期: {draw['draw_date']}")
+            if manager.lottery_type == "ssq":
+                progress(f"   红球: {' '.join(f'{x:02d}' for x in draw['red_balls'])}")
+                progress(f"   蓝球: {draw['blue_ball']:02d}")
+            else:
+                progress(f"   前区: {' '.join(f'{x:02d}' for x in draw['front_zone'])}")
+                progress(f"   后区: {' '.join(f'{x:02d}' for x in draw['back_zone'])}")
+        else:
+            progress("   暂无数据")
+    
+    return result
+
+
+def process_all(managers: List[LotteryDataManager], args,
+                max_workers: int = MAX_WORKERS) -> Dict[str, Optional[Tuple[int, int]]]:
+    """
+    并发执行多个彩种的操作，每个彩种一条独立的流水线
+    
+    进度按彩种前缀逐行输出，不等其他彩种完成。
+    
+    Returns: {彩种: process_lottery 的结果}，失败的彩种不在结果中
+    """
+    results = {}
+    workers = max(1, min(max_workers, len(managers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_lottery, manager, args): manager for manager in managers}
+        for future in as_completed(futures):
+            manager = futures[future]
+            try:
+                results[manager.lottery_type] = future.result()
+            except Exception as e:
+                manager.progress(f"❌ 处理出错: {e}")
+                import traceback
+                traceback.print_exc()
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="彩票数据获取工具 - 分离历史数据和增量更新",
@@ -338,15 +447,20 @@ def main():
   # 查看最新开奖
   %(prog)s --type ssq --latest
   
+  # 查看指定期号
+  %(prog)s --type ssq --issue 2026016
+  
   # 更新所有彩种
   %(prog)s --all --update
         """
     )
     
-    parser.add_argument("--type", "-t", choices=["ssq", "dlt"],
+    parser.add_argument("--type", "-t", choices=list(LOTTERY_CONFIG),
                        help="彩票类型: ssq=双色球, dlt=大乐透")
     parser.add_argument("--all", "-a", action="store_true",
-                       help="处理所有彩种")
+                       help="处理所有彩种（并发执行）")
+    parser.add_argument("--workers", "-w", type=int, default=MAX_WORKERS,
+                       help=f"并发处理的彩种数上限 (默认: {MAX_WORKERS})")
     
     # 历史数据获取
     parser.add_argument("--history", action="store_true",
@@ -373,6 +487,8 @@ def main():
                        help="显示数据统计信息")
     parser.add_argument("--latest", action="store_true",
                        help="显示最新开奖信息")
+    parser.add_argument("--issue",
+                       help="显示指定期号的开奖信息")
     
     args = parser.parse_args()
     
@@ -381,67 +497,10 @@ def main():
         parser.print_help()
         sys.exit(1)
     
-    types = ["ssq", "dlt"] if args.all else [args.type]
+    types = list(LOTTERY_CONFIG) if args.all else [args.type]
     
-    # 执行操作
-    for lottery_type in types:
-        try:
-            manager = LotteryDataManager(lottery_type)
-            
-            if args.history:
-                # 获取历史数据
-                added, total = manager.fetch_history_data(args.limit)
-                print(f"\n✅ {manager.config['name']} 历史数据获取完成")
-                print(f"   新增: {added} 条")
-                print(f"   总计: {total} 条")
-                
-            elif args.update:
-                # 增量更新
-                added, total = manager.fetch_latest_data(args.days)
-                print(f"\n✅ {manager.config['name']} 增量更新完成")
-                print(f"   新增: {added} 条")
-                print(f"   总计: {total} 条")
-                
-            elif args.import_file:
-                # 从CSV导入
-                imported, total = manager.import_from_csv(args.import_file)
-                print(f"\n✅ {manager.config['name']} CSV导入完成")
-                print(f"   导入: {imported} 条")
-                print(f"   总计: {total} 条")
-                
-            elif args.export_file:
-                # 导出到CSV
-                manager.export_to_csv(args.export_file, args.export_limit)
-                
-            elif args.stats:
-                # 显示统计
-                stats = manager.get_stats()
-                print(f"\n📊 {manager.config['name']} 数据统计")
-                print(f"   总记录数: {stats['count']}")
-                if stats['count'] > 0:
-                    print(f"   最新期号: {stats['latest_issue']} ({stats['latest_date']})")
-                    print(f"   最早期号: {stats['oldest_issue']} ({stats['oldest_date']})")
-                    
-            elif args.latest:
-                # 显示最新开奖
-                if manager.data:
-                    latest = max(manager.data, key=lambda x: x['issue'])
-                    print(f"\n🎱 {manager.config['name']} 最新开奖")
-                    print(f"   期号: {latest['issue']}")
-                    print(f"   日期: {latest['draw_date']}")
-                    if lottery_type == "ssq":
-                        print(f"   红球: {' '.join(f'{x:02d}' for x in latest['red_balls'])}")
-                        print(f"   蓝球: {latest['blue_ball']:02d}")
-                    else:
-                        print(f"   前区: {' '.join(f'{x:02d}' for x in latest['front_zone'])}")
-                        print(f"   后区: {' '.join(f'{x:02d}' for x in latest['back_zone'])}")
-                else:
-                    print(f"   暂无数据")
-                    
-        except Exception as e:
-            logger.error(f"处理 {lottery_type} 时出错: {e}")
-            import traceback
-            traceback.print_exc()
+    # 各彩种的流水线互不依赖，多个彩种时并发执行
+    process_all([LotteryDataManager(t) for t in types], args, args.workers)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,13 @@
     
     # 基于固定号码生成组合
     python generate_fixed_numbers.py --type dlt --fixed-red 05,12 --generate --count 3
+    
+    # 批量查询历史最相似的开奖（每行一注，如 07,18,25,30,31,33+14）
+    python generate_fixed_numbers.py --type ssq --similar-file tickets.txt --similar 3
+    
+    # 批量查询号码是否开出过；生成时排除历史开奖组合
+    python generate_fixed_numbers.py --type ssq --check-file tickets.txt
+    python generate_fixed_numbers.py --type ssq --generate --count 5 --exclude-drawn
 """
 
 import argparse
@@ -24,10 +31,23 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
+from analyze_history import LotteryAnalyzer
+from draw_bits import ac_value, mask_of, tail_counts, zone_masks
+from draw_store import load_draws
+from drawn_index import load_drawn_index
+from exact_distributions import tail_probability
+from similar_draws import DEFAULT_TOP_K, DrawIndex
+
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 
+# 排除历史开奖组合时，每注最多重新生成的次数
+MAX_REDRAWS = 1000
+
+# 形态典型程度（概率不高于它的形态的总概率）不低于此值的奇偶比/大小比计 2 分
+TYPICAL_TAIL = 0.25
+
 # 彩票配置
 LOTTERY_CONFIG = {
     "ssq": {
@@ -37,7 +57,7 @@ LOTTERY_CONFIG = {
         "red_count": 6,
         "blue_count": 1,
         "big_boundary": 17,
-        "data_file": DATA_DIR / "ssq" / "history.json"
+        "data_dir": DATA_DIR / "ssq"
     },
     "dlt": {
         "name": "大乐透",
@@ -46,7 +66,7 @@ LOTTERY_CONFIG = {
         "front_count": 5,
         "back_count": 2,
         "big_boundary": 18,
-        "data_file": DATA_DIR / "dlt" / "history.json"
+        "data_dir": DATA_DIR / "dlt"
     }
 }
 
@@ -54,23 +74,26 @@ LOTTERY_CONFIG = {
 class LotteryPredictor:
     """彩票号码预测器（娱乐性质）"""
     
-    def __init__(self, lottery_type: str):
+    def __init__(self, lottery_type: str, data_dir: Optional[Path] = None):
         self.lottery_type = lottery_type.lower()
         config = LOTTERY_CONFIG.get(self.lottery_type)
         if not config:
             raise ValueError(f"不支持的彩票类型: {lottery_type}")
         
         self.config: Dict = config
+        self.data_dir: Path = data_dir or config["data_dir"]
         self.history_data = self._load_history()
         self.hot_numbers = self._calculate_hot_numbers()
+        # 分析器（精确概率分布），首次使用时创建
+        self._analyzer: Optional[LotteryAnalyzer] = None
+        # 历史开奖的前区 AC 值分布，首次使用时由已加载的历史数据统计
+        self._ac_distribution: Optional[Counter] = None
+        # 相似开奖查询索引，首次查询时构建
+        self._draw_index: Optional[DrawIndex] = None
     
     def _load_history(self) -> List[Dict]:
-        """加载历史数据"""
-        if not self.config["data_file"].exists():
-            return []
-        
-        with open(self.config["data_file"], 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """加载历史数据（最新一期在前）"""
+        return load_draws(self.data_dir)
     
     def _calculate_hot_numbers(self) -> List[int]:
         """计算热号"""
@@ -90,6 +113,82 @@ class LotteryPredictor:
             counter = Counter(all_numbers)
             return [num for num, _ in counter.most_common(10)]
     
+    @property
+    def analyzer(self) -> LotteryAnalyzer:
+        """分析器，与其他脚本共用分析结果缓存；精确分布另有磁盘缓存"""
+        if self._analyzer is None:
+            self._analyzer = LotteryAnalyzer(self.lottery_type, self.data_dir)
+        return self._analyzer
+    
+    def _history_ac(self) -> Counter:
+        """已加载历史开奖的前区 AC 值分布（只统计一次，不重新读取数据）"""
+        if self._ac_distribution is None:
+            masks = zone_masks(self.history_data, self.lottery_type)[0]
+            self._ac_distribution = Counter(ac_value(mask) for mask in masks)
+        return self._ac_distribution
+    
+    def _pattern_score(self, metric: str, value: str, pick: int) -> Tuple[float, int]:
+        """
+        号码形态在随机选出 pick 个号码时的精确概率，以及评分
+        
+        形态越典型（概率不高于它的所有形态的总概率越大）越接近随机选号的常见情况，
+        不低于 TYPICAL_TAIL 计 2 分，否则 1 分。没有选号码时（形态只能是 "0:0"，
+        概率为 1）无从评判，计中性的 1 分。
+        """
+        distribution = self.analyzer.expected_distribution(metric, pick)
+        if pick == 0:
+            return distribution.get(value, 0.0), 1
+        score = 2 if tail_probability(distribution, value) >= TYPICAL_TAIL else 1
+        return distribution.get(value, 0.0), score
+    
+    def draw_index(self) -> DrawIndex:
+        """历史开奖的位列索引（对已加载的历史数据只构建一次）"""
+        if self._draw_index is None:
+            self._draw_index = DrawIndex(self.history_data, self.lottery_type)
+        return self._draw_index
+    
+    def validate_ticket(self, front: List[int], back: List[int]):
+        """验证一注号码（可以只选部分号码），不合法时抛出 ValueError"""
+        checks = ((front, "red"), (back, "blue")) if self.lottery_type == "ssq" else ((front, "front"), (back, "back"))
+        for numbers, num_type in checks:
+            # 蓝球在单独分析时必须选 1 个，查询相似开奖时允许不选
+            if num_type == "blue" and not numbers:
+                continue
+            valid, msg = self.validate_numbers(numbers, num_type)
+            if not valid:
+                raise ValueError(msg)
+    
+    def _validate_tickets(self, tickets: List[Tuple[List[int], List[int]]]):
+        for i, (front, back) in enumerate(tickets, 1):
+            try:
+                self.validate_ticket(front, back)
+            except ValueError as e:
+                raise ValueError(f"第 {i} 注: {e}") from None
+    
+    def find_similar(self, tickets: List[Tuple[List[int], List[int]]], k: int = DEFAULT_TOP_K) -> List[List[Dict]]:
+        """
+        每注号码与历史开奖重合最多的 k 期（先比红球/前区命中，再比蓝球/后区命中，同分较新的在前）
+        
+        Args:
+            tickets: [(红球/前区号码, 蓝球/后区号码)]，号码可以不选满
+        """
+        self._validate_tickets(tickets)
+        return self.draw_index().similar_batch([(mask_of(front), mask_of(back)) for front, back in tickets], k)
+    
+    def check_drawn(self, tickets: List[Tuple[List[int], List[int]]]) -> List[Dict]:
+        """
+        每注号码是否在历史上开出过: front_drawn 为红球/前区组合开出过，
+        full_drawn 为连同蓝球/后区完全相同（未选蓝球/后区的号码为 False）
+        """
+        self._validate_tickets(tickets)
+        index = load_drawn_index(self.data_dir, self.lottery_type)
+        fronts = [mask_of(front) for front, _ in tickets]
+        backs = [mask_of(back) for _, back in tickets]
+        front_drawn = index.contains_batch(fronts)
+        full_drawn = index.contains_batch(fronts, backs)
+        return [{"front_drawn": f, "full_drawn": full and bool(back)}
+                for f, full, back in zip(front_drawn, full_drawn, backs)]
+    
     def validate_numbers(self, numbers: List[int], num_type: str) -> Tuple[bool, str]:
         """验证号码有效性"""
         if self.lottery_type == "ssq":
@@ -123,8 +222,9 @@ class LotteryPredictor:
         
         return True, "验证通过"
     
-    def analyze_fixed_numbers(self, fixed_red: List[int], fixed_blue: List[int]) -> Dict:
-        """分析固定号码"""
+    def analyze_fixed_numbers(self, fixed_red: List[int], fixed_blue: List[int],
+                              similar: int = DEFAULT_TOP_K) -> Dict:
+        """分析固定号码；similar 为列出的历史最相似开奖期数（0 不列出）"""
         # 验证号码
         if self.lottery_type == "ssq":
             valid, msg = self.validate_numbers(fixed_red, "red")
@@ -178,12 +278,18 @@ class LotteryPredictor:
             even_count = len(fixed_red) - odd_count
             big_count = sum(1 for n in fixed_red if n >= self.config["big_boundary"])
             small_count = len(fixed_red) - big_count
+            odd_even_probability, odd_even_score = self._pattern_score(
+                "odd_even", f"{odd_count}:{even_count}", len(fixed_red))
+            big_small_probability, big_small_score = self._pattern_score(
+                "big_small", f"{big_count}:{small_count}", len(fixed_red))
             
             evaluation = {
                 "odd_even_ratio": f"{odd_count}:{even_count}",
-                "odd_even_score": 2 if abs(odd_count - even_count) <= 1 else 1,
+                "odd_even_probability": round(odd_even_probability, 4),
+                "odd_even_score": odd_even_score,
                 "big_small_ratio": f"{big_count}:{small_count}",
-                "big_small_score": 2 if abs(big_count - small_count) <= 1 else 1,
+                "big_small_probability": round(big_small_probability, 4),
+                "big_small_score": big_small_score,
                 "fixed_red_count": len(fixed_red),
                 "fixed_blue_count": len(fixed_blue),
                 "need_red": 6 - len(fixed_red),
@@ -224,18 +330,33 @@ class LotteryPredictor:
             even_count = len(fixed_red) - odd_count
             big_count = sum(1 for n in fixed_red if n >= self.config["big_boundary"])
             small_count = len(fixed_red) - big_count
+            odd_even_probability, odd_even_score = self._pattern_score(
+                "odd_even", f"{odd_count}:{even_count}", len(fixed_red))
+            big_small_probability, big_small_score = self._pattern_score(
+                "big_small", f"{big_count}:{small_count}", len(fixed_red))
             
             evaluation = {
                 "odd_even_ratio": f"{odd_count}:{even_count}",
-                "odd_even_score": 2 if abs(odd_count - even_count) <= 1 else 1,
+                "odd_even_probability": round(odd_even_probability, 4),
+                "odd_even_score": odd_even_score,
                 "big_small_ratio": f"{big_count}:{small_count}",
-                "big_small_score": 2 if abs(big_count - small_count) <= 1 else 1,
+                "big_small_probability": round(big_small_probability, 4),
+                "big_small_score": big_small_score,
                 "fixed_front_count": len(fixed_red),
                 "fixed_back_count": len(fixed_blue),
                 "need_front": 5 - len(fixed_red),
                 "need_back": 2 - len(fixed_blue)
             }
         
+        # AC 值和尾数；号码选满时与历史开奖的 AC 值分布比较
+        mask = mask_of(fixed_red)
+        evaluation["ac_value"] = ac_value(mask)
+        evaluation["tail_digits"] = {digit: count for digit, count in enumerate(tail_counts(mask)) if count}
+        pick = self.config["red_count"] if self.lottery_type == "ssq" else self.config["front_count"]
+        if len(fixed_red) == pick and self.history_data:
+            same = self._history_ac()[evaluation["ac_value"]]
+            evaluation["ac_history_rate"] = round(same / len(self.history_data) * 100, 2)
+        
         total_score = evaluation.get("odd_even_score", 0) + evaluation.get("big_small_score", 0)
         evaluation["total_score"] = total_score
         evaluation["max_score"] = 4
@@ -248,15 +369,24 @@ class LotteryPredictor:
             "fixed_blue": fixed_blue,
             "number_stats": number_stats,
             "evaluation": evaluation,
+            "similar_draws": self.find_similar([(fixed_red, fixed_blue)], similar)[0] if similar > 0 else [],
             "analysis_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     
     def generate_combinations(self, fixed_red: Optional[List[int]] = None, fixed_blue: Optional[List[int]] = None, 
-                             count: int = 3, mode: str = "random") -> List[Dict]:
-        """生成号码组合"""
+                             count: int = 3, mode: str = "random", exclude_drawn: bool = False) -> List[Dict]:
+        """
+        生成号码组合
+        
+        每注标记红球/前区组合是否在历史上开出过（drawn_before）；exclude_drawn 时重新生成这样的组合，
+        固定号码过多、可选组合几乎都开出过时，重试 MAX_REDRAWS 次后保留并标记。
+        """
         combinations = []
+        drawn_index = load_drawn_index(self.data_dir, self.lottery_type)
+        redraws = 0
         
-        for i in range(count):
+        while len(combinations) < count:
+            i = len(combinations)
             if self.lottery_type == "ssq":
                 # 红球
                 if fixed_red:
@@ -317,9 +447,73 @@ class LotteryPredictor:
                     "fixed_front": fixed_red if fixed_red else [],
                     "fixed_back": fixed_blue if fixed_blue else []
                 })
+            
+            combo = combinations[-1]
+            front = combo["red_balls"] if self.lottery_type == "ssq" else combo["front_zone"]
+            combo["drawn_before"] = drawn_index.contains(mask_of(front))
+            if combo["drawn_before"] and exclude_drawn and redraws < MAX_REDRAWS:
+                combinations.pop()
+                redraws += 1
+            else:
+                redraws = 0
         
         return combinations
     
+    def _similar_table(self, matches: List[Dict]) -> List[str]:
+        """相似开奖表格（Markdown 行）"""
+        zone = "红球+蓝球" if self.lottery_type == "ssq" else "前区+后区"
+        lines = [f"| 期号 | 日期 | 开奖号码 | 命中（{zone}） | Jaccard |",
+                 "|------|------|----------|------|---------|"]
+        for match in matches:
+            front = ' '.join(f'{n:02d}' for n in match["front"])
+            back = ' '.join(f'{n:02d}' for n in match["back"])
+            lines.append(f"| {match['issue']} | {match['draw_date'] or '-'} | {front} + {back} | "
+                         f"{match['front_matches']}+{match['back_matches']} | {match['jaccard']} |")
+        return lines
+    
+    def generate_similar_report(self, tickets: List[Tuple[List[int], List[int]]], results: List[List[Dict]]) -> str:
+        """批量相似开奖查询的文本报告"""
+        lines = [f"## 🔍 {self.config['name']}历史最相似开奖查询", ""]
+        lines.append(f"共 {len(tickets)} 注，对比 {len(self.history_data)} 期历史开奖")
+        lines.append("")
+        for i, ((front, back), matches) in enumerate(zip(tickets, results), 1):
+            numbers = ' '.join(f'{n:02d}' for n in sorted(front))
+            if back:
+                numbers += " + " + ' '.join(f'{n:02d}' for n in sorted(back))
+            lines.append(f"### 第{i}注: {numbers}")
+            lines.append("")
+            lines.extend(self._similar_table(matches))
+            lines.append("")
+        lines.append("---")
+        lines.append("")
+        lines.append("⚠️ **重要声明**: 历史开奖与未来开奖相互独立，与历史开奖相似不代表中奖概率更高或更低。")
+        return "\n".join(lines)
+    
+    def generate_check_report(self, tickets: List[Tuple[List[int], List[int]]], results: List[Dict]) -> str:
+        """批量查询是否开出过的文本报告，只列出开出过的号码"""
+        zone = "红球" if self.lottery_type == "ssq" else "前区"
+        front_count = sum(r["front_drawn"] for r in results)
+        full_count = sum(r["full_drawn"] for r in results)
+        lines = [f"## 🗂️ {self.config['name']}历史开奖组合查询", ""]
+        lines.append(f"共 {len(tickets)} 注，对比 {len(self.history_data)} 期历史开奖: "
+                     f"{zone}组合开出过 {front_count} 注，整注完全相同 {full_count} 注")
+        lines.append("")
+        if front_count:
+            lines.append("| 序号 | 号码 | 开出过 |")
+            lines.append("|------|------|--------|")
+            for i, ((front, back), result) in enumerate(zip(tickets, results), 1):
+                if not result["front_drawn"]:
+                    continue
+                numbers = ' '.join(f'{n:02d}' for n in sorted(front))
+                if back:
+                    numbers += " + " + ' '.join(f'{n:02d}' for n in sorted(back))
+                lines.append(f"| {i} | {numbers} | {'整注' if result['full_drawn'] else zone} |")
+            lines.append("")
+        lines.append("---")
+        lines.append("")
+        lines.append("⚠️ **重要声明**: 每期开奖相互独立，开出过的组合再次开出的概率与其他组合相同。")
+        return "\n".join(lines)
+    
     def generate_report(self, analysis_result: Dict, combinations: Optional[List[Dict]] = None) -> str:
         """生成文本报告"""
         lines = []
@@ -358,8 +552,14 @@ class LotteryPredictor:
         lines.append("### ⚖️ 组合合理性评估")
         lines.append("")
         lines.append("**当前组合特征:**")
-        lines.append(f"- 奇偶比: {eval_info['odd_even_ratio']}")
-        lines.append(f"- 大小比: {eval_info['big_small_ratio']}")
+        lines.append(f"- 奇偶比: {eval_info['odd_even_ratio']}（随机选号出现概率 {eval_info['odd_even_probability']:.1%}）")
+        lines.append(f"- 大小比: {eval_info['big_small_ratio']}（随机选号出现概率 {eval_info['big_small_probability']:.1%}）")
+        if "ac_history_rate" in eval_info:
+            lines.append(f"- AC 值: {eval_info['ac_value']}（历史开奖中 AC 值相同的占 {eval_info['ac_history_rate']}%）")
+        else:
+            lines.append(f"- AC 值: {eval_info['ac_value']}")
+        if eval_info["tail_digits"]:
+            lines.append(f"- 尾数: {'、'.join(f'{d}尾×{c}' for d, c in eval_info['tail_digits'].items())}")
         if self.lottery_type == "ssq":
             lines.append(f"- 已选红球: {eval_info['fixed_red_count']}个（需补充{eval_info['need_red']}个）")
         else:
@@ -368,6 +568,13 @@ class LotteryPredictor:
         lines.append(f"**评估结果:** {eval_info['rating']} ({eval_info['total_score']}/{eval_info['max_score']}分)")
         lines.append("")
         
+        # 历史最相似开奖
+        if analysis_result.get("similar_draws"):
+            lines.append("### 🔍 历史最相似开奖")
+            lines.append("")
+            lines.extend(self._similar_table(analysis_result["similar_draws"]))
+            lines.append("")
+        
         # 推荐组合
         if combinations:
             lines.append("### 🎲 推荐组合（娱乐性质）")
@@ -376,7 +583,7 @@ class LotteryPredictor:
             lines.append("")
             
             for combo in combinations:
-                lines.append(f"#### 组合 {combo['id']}")
+                lines.append(f"#### 组合 {combo['id']}" + ("（该组合历史上开出过）" if combo.get("drawn_before") else ""))
                 if self.lottery_type == "ssq":
                     red_str = ' '.join(f'{n:02d}' for n in combo['red_balls'])
                     lines.append(f"🔴 红球: {red_str}")
@@ -399,6 +606,29 @@ class LotteryPredictor:
         return "\n".join(lines)
 
 
+def parse_ticket(line: str) -> Tuple[List[int], List[int]]:
+    """解析一注号码: 红球/前区逗号或空格分隔，"+" 后为蓝球/后区，如 07,18,25,30,31,33+14"""
+    front_text, _, back_text = line.partition("+")
+    front = [int(n) for n in front_text.replace(",", " ").split()]
+    back = [int(n) for n in back_text.replace(",", " ").split()]
+    return front, back
+
+
+def load_tickets(path: str) -> List[Tuple[List[int], List[int]]]:
+    """读取号码文件: 每行一注，忽略空行和 # 开头的注释行"""
+    tickets = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                tickets.append(parse_ticket(line))
+            except ValueError:
+                raise ValueError(f"{path} 第 {line_number} 行号码格式错误: {line}") from None
+    return tickets
+
+
 def main():
     parser = argparse.ArgumentParser(description="固定号码分析和号码生成工具")
     parser.add_argument("--type", "-t", choices=["ssq", "dlt"], required=True, help="彩票类型")
@@ -407,6 +637,11 @@ def main():
     parser.add_argument("--generate", "-g", action="store_true", help="生成号码组合")
     parser.add_argument("--count", "-c", type=int, default=3, help="生成组合数量")
     parser.add_argument("--mode", "-m", choices=["random", "weighted"], default="random", help="生成模式")
+    parser.add_argument("--similar", type=int, default=DEFAULT_TOP_K,
+                        help=f"列出历史最相似的开奖期数 (默认: {DEFAULT_TOP_K}，0 为不列出)")
+    parser.add_argument("--similar-file", help="批量查询历史最相似开奖的号码文件（每行一注，如 07,18,25,30,31,33+14）")
+    parser.add_argument("--exclude-drawn", action="store_true", help="生成组合时排除历史上开出过的红球/前区组合")
+    parser.add_argument("--check-file", help="批量查询号码是否在历史上开出过的号码文件（格式同 --similar-file）")
     parser.add_argument("--output", "-o", help="输出文件路径")
     
     args = parser.parse_args()
@@ -425,9 +660,15 @@ def main():
             fixed_blue = [int(n.strip()) for n in args.fixed_blue.split(",")]
         
         # 分析或生成
-        if fixed_red or fixed_blue:
+        if args.check_file:
+            tickets = load_tickets(args.check_file)
+            report = predictor.generate_check_report(tickets, predictor.check_drawn(tickets))
+        elif args.similar_file:
+            tickets = load_tickets(args.similar_file)
+            report = predictor.generate_similar_report(tickets, predictor.find_similar(tickets, max(args.similar, 1)))
+        elif fixed_red or fixed_blue:
             # 分析固定号码
-            analysis = predictor.analyze_fixed_numbers(fixed_red, fixed_blue)
+            analysis = predictor.analyze_fixed_numbers(fixed_red, fixed_blue, args.similar)
             
             # 生成组合
             combinations = None
@@ -436,7 +677,8 @@ def main():
                     fixed_red if fixed_red else None,
                     fixed_blue if fixed_blue else None,
                     args.count,
-                    args.mode
+                    args.mode,
+                    args.exclude_drawn
                 )
             
             report = predictor.generate_report(analysis, combinations)
@@ -444,7 +686,8 @@ def main():
             # 仅生成随机号码
             combinations = predictor.generate_combinations(
                 count=args.count,
-                mode=args.mode
+                mode=args.mode,
+                exclude_drawn=args.exclude_drawn
             )
             
             lines = ["## 🎲 机选号码生成结果", ""]
@@ -455,7 +698,7 @@ def main():
             lines.append("")
             
             for combo in combinations:
-                lines.append(f"### 第{combo['id']}注")
+                lines.append(f"### 第{combo['id']}注" + ("（该组合历史上开出过）" if combo.get("drawn_before") else ""))
                 if args.type == "ssq":
                     red_str = ' '.join(f'{n:02d}' for n in combo['red_balls'])
                     lines.append(f"🔴 红球: {red_str}")
@@ -478,7 +721,7 @@ def main():
             print(f"✅ 报告已保存到: {args.output}")
         else:
             print(report)
-            
+    
     except Exception as e:
         print(f"❌ 错误: {e}", file=sys.stderr)
         sys.exit(1)
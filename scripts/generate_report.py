@@ -15,15 +15,31 @@ import json
 import os
 import re
 import sys
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
+from analyze_history import LotteryAnalyzer
+from draw_store import read_head
+from profiling import StageProfiler, profiled
+
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 TEMPLATE_DIR = PROJECT_ROOT / "templates"
 
+# 走势图行编码: 每个遗漏值 2 位 36 进制（0-1295，更大的值截断）
+_TREND_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_TREND_CODES = [a + b for a in _TREND_DIGITS for b in _TREND_DIGITS]
+
+# 滚动窗口趋势图的窗口期数和展示的热号个数
+ROLLING_WINDOW = 30
+ROLLING_HOT_NUMBERS = 5
+
+# 热力图 bootstrap 区间标签
+_INTERVAL_LABELS = {"hot": "显著偏热", "cold": "显著偏冷", "normal": "随机波动范围内"}
+
 # 彩票配置
 LOTTERY_CONFIG = {
     "ssq": {
@@ -31,14 +47,14 @@ LOTTERY_CONFIG = {
         "name_en": "SSQ",
         "red_range": (1, 33),
         "blue_range": (1, 16),
-        "data_file": DATA_DIR / "ssq" / "history.json",
+        "data_dir": DATA_DIR / "ssq",
     },
     "dlt": {
         "name": "大乐透",
         "name_en": "DLT",
         "front_range": (1, 35),
         "back_range": (1, 12),
-        "data_file": DATA_DIR / "dlt" / "history.json",
+        "data_dir": DATA_DIR / "dlt",
     }
 }
 
@@ -46,12 +62,15 @@ LOTTERY_CONFIG = {
 class ReportGenerator:
     """HTML 报告生成器"""
     
-    def __init__(self, lottery_type: str):
+    def __init__(self, lottery_type: str, data_dir: Optional[Path] = None,
+                 profiler: Optional[StageProfiler] = None):
         self.lottery_type = lottery_type.lower()
         config = LOTTERY_CONFIG.get(self.lottery_type)
         if not config:
             raise ValueError(f"不支持的彩票类型: {lottery_type}")
         self.config = config
+        self.data_dir: Path = data_dir or config["data_dir"]
+        self.profiler = profiler
         
         # 加载模板
         template_path = TEMPLATE_DIR / "report_template.html"
@@ -69,14 +88,13 @@ class ReportGenerator:
         else:
             self.css_content = ""
     
-    def load_analysis_data(self, periods: int = 100) -> Dict:
-        """从分析脚本加载数据"""
-        # 导入分析器
-        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
-        from analyze_history import LotteryAnalyzer
-        
-        analyzer = LotteryAnalyzer(self.lottery_type)
-        return analyzer.full_analysis(periods)
+    def _new_analyzer(self) -> LotteryAnalyzer:
+        """分析器: 一次报告生成中各节共用同一个，开奖数据只加载一次"""
+        return LotteryAnalyzer(self.lottery_type, self.data_dir, profiler=self.profiler)
+    
+    def load_analysis_data(self, periods: int = 100, intervals: bool = False) -> Dict:
+        """从分析脚本加载数据，intervals=True 时附带热力图用的 bootstrap 置信区间"""
+        return self._new_analyzer().full_analysis(periods, intervals=intervals)
     
     def load_json_data(self, json_path: str) -> Dict:
         """从 JSON 文件加载分析数据"""
@@ -89,6 +107,7 @@ class ReportGenerator:
             return f"{num:02d}"
         return str(num).zfill(2)
     
+    @profiled("report.hot_cold")
     def _generate_hot_cold_section(self, analysis_data: Dict) -> Dict:
         """生成热号冷号部分的数据"""
         hot_cold = analysis_data.get("hot_cold", {})
@@ -124,7 +143,7 @@ class ReportGenerator:
             hot_data = [count for _, count in red_hot[:10]]
             cold_labels = [self._format_number(num) for num, _ in red_cold[:10]]
             cold_data = [count for _, count in red_cold[:10]]
-            
+        
         else:  # dlt
             front_hot = hot_cold.get("front_zone", {}).get("hot", [])
             front_cold = hot_cold.get("front_zone", {}).get("cold", [])
@@ -164,9 +183,11 @@ class ReportGenerator:
             "COLD_DATA": json.dumps(cold_data)
         }
     
-    def _generate_odd_even_section(self, analysis_data: Dict) -> Dict:
+    @profiled("report.odd_even")
+    def _generate_odd_even_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
         """生成奇偶比部分的数据"""
         odd_even = analysis_data.get("odd_even", {})
+        expected = analyzer.expected_distribution("odd_even")
         
         odd_even_data = []
         labels = []
@@ -177,7 +198,8 @@ class ReportGenerator:
             odd_even_data.append({
                 "RATIO": ratio,
                 "COUNT": count,
-                "PERCENTAGE": f"{pct:.1f}"
+                "PERCENTAGE": f"{pct:.1f}",
+                "EXPECTED": f"{expected.get(ratio, 0.0) * 100:.1f}"
             })
             labels.append(ratio)
             values.append(count)
@@ -188,9 +210,11 @@ class ReportGenerator:
             "ODD_EVEN_VALUES": json.dumps(values)
         }
     
-    def _generate_big_small_section(self, analysis_data: Dict) -> Dict:
+    @profiled("report.big_small")
+    def _generate_big_small_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
         """生成大小比部分的数据"""
         big_small = analysis_data.get("big_small", {})
+        expected = analyzer.expected_distribution("big_small")
         
         big_small_data = []
         labels = []
@@ -201,7 +225,8 @@ class ReportGenerator:
             big_small_data.append({
                 "RATIO": ratio,
                 "COUNT": count,
-                "PERCENTAGE": f"{pct:.1f}"
+                "PERCENTAGE": f"{pct:.1f}",
+                "EXPECTED": f"{expected.get(ratio, 0.0) * 100:.1f}"
             })
             labels.append(ratio)
             values.append(count)
@@ -212,6 +237,7 @@ class ReportGenerator:
             "BIG_SMALL_VALUES": json.dumps(values)
         }
     
+    @profiled("report.missing")
     def _generate_missing_section(self, analysis_data: Dict) -> Dict:
         """生成遗漏值部分的数据"""
         missing = analysis_data.get("missing", {})
@@ -259,6 +285,7 @@ class ReportGenerator:
             "MISSING_VALUES": json.dumps(values)
         }
     
+    @profiled("report.consecutive")
     def _generate_consecutive_section(self, analysis_data: Dict) -> Dict:
         """生成连号部分的数据"""
         consecutive = analysis_data.get("consecutive", {})
@@ -272,17 +299,15 @@ class ReportGenerator:
             "MOST_COMMON_CONSECUTIVE": most_common
         }
     
-    def _generate_heatmap_section(self, analysis_data: Dict) -> Dict:
+    @profiled("report.heatmap")
+    def _generate_heatmap_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
         """生成号码分布热力图"""
         from collections import Counter
         
         # 从原始数据重新统计所有号码的出现次数
-        with open(self.config["data_file"], 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
-        
-        # 获取分析期数对应的数据
+        # 获取分析期数对应的数据（只读取覆盖这些期数的分片）
         periods = analysis_data.get("periods_analyzed", 100)
-        recent_data = all_data[:periods]
+        recent_data = analyzer.get_periods(periods)
         
         if self.lottery_type == "ssq":
             # 统计所有红球出现次数
@@ -302,6 +327,13 @@ class ReportGenerator:
         # 生成所有号码的统计数据
         all_counts = {num: counter.get(num, 0) for num in numbers_range}
         
+        # 出现频率的 bootstrap 置信区间（未要求 --intervals 或旧版 JSON 输入没有时跳过）
+        zone = "red_balls" if self.lottery_type == "ssq" else "front_zone"
+        zone_intervals = analysis_data.get("hot_cold_intervals", {}).get(zone)
+        intervals = {item["number"]: item for item in zone_intervals["numbers"]} if zone_intervals else {}
+        draws = len(recent_data)
+        confidence = f"{analysis_data.get('hot_cold_intervals', {}).get('confidence', 0.95):.0%}"
+        
         # 计算百分位数阈值（确保均匀分布）
         sorted_counts = sorted(all_counts.values())
         n = len(sorted_counts)
@@ -330,14 +362,216 @@ class ReportGenerator:
             else:
                 heat_class = "cold"  # 冷号（0次）
             
+            interval = intervals.get(num)
+            if interval:
+                label = interval["label"]
+                detail = (f"，{confidence} 区间 {interval['low'] * draws:.0f}~{interval['high'] * draws:.0f} 次"
+                          f"（{_INTERVAL_LABELS[label]}）")
+                heat_class += f" ci-{label}" if label != "normal" else ""
+            else:
+                detail = ""
             heatmap_data.append({
                 "NUMBER": self._format_number(num),
                 "COUNT": count,
-                "HEAT_CLASS": heat_class
+                "HEAT_CLASS": heat_class,
+                "DETAIL": detail
             })
         
-        return {"NUMBER_HEATMAP": heatmap_data}
+        result = {"NUMBER_HEATMAP": heatmap_data, "HAS_INTERVALS": bool(intervals)}
+        if intervals:
+            result["HEATMAP_EXPECTED"] = f"{zone_intervals['expected'] * 100:.1f}"
+            result["HEATMAP_CONFIDENCE"] = confidence
+        return result
+    
+    @profiled("report.trend")
+    def _generate_trend_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
+        """
+        生成遗漏走势图数据
+        
+        每期一行编码为 "期号|" 加各号码 2 位 36 进制遗漏值（前区在前），
+        由页面脚本按可见区域解码渲染，避免数千行重复的单元格标记。
+        """
+        periods = analysis_data.get("periods_analyzed", 100)
+        trend = analyzer.analyze_trend(periods)
+        if not trend["issues"]:
+            return {"HAS_TREND": False}
+        
+        if self.lottery_type == "ssq":
+            front, back = trend["red_balls"], trend["blue_ball"]
+        else:
+            front, back = trend["front_zone"], trend["back_zone"]
+        
+        codes = _TREND_CODES
+        limit = len(codes) - 1
+        rows = [
+            issue + "|" + "".join(codes[v if v < limit else limit] for v in front_row + back_row)
+            for issue, front_row, back_row in zip(trend["issues"], front["rows"], back["rows"])
+        ]
+        data = {"front": front["numbers"], "back": back["numbers"], "rows": rows}
+        return {
+            "HAS_TREND": True,
+            "TREND_PERIODS": trend["periods"],
+            "TREND_DATA": json.dumps(data, separators=(",", ":"))
+        }
+    
+    @profiled("report.rolling")
+    def _generate_rolling_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
+        """生成滚动窗口趋势图数据: 和值均值 ± 标准差、跨度均值、热号的滚动出现频率"""
+        periods = analysis_data.get("periods_analyzed", 100)
+        rolling = analyzer.analyze_rolling(periods, windows=(ROLLING_WINDOW,))
+        series = rolling["series"][str(ROLLING_WINDOW)]
+        if not series["issues"]:
+            return {"HAS_ROLLING": False}
+        
+        # 当前分析期内的前区热号
+        zone = "red_balls" if self.lottery_type == "ssq" else "front_zone"
+        hot = [num for num, _ in analysis_data.get("hot_cold", {}).get(zone, {}).get("hot", [])[:ROLLING_HOT_NUMBERS]]
+        
+        data = {
+            "labels": series["issues"],
+            "sumMean": series["sum_mean"],
+            "sumLow": [round(m - d, 2) for m, d in zip(series["sum_mean"], series["sum_std"])],
+            "sumHigh": [round(m + d, 2) for m, d in zip(series["sum_mean"], series["sum_std"])],
+            "spanMean": series["span_mean"],
+            "numbers": [
+                {"label": self._format_number(num),
+                 "data": [round(row[num - 1] / ROLLING_WINDOW * 100, 1) for row in series["front"]]}
+                for num in hot
+            ]
+        }
+        return {
+            "HAS_ROLLING": True,
+            "ROLLING_WINDOW": ROLLING_WINDOW,
+            "ROLLING_DATA": json.dumps(data, separators=(",", ":"))
+        }
+    
+    @profiled("report.repeats")
+    def _generate_repeats_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
+        """生成重号、邻号、斜连号统计表"""
+        periods = analysis_data.get("periods_analyzed", 100)
+        result = analyzer.analyze_repeats(periods)
+        if not result["periods"]:
+            return {"HAS_REPEATS": False}
+        
+        latest = result["latest"]
+        rows = []
+        for name, label in (("repeat", "重号"), ("neighbor", "邻号"), ("diagonal", "斜连号")):
+            stats = result[name]
+            distribution = stats["distribution"]
+            numbers = latest[name]
+            rows.append({
+                "NAME": label,
+                "ZERO": distribution.get(0, 0),
+                "ONE": distribution.get(1, 0),
+                "TWO": distribution.get(2, 0),
+                "MORE": sum(count for value, count in distribution.items() if value >= 3),
+                "AVERAGE": f"{stats['average']:.2f}",
+                "RATE": f"{stats['rate']:.1f}",
+                "LATEST": " ".join(self._format_number(n) for n in numbers) if numbers else "无"
+            })
+        return {
+            "HAS_REPEATS": True,
+            "REPEATS_ROWS": rows,
+            "REPEATS_PERIODS": result["periods"],
+            "REPEATS_LATEST_ISSUE": latest["issue"]
+        }
+    
+    @profiled("report.transitions")
+    def _generate_transitions_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
+        """生成号码转移矩阵热力图数据: 上期开出 i 时本期开出 j 的次数，由页面脚本换算为条件概率"""
+        periods = analysis_data.get("periods_analyzed", 100)
+        stats = analyzer.analyze_transitions(periods)
+        if not stats["transitions"]:
+            return {"HAS_TRANSITIONS": False}
+        
+        data = {
+            "size": stats["numbers"],
+            "expected": stats["expected"],
+            "counts": stats["previous_counts"],
+            "matrix": stats["matrix"]
+        }
+        return {
+            "HAS_TRANSITIONS": True,
+            "TRANSITION_PERIODS": stats["periods"],
+            "TRANSITION_EXPECTED": f"{stats['expected'] * 100:.1f}",
+            "TRANSITION_DATA": json.dumps(data, separators=(",", ":"))
+        }
     
+    @profiled("report.randomness")
+    def _generate_randomness_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
+        """生成随机性检验结果表"""
+        periods = analysis_data.get("periods_analyzed", 100)
+        try:
+            result = analyzer.analyze_randomness(periods)
+        except ValueError:
+            return {"HAS_RANDOMNESS": False}
+        
+        front, back = ("红球", "蓝球") if self.lottery_type == "ssq" else ("前区", "后区")
+        zone_names = dict(zip(result["uniformity"], (front, back)))
+        tests = []
+        for field, test in result["uniformity"].items():
+            tests.append((f"{zone_names[field]}号码均匀性（卡方）", "χ²", test))
+        for field, test in result["gaps"].items():
+            tests.append((f"{zone_names[field]}遗漏间隔 vs 几何分布", "χ²", test))
+        tests += [
+            ("奇偶游程检验", "z", result["runs"]["odd_even"]),
+            ("大小游程检验", "z", result["runs"]["big_small"]),
+            ("和值游程检验", "z", result["runs"]["sum"]),
+            (f"相邻两期{front}重号个数", "z", result["serial"]["overlap"]),
+            ("和值一阶自相关", "z", result["serial"]["sum_lag1"]),
+        ]
+        
+        rows = []
+        for name, statistic, test in tests:
+            if test is None:
+                continue
+            value = test["chi2"] if statistic == "χ²" else test["z"]
+            rows.append({
+                "TEST_NAME": name,
+                "STATISTIC": f"{statistic} = {value:.2f}",
+                "P_VALUE": f"{test['p_value']:.3f}",
+                "RESULT": "符合随机" if test["random"] else "显著偏离",
+                "RESULT_CLASS": "normal" if test["random"] else "hot"
+            })
+        summary = result["summary"]
+        return {
+            "HAS_RANDOMNESS": True,
+            "RANDOMNESS_TESTS": rows,
+            "RANDOMNESS_SUMMARY": (f"共 {summary['tests']} 项检验，{summary['rejected']} 项在 "
+                                   f"{result['alpha']:.0%} 水平下显著；即使开奖完全随机，"
+                                   f"也预期约 {summary['expected_false_rejections']} 项偶然显著")
+        }
+    
+    @profiled("report.baseline")
+    def _generate_baseline_section(self, analysis_data: Dict, analyzer: LotteryAnalyzer) -> Dict:
+        """生成实际统计与随机基线的对照表（精确分布，不做蒙特卡洛模拟）"""
+        periods = analysis_data.get("periods_analyzed", 100)
+        try:
+            result = analyzer.analyze_baseline(periods, exact=True)
+        except ValueError:
+            return {"HAS_BASELINE": False}
+        
+        names = {"odd_even": "奇偶比", "big_small": "大小比", "consecutive": "连号组数",
+                 "sum": "和值均值", "span": "跨度均值"}
+        rows = []
+        for metric, name in names.items():
+            for row in result["comparison"].get(metric, []):
+                label = f"{name} {row['value']}" if metric in ("odd_even", "big_small") else name
+                rows.append({
+                    "METRIC": label,
+                    "OBSERVED": row["observed"],
+                    "EXPECTED": f"{row['expected']:.1f}",
+                    "BAND": f"{row['low']:g} ~ {row['high']:g}",
+                    "RESULT": "区间内" if row["within"] else "区间外",
+                    "RESULT_CLASS": "normal" if row["within"] else "hot"
+                })
+        return {
+            "HAS_BASELINE": True,
+            "BASELINE_ROWS": rows,
+            "BASELINE_CONFIDENCE": f"{result['confidence']:.0%}"
+        }
+    
+    @profiled("report.latest_draw")
     def _generate_latest_draw_section(self, analysis_data: Dict) -> Dict:
         """生成最新开奖结果"""
         # 确保配置已加载
@@ -346,13 +580,10 @@ class ReportGenerator:
         
         date_range = analysis_data.get("date_range", {})
         
-        # 从数据文件加载最新一期
-        with open(config["data_file"], 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # 按偏移索引只解析最新一期（存储按期号降序，第一条即最新）
+        latest = read_head(self.data_dir)
         
-        if data:
-            latest = max(data, key=lambda x: x.get("issue", ""))
-            
+        if latest:
             result = {
                 "LATEST_ISSUE": latest.get("issue", ""),
                 "LATEST_DATE": latest.get("draw_date", ""),
@@ -371,6 +602,7 @@ class ReportGenerator:
         
         return {}
     
+    @profiled("report.fixed_numbers")
     def _generate_fixed_numbers_section(self, fixed_red: List[int], fixed_blue: List[int], 
                                        analysis_data: Dict) -> Optional[Dict]:
         """生成固定号码分析部分"""
@@ -430,6 +662,7 @@ class ReportGenerator:
             "RECOMMENDED_COMBINATIONS": recommendations
         }
     
+    @profiled("report.recommendations")
     def _generate_recommendations(self, fixed_red: List[int], fixed_blue: List[int], 
                                   analysis_data: Dict) -> List[Dict]:
         """生成推荐组合"""
@@ -461,6 +694,7 @@ class ReportGenerator:
         
         return recommendations
     
+    @profiled("report.render")
     def _replace_template_vars(self, template: str, data: Dict) -> str:
         """替换模板变量"""
         result = template
@@ -469,9 +703,6 @@ class ReportGenerator:
         for key, value in data.items():
             if isinstance(value, str):
                 result = result.replace(f"{{{{{key}}}}}", value)
-            elif isinstance(value, (int, float)):
-                # 处理数字类型，转换为字符串
-                result = result.replace(f"{{{{{key}}}}}", str(value))
             elif isinstance(value, bool):
                 # 处理条件块 {{#KEY}}...{{/KEY}}
                 if value:
@@ -482,6 +713,9 @@ class ReportGenerator:
                     # 移除整个块
                     pattern = f"{{{{#{key}}}}}(.+?){{{{/{key}}}}}"
                     result = re.sub(pattern, "", result, flags=re.DOTALL)
+            elif isinstance(value, (int, float)):
+                # 处理数字类型，转换为字符串（bool 也是 int，需先判断）
+                result = result.replace(f"{{{{{key}}}}}", str(value))
         
         # 处理列表循环 {{#KEY}}...{{/KEY}}
         for key, value in data.items():
@@ -511,9 +745,10 @@ class ReportGenerator:
         
         return result
     
+    @profiled("report.generate")
     def generate(self, analysis_data: Dict, fixed_red: Optional[List[int]] = None, 
-                fixed_blue: Optional[List[int]] = None) -> str:
-        """生成完整 HTML 报告"""
+                fixed_blue: Optional[List[int]] = None, baseline: bool = False) -> str:
+        """生成完整 HTML 报告，baseline 为 True 时加入实际 vs 随机期望对照"""
         
         # 确保配置已加载
         config = self.config
@@ -529,6 +764,9 @@ class ReportGenerator:
             "END_ISSUE": analysis_data.get("date_range", {}).get("end_issue", "")
         }
         
+        # 各节共用一个分析器
+        analyzer = self._new_analyzer()
+        
         # 最新开奖
         template_data.update(self._generate_latest_draw_section(analysis_data))
         
@@ -536,10 +774,10 @@ class ReportGenerator:
         template_data.update(self._generate_hot_cold_section(analysis_data))
         
         # 奇偶比
-        template_data.update(self._generate_odd_even_section(analysis_data))
+        template_data.update(self._generate_odd_even_section(analysis_data, analyzer))
         
         # 大小比
-        template_data.update(self._generate_big_small_section(analysis_data))
+        template_data.update(self._generate_big_small_section(analysis_data, analyzer))
         
         # 遗漏值
         template_data.update(self._generate_missing_section(analysis_data))
@@ -548,7 +786,28 @@ class ReportGenerator:
         template_data.update(self._generate_consecutive_section(analysis_data))
         
         # 热力图
-        template_data.update(self._generate_heatmap_section(analysis_data))
+        template_data.update(self._generate_heatmap_section(analysis_data, analyzer))
+        
+        # 遗漏走势图
+        template_data.update(self._generate_trend_section(analysis_data, analyzer))
+        
+        # 滚动窗口趋势
+        template_data.update(self._generate_rolling_section(analysis_data, analyzer))
+        
+        # 重号、邻号、斜连号
+        template_data.update(self._generate_repeats_section(analysis_data, analyzer))
+        
+        # 号码转移矩阵
+        template_data.update(self._generate_transitions_section(analysis_data, analyzer))
+        
+        # 随机性检验
+        template_data.update(self._generate_randomness_section(analysis_data, analyzer))
+        
+        # 随机基线对比（可选）
+        if baseline:
+            template_data.update(self._generate_baseline_section(analysis_data, analyzer))
+        else:
+            template_data["HAS_BASELINE"] = False
         
         # 固定号码
         if fixed_red or fixed_blue:
@@ -572,6 +831,7 @@ class ReportGenerator:
         
         return html
     
+    @profiled("report.write")
     def save_report(self, html: str, output_path: str):
         """保存报告到文件"""
         output_file = Path(output_path)
@@ -591,39 +851,58 @@ def main():
     parser.add_argument("--output", "-o", required=True, help="输出 HTML 文件路径")
     parser.add_argument("--fixed-red", help="固定红球号码，逗号分隔，如: 07,18,25")
     parser.add_argument("--fixed-blue", help="固定蓝球号码，逗号分隔，如: 14")
+    parser.add_argument("--baseline", action="store_true", help="加入实际 vs 随机期望对照（精确分布，不做模拟）")
+    parser.add_argument("--intervals", action="store_true", help="热力图加入出现频率的 bootstrap 置信区间（较慢）")
+    parser.add_argument("--profile", action="store_true",
+                        help="记录各阶段耗时和内存分配，写入 <输出文件>.timings.json 的 timings 键")
+    parser.add_argument("--profile-dump", metavar="PREFIX",
+                        help="导出 cProfile 统计和 tracemalloc 快照到 PREFIX.prof / PREFIX.tracemalloc")
     
     args = parser.parse_args()
     
     try:
-        # 初始化生成器
-        generator = ReportGenerator(args.type)
-        
-        # 加载分析数据
-        if args.input:
-            print(f"📂 从文件加载分析数据: {args.input}")
-            analysis_data = generator.load_json_data(args.input)
-        else:
-            print(f"📊 执行分析，期数: {args.periods}")
-            analysis_data = generator.load_analysis_data(args.periods)
-        
-        # 解析固定号码
-        fixed_red = None
-        fixed_blue = None
-        if args.fixed_red:
-            fixed_red = [int(n.strip()) for n in args.fixed_red.split(",")]
-            print(f"🔢 固定红球: {fixed_red}")
-        if args.fixed_blue:
-            fixed_blue = [int(n.strip()) for n in args.fixed_blue.split(",")]
-            print(f"🔵 固定蓝球: {fixed_blue}")
-        
-        # 生成报告
-        print("🎨 生成 HTML 报告...")
-        html = generator.generate(analysis_data, fixed_red, fixed_blue)
-        
-        # 保存报告
-        output_path = generator.save_report(html, args.output)
-        print(f"✅ 报告已生成: {output_path}")
-        
+        profiler = StageProfiler(cprofile=bool(args.profile_dump)) if args.profile or args.profile_dump else None
+        with profiler or nullcontext():
+            # 初始化生成器
+            generator = ReportGenerator(args.type, profiler=profiler)
+            
+            # 加载分析数据
+            if args.input:
+                print(f"📂 从文件加载分析数据: {args.input}")
+                analysis_data = generator.load_json_data(args.input)
+            else:
+                print(f"📊 执行分析，期数: {args.periods}")
+                analysis_data = generator.load_analysis_data(args.periods, intervals=args.intervals)
+            
+            # 解析固定号码
+            fixed_red = None
+            fixed_blue = None
+            if args.fixed_red:
+                fixed_red = [int(n.strip()) for n in args.fixed_red.split(",")]
+                print(f"🔢 固定红球: {fixed_red}")
+            if args.fixed_blue:
+                fixed_blue = [int(n.strip()) for n in args.fixed_blue.split(",")]
+                print(f"🔵 固定蓝球: {fixed_blue}")
+            
+            # 生成报告
+            print("🎨 生成 HTML 报告...")
+            html = generator.generate(analysis_data, fixed_red, fixed_blue, baseline=args.baseline)
+            
+            # 保存报告
+            output_path = generator.save_report(html, args.output)
+            print(f"✅ 报告已生成: {output_path}")
+            
+            if profiler and args.profile_dump:
+                for path in profiler.dump(args.profile_dump):
+                    print(f"📝 剖析数据已导出: {path}")
+        
+        if profiler:
+            print(profiler.format_table())
+            timings_path = output_path.with_name(output_path.name + ".timings.json")
+            with open(timings_path, 'w', encoding='utf-8') as f:
+                json.dump({"timings": profiler.report()}, f, ensure_ascii=False, indent=2)
+            print(f"⏱️ 阶段耗时已保存: {timings_path}")
+    
     except Exception as e:
         print(f"❌ 错误: {e}", file=sys.stderr)
         import traceback
@@ -8,15 +8,26 @@ GitHub: https://github.com/gudaoxuri/lottery_history
     python scripts/import_from_lottery_history.py --type ssq
     python scripts/import_from_lottery_history.py --type dlt
     python scripts/import_from_lottery_history.py --all
+    python scripts/import_from_lottery_history.py --all --workers 4
 """
 
 import argparse
+import codecs
+import http.client
 import json
 import sys
+import time
+import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict
-import urllib.request
+from typing import Callable, List, Dict, Iterable, Iterator, Optional
 import urllib.error
+import urllib.parse
+
+from draw_store import append_draws, count_draws, issue_key, normalize_records, read_head
+from drawn_index import load_drawn_index
+from fetch_common import ConnectionPool, report_progress
 
 # 项目路径
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -27,126 +38,348 @@ DATA_SOURCES = {
     "ssq": {
         "name": "双色球",
         "url": "https://raw.githubusercontent.com/gudaoxuri/lottery_history/main/data/ssq.json",
-        "data_file": DATA_DIR / "ssq" / "history.json"
+        "data_dir": DATA_DIR / "ssq",
+        "meta_file": DATA_DIR / "ssq" / "source_meta.json"
     },
     "dlt": {
         "name": "大乐透",
         "url": "https://raw.githubusercontent.com/gudaoxuri/lottery_history/main/data/dlt.json",
-        "data_file": DATA_DIR / "dlt" / "history.json"
+        "data_dir": DATA_DIR / "dlt",
+        "meta_file": DATA_DIR / "dlt" / "source_meta.json"
     }
 }
 
+# 下载配置
+DOWNLOAD_TIMEOUT = 30
+DOWNLOAD_RETRIES = 3        # 最多重试次数
+RETRY_BACKOFF = 1.0         # 首次重试等待秒数，之后翻倍
+RETRY_BACKOFF_MAX = 8.0     # 单次等待上限
+CHUNK_SIZE = 64 * 1024
+MAX_WORKERS = 4             # 并发同步的彩种数上限
+
+
+# 进程内共享的连接池
+_POOL = ConnectionPool(timeout=DOWNLOAD_TIMEOUT)
+
+
+def load_source_meta(meta_file: Path) -> Dict:
+    """读取上次下载记录的缓存校验信息（ETag / Last-Modified）"""
+    if meta_file.exists():
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def save_source_meta(meta_file: Path, meta: Dict):
+    """保存缓存校验信息，只保留下次条件请求需要的字段"""
+    saved = {key: meta[key] for key in ("etag", "last_modified") if meta.get(key)}
+    meta_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump(saved, f, ensure_ascii=False, indent=2)
 
-def download_data(url: str) -> List[Dict]:
-    """从URL下载JSON数据"""
-    print(f"📥 正在下载数据...")
-    print(f"   URL: {url}")
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator:
+    """
+    增量解析顶层 JSON 数组，每解析出一个元素就产出
     
-    try:
-        # 设置请求头，模拟浏览器
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        req = urllib.request.Request(url, headers=headers)
+    chunks 为按顺序到达的文本块；元素跨块时等待后续数据再解码。
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    
+    for chunk in chunks:
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            length = len(buffer)
+            while pos < length and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= length:
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("数据源不是 JSON 数组")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # 元素不完整，等待更多数据
+            yield item
+    
+    raise ValueError("JSON 数据不完整")
+
+
+def _open_with_retry(pool: ConnectionPool, url: str, headers: Dict, retries: int,
+                     backoff: float, progress: Callable[[str], None]):
+    """
+    从连接池取连接发送请求，网络错误和 5xx/429 按指数退避重试
+    
+    Returns: (连接, 响应)；服务端返回 304 时响应为 None
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + ("?" + parts.query if parts.query else "")
+    attempt = 0
+    while True:
+        conn = pool.acquire(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", path or "/", headers=headers)
+            response = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            # 包括复用到已被服务端关闭的空闲连接
+            conn.close()
+            error = e
+        else:
+            if response.status == 200:
+                return conn, response
+            response.read()
+            pool.release(parts.scheme, parts.netloc, conn, reusable=not response.will_close)
+            if response.status == 304:
+                return None, None
+            error = urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            if response.status < 500 and response.status != 429:
+                raise error
         
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = response.read().decode('utf-8')
-            return json.loads(data)
+        if attempt >= retries:
+            raise error
+        delay = min(backoff * (2 ** attempt), RETRY_BACKOFF_MAX)
+        attempt += 1
+        progress(f"⚠️ 下载失败（{error}），{delay:.1f} 秒后第 {attempt} 次重试...")
+        time.sleep(delay)
+
+
+def _iter_body(response) -> Iterator[str]:
+    """按块读取响应体，边解压 gzip 边解码 UTF-8"""
+    encoding = (response.headers.get("Content-Encoding") or "").lower()
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    
+    while True:
+        raw = response.read(CHUNK_SIZE)
+        if not raw:
+            break
+        if inflater:
+            raw = inflater.decompress(raw)
+        yield text_decoder.decode(raw)
+    
+    tail = inflater.flush() if inflater else b""
+    yield text_decoder.decode(tail, final=True)
+
+
+def download_data(url: str, meta: Optional[Dict] = None,
+                  retries: int = DOWNLOAD_RETRIES, backoff: float = RETRY_BACKOFF,
+                  pool: Optional[ConnectionPool] = None,
+                  progress: Callable[[str], None] = print) -> Iterator[Dict]:
+    """
+    流式下载 JSON 数组数据，逐条产出记录
+    
+    - meta 中有 etag / last_modified 时发送条件请求，服务端返回 304 则不产出任何记录
+    - 请求 gzip 压缩，边下载边解压、解码、解析
+    - 建立连接失败时按指数退避重试（已开始产出记录后不再重试）
+    - 连接取自共享连接池，完整读完响应后归还复用
+    
+    meta 会被原地更新: status（200/304）、etag、last_modified、records_read
+    """
+    if meta is None:
+        meta = {}
+    if pool is None:
+        pool = _POOL
+    progress("📥 正在下载数据...")
+    progress(f"   URL: {url}")
+    
+    # 设置请求头，模拟浏览器
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept-Encoding': 'gzip'
+    }
+    if meta.get("etag"):
+        headers['If-None-Match'] = meta["etag"]
+    if meta.get("last_modified"):
+        headers['If-Modified-Since'] = meta["last_modified"]
+    
+    try:
+        conn, response = _open_with_retry(pool, url, headers, retries, backoff, progress)
     except urllib.error.HTTPError as e:
-        print(f"❌ HTTP错误: {e.code} - {e.reason}")
-        raise
-    except urllib.error.URLError as e:
-        print(f"❌ URL错误: {e.reason}")
+        progress(f"❌ HTTP错误: {e.code} - {e.reason}")
         raise
     except Exception as e:
-        print(f"❌ 下载失败: {e}")
+        progress(f"❌ 下载失败: {e}")
         raise
+    
+    meta["records_read"] = 0
+    if response is None:
+        meta["status"] = 304
+        return
+    
+    parts = urllib.parse.urlsplit(url)
+    completed = False
+    try:
+        meta["status"] = response.status
+        meta["etag"] = response.headers.get("ETag")
+        meta["last_modified"] = response.headers.get("Last-Modified")
+        for record in iter_json_array(_iter_body(response)):
+            meta["records_read"] += 1
+            yield record
+        completed = True
+    finally:
+        # 提前停止读取时响应体未读完，连接不能复用
+        reusable = completed and response.isclosed() and not response.will_close
+        pool.release(parts.scheme, parts.netloc, conn, reusable=reusable)
 
 
-def convert_ssq_data(source_data: List[Dict]) -> List[Dict]:
-    """转换双色球数据格式"""
-    converted = []
+def convert_ssq_data(source_data: Iterable[Dict]) -> Iterator[Dict]:
+    """转换双色球数据格式（逐条产出，不构造完整列表）"""
     for record in source_data:
-        converted.append({
+        yield {
             "lottery_type": "ssq",
             "issue": record["issueNumber"],
             "draw_date": record["drawDate"],
             "red_balls": record["redBalls"],
             "blue_ball": record["blueBall"],
             "prize_info": {}
-        })
-    return converted
+        }
 
 
-def convert_dlt_data(source_data: List[Dict]) -> List[Dict]:
-    """转换大乐透数据格式"""
-    converted = []
+def convert_dlt_data(source_data: Iterable[Dict]) -> Iterator[Dict]:
+    """转换大乐透数据格式（逐条产出，不构造完整列表）"""
     for record in source_data:
-        converted.append({
+        yield {
             "lottery_type": "dlt",
             "issue": record["issueNumber"],
             "draw_date": record["drawDate"],
             "front_zone": record["frontBalls"],
             "back_zone": record["backBalls"],
             "prize_info": {}
-        })
-    return converted
+        }
 
 
-def import_lottery_data(lottery_type: str) -> tuple:
+def merge_new_records(incoming: Iterable[Dict], head_issue: Optional[str]) -> List[Dict]:
+    """
+    把数据源视为按期号降序的数据流，与现有存储（同样降序）做一次线性归并
+    
+    遇到现有最新期号及更早的记录即停止读取；数据源若不是降序，
+    则退化为完整扫描一遍。
+    
+    Returns: 按期号降序排列的增量记录
     """
-    导入指定彩种的数据
+    head_key = issue_key(head_issue) if head_issue is not None else None
+    delta = []
+    seen = set()
+    order = 0  # 1: 已确认降序; -1: 非降序
+    prev_key = None
+    
+    for record in incoming:
+        key = issue_key(record["issue"])
+        if prev_key is not None and order >= 0:
+            order = 1 if key < prev_key else -1
+        prev_key = key
+        
+        if head_key is not None and key <= head_key:
+            if order == 1:
+                break  # 之后的期号都已存在
+            continue
+        
+        if key not in seen:
+            seen.add(key)
+            delta.append(record)
+    
+    if order < 0:
+        delta.sort(key=lambda x: issue_key(x["issue"]), reverse=True)
+    return delta
+
+
+def import_lottery_data(lottery_type: str, pool: Optional[ConnectionPool] = None) -> tuple:
+    """
+    导入指定彩种的数据: 下载 → 转换 → 归并 → 写入
+    
+    数据源和现有存储都按期号降序处理，只写入比现有最新一期更新的记录。
+    各彩种之间没有共享状态，可以在线程池中并发执行。
     
     Returns: (新增数量, 总数量)
     """
     config = DATA_SOURCES[lottery_type]
-    print(f"\n{'='*60}")
-    print(f"🎱 正在导入 {config['name']} 数据")
-    print(f"{'='*60}")
     
-    # 1. 下载数据
-    source_data = download_data(config["url"])
-    print(f"✅ 下载完成: {len(source_data)} 条记录")
+    def progress(message: str):
+        report_progress(config["name"], message)
     
-    # 2. 转换格式
-    if lottery_type == "ssq":
-        converted_data = convert_ssq_data(source_data)
-    else:
-        converted_data = convert_dlt_data(source_data)
-    print(f"✅ 格式转换完成")
+    progress(f"🎱 正在导入 {config['name']} 数据")
     
-    # 3. 加载现有数据
-    existing_data = []
-    if config["data_file"].exists():
-        with open(config["data_file"], 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
-        print(f"📊 现有数据: {len(existing_data)} 条")
+    # 1. 读取现有最新一期
+    head = read_head(config["data_dir"])
+    head_issue = head["issue"] if head else None
+    if head_issue:
+        progress(f"📊 现有最新期号: {head_issue}")
     
-    # 4. 合并数据（去重）
-    existing_issues = {item["issue"] for item in existing_data}
-    added_count = 0
+    # 2. 流式下载（本地有数据时才发送条件请求）
+    meta = load_source_meta(config["meta_file"]) if head_issue else {}
+    source_data = download_data(config["url"], meta, pool=pool, progress=progress)
     
-    for record in converted_data:
-        if record["issue"] not in existing_issues:
-            existing_data.append(record)
-            existing_issues.add(record["issue"])
-            added_count += 1
+    # 3. 边下载边转换格式，并与现有数据归并（只取增量）
+    if lottery_type == "ssq":
+        converted = convert_ssq_data(source_data)
+    else:
+        converted = convert_dlt_data(source_data)
+    try:
+        delta = merge_new_records(converted, head_issue)
+    finally:
+        source_data.close()
+    # 统一期号格式，保持存储不变量
+    delta = normalize_records(delta, lottery_type)
     
-    # 5. 保存数据
-    config["data_file"].parent.mkdir(parents=True, exist_ok=True)
+    if meta.get("status") == 304:
+        progress(f"✅ 数据源未更新 (304)，跳过")
+    else:
+        progress(f"✅ 下载完成: 读取 {meta.get('records_read', 0)} 条记录")
     
-    # 按期号降序排序
-    existing_data.sort(key=lambda x: x["issue"], reverse=True)
+    # 4. 只写入增量（只改写新记录所在年份的分片）
+    if delta:
+        total = append_draws(config["data_dir"], delta, lottery_type)
+        # 同步更新历史开奖组合索引（只重建新记录所在年份的一节）
+        load_drawn_index(config["data_dir"], lottery_type, persist=True)
+        progress(f"✅ 数据保存完成: {config['data_dir']}")
+    else:
+        total = count_draws(config["data_dir"])
+        progress(f"✅ 数据已是最新，无需写入")
     
-    with open(config["data_file"], 'w', encoding='utf-8') as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=2)
+    # 增量写入成功后再记录校验信息，避免下次 304 跳过未保存的数据
+    if meta.get("status") == 200:
+        save_source_meta(config["meta_file"], meta)
     
-    print(f"✅ 数据保存完成: {config['data_file']}")
-    print(f"📈 导入统计:")
-    print(f"   新增: {added_count} 条")
-    print(f"   总计: {len(existing_data)} 条")
+    progress(f"📈 导入统计: 新增 {len(delta)} 条，总计 {total} 条")
     
-    return added_count, len(existing_data)
+    return len(delta), total
+
+
+def import_all(lottery_types: List[str], max_workers: int = MAX_WORKERS) -> Dict[str, tuple]:
+    """
+    并发导入多个彩种，每个彩种一条独立的流水线，共享连接池
+    
+    Returns: {彩种: (新增数量, 总数量)}，失败的彩种不在结果中
+    """
+    results = {}
+    workers = max(1, min(max_workers, len(lottery_types)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(import_lottery_data, lottery_type, _POOL): lottery_type
+            for lottery_type in lottery_types
+        }
+        for future in as_completed(futures):
+            lottery_type = futures[future]
+            try:
+                results[lottery_type] = future.result()
+            except Exception as e:
+                report_progress(DATA_SOURCES[lottery_type]["name"], f"❌ 导入失败: {e}")
+                traceback.print_exc()
+    _POOL.close()
+    return results
 
 
 def main():
@@ -161,20 +394,21 @@ def main():
   # 导入大乐透数据
   %(prog)s --type dlt
   
-  # 导入所有彩种
+  # 并发导入所有彩种
   %(prog)s --all
-  
+  %(prog)s --all --workers 2
+
 数据源:
   双色球: https://github.com/gudaoxuri/lottery_history
   大乐透: https://github.com/gudaoxuri/lottery_history
-  
+
 数据每天自动更新，包含从2003年至今的所有历史开奖数据。
         """
     )
     
     parser.add_argument(
         "--type", "-t",
-        choices=["ssq", "dlt"],
+        choices=list(DATA_SOURCES),
         help="彩票类型: ssq=双色球, dlt=大乐透"
     )
     parser.add_argument(
@@ -182,6 +416,12 @@ def main():
         action="store_true",
         help="导入所有彩种"
     )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=MAX_WORKERS,
+        help=f"并发导入的彩种数上限 (默认: {MAX_WORKERS})"
+    )
     
     args = parser.parse_args()
     
@@ -191,7 +431,7 @@ def main():
         sys.exit(1)
     
     # 确定要导入的彩种
-    types_to_import = ["ssq", "dlt"] if args.all else [args.type]
+    types_to_import = list(DATA_SOURCES) if args.all else [args.type]
     
     print("="*60)
     print("🎱 彩票数据导入工具")
@@ -199,18 +439,9 @@ def main():
     print("🔄 数据每天自动更新")
     print("="*60)
     
-    total_added = 0
-    total_records = 0
-    
-    for lottery_type in types_to_import:
-        try:
-            added, total = import_lottery_data(lottery_type)
-            total_added += added
-            total_records += total
-        except Exception as e:
-            print(f"\n❌ 导入 {lottery_type} 失败: {e}")
-            import traceback
-            traceback.print_exc()
+    results = import_all(types_to_import, args.workers)
+    total_added = sum(added for added, _ in results.values())
+    total_records = sum(total for _, total in results.values())
     
     print(f"\n{'='*60}")
     print("✅ 导入完成!")
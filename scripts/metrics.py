@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prometheus 文本格式监控指标
+供常驻进程（调度器等）导出请求延迟、缓存命中、数据加载耗时、入库条数、报告渲染次数和队列深度
+
+指标以 Prometheus 文本格式 (0.0.4) 输出，可通过 HTTP 端点 /metrics 抓取，
+也可写成 node-exporter textfile collector 读取的 .prom 文件。
+
+LotteryAnalyzer / ReportGenerator 的各阶段通过 profiling 钩子计入指标，
+调用 install_stage_hook() 后无需改动调用方。
+
+用法:
+    import metrics
+    
+    metrics.install_stage_hook()
+    metrics.serve(9108)                              # http://localhost:9108/metrics
+    with metrics.track_request("precompute_analysis"):
+        ...
+    metrics.write_textfile("/var/lib/node_exporter/lottery.prom")
+"""
+
+import abc
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+
+import profiling
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus 客户端默认的延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """标签值转义"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(abc.ABC):
+    """带标签的指标基类"""
+    
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+    
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """各标签组合的样本行（调用方持有锁）"""
+    
+    def exposition(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增计数器"""
+    
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """分桶直方图: 每个标签组合记录各桶计数、总和与总数"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+    
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state["count"] if state else 0
+    
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, state in sorted(self._values.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, state["buckets"]):
+                cumulative += hits
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def exposition(self) -> str:
+        """全部指标的 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.exposition() for metric in metrics) + "\n"
+
+
+# ============ 默认指标 ============
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "lottery_request_duration_seconds", "请求处理耗时（按端点）", ("endpoint",))
+REQUEST_ERRORS = REGISTRY.counter(
+    "lottery_request_errors_total", "请求处理失败次数（按端点）", ("endpoint",))
+STAGE_LATENCY = REGISTRY.histogram(
+    "lottery_stage_duration_seconds", "分析/报告各阶段耗时", ("stage",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "lottery_cache_requests_total", "缓存查询次数（按缓存和命中结果）", ("cache", "result"))
+DATASET_LOAD = REGISTRY.histogram(
+    "lottery_dataset_load_seconds", "开奖历史加载耗时")
+ROWS_INGESTED = REGISTRY.counter(
+    "lottery_rows_ingested_total", "新入库的开奖记录条数", ("lottery_type",))
+REPORTS_RENDERED = REGISTRY.counter(
+    "lottery_reports_rendered_total", "已渲染的 HTML 报告数")
+QUEUE_DEPTH = REGISTRY.gauge(
+    "lottery_queue_depth", "待处理任务数（按队列）", ("queue",))
+
+
+@contextmanager
+def track_request(endpoint: str) -> Iterator[None]:
+    """记录一次请求的耗时，出错时计入失败次数"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REQUEST_ERRORS.inc(endpoint=endpoint)
+        raise
+    finally:
+        REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+
+
+def record_cache(cache: str, hit: bool):
+    """记录一次缓存查询"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def observe_stage(stage: str, stats: Dict):
+    """profiling 钩子: 把 LotteryAnalyzer / ReportGenerator 的阶段耗时计入指标"""
+    seconds = stats["wall_ms"] / 1000
+    STAGE_LATENCY.observe(seconds, stage=stage)
+    if stage == "load":
+        DATASET_LOAD.observe(seconds)
+    elif stage == "report.generate":
+        REPORTS_RENDERED.inc()
+
+
+def install_stage_hook():
+    """注册阶段钩子（重复调用只注册一次）"""
+    profiling.remove_hook(observe_stage)
+    profiling.add_hook(observe_stage)
+
+
+# ============ 导出 ============
+
+def write_textfile(path: Union[str, Path], registry: Registry = REGISTRY) -> Path:
+    """
+    写 node-exporter textfile collector 格式的文件
+    
+    先写临时文件再改名，避免 node-exporter 读到写了一半的文件；文件名需以 .prom 结尾。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(registry.exposition(), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def _handler(registry: Registry):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            with track_request("/metrics"):
+                body = registry.exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return MetricsHandler
+
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    在后台线程提供 /metrics 端点，返回服务器（shutdown() 停止）
+    
+    默认只监听本机；供其他机器上的 Prometheus 抓取时显式传入 host（如 "0.0.0.0"）。
+    """
+    server = ThreadingHTTPServer((host, port), _handler(registry))
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
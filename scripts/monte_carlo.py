@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛随机基线
+模拟大量完全随机的开奖，得到奇偶比、大小比、连号、和值、跨度在"纯随机"下的
+期望分布，以及 window 期内统计量的置信区间，用于与实际开奖对照
+
+模拟按批次分给进程池，每批使用由 (种子, 彩种, 窗口, 批次号) 派生的独立随机流，
+结果与进程数无关、可复现。每期开奖只在位掩码上做 popcount 和移位，
+各批只回传计数直方图，合并后再求概率和分位数。模拟总期数不超过 simulations。
+
+exact_baseline 不做模拟: 单期分布取精确概率（exact_distributions），奇偶比、大小比的
+窗口期数按二项分布求分位数，连号、和值、跨度的窗口统计量按正态近似，耗时与窗口大小
+基本无关，报告使用这一版本。
+
+用法:
+    python analyze_history.py --type ssq --metric baseline --periods 100 --simulations 1000000
+"""
+
+import math
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+import exact_distributions
+from draw_bits import BIT, mask_of
+
+DEFAULT_SIMULATIONS = 1_000_000
+DEFAULT_SEED = 20240101
+CONFIDENCE = 0.95
+BATCH_DRAWS = 50_000    # 每批模拟的期数（约数，按整窗口划分）
+
+# 模拟参数: (号码个数, 每期开出个数, 大号下限)
+ZoneSpec = Tuple[int, int, int]
+
+METRICS = ("odd_even", "big_small", "consecutive", "sum", "span")
+
+
+def _simulate_batch(spec: ZoneSpec, window: int, windows: int, stream: str) -> Dict[str, Counter]:
+    """
+    模拟 windows 个窗口（每个 window 期），返回各指标的计数直方图
+    
+    "<指标>" 为单期取值的分布；"<指标>@<取值>" 为每个窗口内该取值出现期数的分布；
+    "consecutive@runs"、"sum@total"、"span@total" 为窗口内连号组数、和值总和、跨度总和的分布。
+    """
+    size, pick, big_boundary = spec
+    rng = random.Random(stream)
+    sample = rng.sample
+    numbers = list(range(1, size + 1))
+    odd_mask = mask_of(range(1, size + 1, 2))
+    big_mask = mask_of(range(big_boundary, size + 1))
+    
+    draws = {metric: Counter() for metric in METRICS}
+    per_window = Counter()
+    for _ in range(windows):
+        window_counts = Counter()
+        runs = sum_total = span_total = 0
+        for _ in range(window):
+            picked = sample(numbers, pick)
+            mask = 0
+            for n in picked:
+                mask |= BIT[n]
+            odd = (mask & odd_mask).bit_count()
+            big = (mask & big_mask).bit_count()
+            # 长度 >= 2 的连号段起点: 本位和高一位为 1、低一位为 0
+            draw_runs = (mask & (mask >> 1) & ~(mask << 1)).bit_count()
+            draw_sum = sum(picked)
+            span = mask.bit_length() - (mask & -mask).bit_length()
+            window_counts[f"odd_even@{odd}:{pick - odd}"] += 1
+            window_counts[f"big_small@{big}:{pick - big}"] += 1
+            draws["consecutive"][draw_runs] += 1
+            draws["sum"][draw_sum] += 1
+            draws["span"][span] += 1
+            runs += draw_runs
+            sum_total += draw_sum
+            span_total += span
+        for key, count in window_counts.items():
+            metric, value = key.split("@")
+            draws[metric][value] += count
+            per_window[(key, count)] += 1
+        per_window[("consecutive@runs", runs)] += 1
+        per_window[("sum@total", sum_total)] += 1
+        per_window[("span@total", span_total)] += 1
+    
+    histograms: Dict[str, Counter] = dict(draws)
+    for (key, value), count in per_window.items():
+        histograms.setdefault(key, Counter())[value] += count
+    return histograms
+
+
+def _quantile(histogram: Counter, total: int, q: float) -> float:
+    """直方图（取值 -> 次数，共 total 次）的 q 分位数"""
+    target = q * total
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= target:
+            return value
+    return max(histogram) if histogram else 0
+
+
+def _band(histogram: Counter, windows: int, confidence: float, scale: float = 1.0) -> Dict:
+    """窗口统计量的均值和置信区间；未出现的窗口计为 0"""
+    histogram = Counter(histogram)
+    histogram[0] += windows - sum(histogram.values())
+    if not histogram[0]:
+        del histogram[0]
+    tail = (1 - confidence) / 2
+    return {
+        "expected": round(sum(v * c for v, c in histogram.items()) / windows / scale, 3),
+        "low": round(_quantile(histogram, windows, tail) / scale, 3),
+        "high": round(_quantile(histogram, windows, 1 - tail) / scale, 3),
+    }
+
+
+def _workers(workers: Optional[int], batches: int) -> int:
+    return max(1, min(workers or os.cpu_count() or 1, batches))
+
+
+def simulate(spec: ZoneSpec, window: int, simulations: int = DEFAULT_SIMULATIONS,
+             seed: int = DEFAULT_SEED, workers: Optional[int] = None, label: str = "") -> Dict:
+    """
+    模拟约 simulations 期随机开奖，按 window 期一个窗口统计
+    
+    实际模拟期数为 窗口数 × window，不超过 simulations（但至少一个窗口）；窗口数
+    较少时置信区间较粗，window 很大时宜用 exact_baseline。label 参与派生随机流
+    （通常为彩种），让不同彩种的模拟互不相关。
+    
+    Returns:
+        distributions: 各指标单期取值的概率
+        bands: 各指标窗口统计量的期望和置信区间。奇偶比、大小比为每个比例在窗口内
+            出现的期数；连号为窗口内连号组数；和值、跨度为窗口内的均值
+    """
+    if window < 1:
+        raise ValueError(f"窗口期数需大于 0: {window}")
+    windows = max(simulations // window, 1)
+    per_batch = max(1, BATCH_DRAWS // window)
+    batches = [(spec, window, min(per_batch, windows - start), f"{seed}:{label}:{window}:{i}")
+               for i, start in enumerate(range(0, windows, per_batch))]
+    
+    workers = _workers(workers, len(batches))
+    if workers == 1:
+        results = [_simulate_batch(*batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_batch, *zip(*batches)))
+    
+    merged: Dict[str, Counter] = {}
+    for histograms in results:
+        for key, counter in histograms.items():
+            merged.setdefault(key, Counter()).update(counter)
+    
+    draws = windows * window
+    distributions = {}
+    for metric in METRICS:
+        # 比例按概率降序，数值按取值升序
+        ratio = metric in ("odd_even", "big_small")
+        items = sorted(merged[metric].items(), key=lambda item: (-item[1], item[0]) if ratio else item[0])
+        distributions[metric] = {value: round(count / draws, 6) for value, count in items}
+    bands = {metric: {} for metric in ("odd_even", "big_small")}
+    for metric in bands:
+        for value in distributions[metric]:
+            bands[metric][value] = _band(merged.get(f"{metric}@{value}", Counter()), windows, CONFIDENCE)
+    bands["consecutive"] = _band(merged["consecutive@runs"], windows, CONFIDENCE)
+    bands["sum"] = _band(merged["sum@total"], windows, CONFIDENCE, window)
+    bands["span"] = _band(merged["span@total"], windows, CONFIDENCE, window)
+    
+    return {
+        "window": window,
+        "windows": windows,
+        "simulations": draws,
+        "seed": seed,
+        "confidence": CONFIDENCE,
+        "distributions": distributions,
+        "bands": bands,
+    }
+
+
+def _binomial_band(n: int, p: float, confidence: float) -> Dict:
+    """n 期中某取值出现期数（二项分布 B(n, p)）的均值和置信区间，分位数定义与 _quantile 相同"""
+    tail = (1 - confidence) / 2
+    if p >= 1:
+        return {"expected": float(n), "low": n, "high": n}
+    log_p, log_q = math.log(p), math.log1p(-p)
+    base = math.lgamma(n + 1)
+    low = high = None
+    seen = 0.0
+    for k in range(n + 1):
+        seen += math.exp(base - math.lgamma(k + 1) - math.lgamma(n - k + 1) + k * log_p + (n - k) * log_q)
+        if low is None and seen >= tail:
+            low = k
+        if seen >= 1 - tail:
+            high = k
+            break
+    return {"expected": round(n * p, 3), "low": low, "high": n if high is None else high}
+
+
+def _normal_band(distribution: Dict[int, float], n: int, confidence: float,
+                 scale: float = 1.0, integral: bool = False) -> Dict:
+    """n 期单期取值之和（除以 scale）的均值和置信区间，按正态近似"""
+    mean = sum(v * p for v, p in distribution.items())
+    variance = sum((v - mean) ** 2 * p for v, p in distribution.items())
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    spread = z * math.sqrt(variance * n)
+    low, high = n * mean - spread, n * mean + spread
+    if integral:
+        low, high = max(math.floor(low), 0), math.ceil(high)
+    return {
+        "expected": round(n * mean / scale, 3),
+        "low": round(low / scale, 3),
+        "high": round(high / scale, 3),
+    }
+
+
+def exact_baseline(spec: ZoneSpec, window: int) -> Dict:
+    """
+    不模拟的随机基线，结构与 simulate 的结果相同（simulations 为 0）
+    
+    单期分布为精确概率；比例类的窗口期数为二项分布的精确分位数，连号组数总和、
+    和值均值、跨度均值按正态近似。
+    """
+    if window < 1:
+        raise ValueError(f"窗口期数需大于 0: {window}")
+    size, pick, big_boundary = spec
+    distributions = {
+        "odd_even": exact_distributions.odd_even(size, pick),
+        "big_small": exact_distributions.big_small(size, pick, big_boundary),
+        "consecutive": exact_distributions.consecutive(size, pick),
+        "sum": exact_distributions.sum_distribution(size, pick),
+        "span": exact_distributions.span(size, pick),
+    }
+    bands = {}
+    for metric in ("odd_even", "big_small"):
+        # 比例按概率降序，与 simulate 相同
+        distributions[metric] = dict(sorted(distributions[metric].items(), key=lambda item: -item[1]))
+        bands[metric] = {value: _binomial_band(window, p, CONFIDENCE) for value, p in distributions[metric].items()}
+    bands["consecutive"] = _normal_band(distributions["consecutive"], window, CONFIDENCE, integral=True)
+    bands["sum"] = _normal_band(distributions["sum"], window, CONFIDENCE, window)
+    bands["span"] = _normal_band(distributions["span"], window, CONFIDENCE, window)
+    
+    return {
+        "window": window,
+        "windows": 0,
+        "simulations": 0,
+        "seed": None,
+        "confidence": CONFIDENCE,
+        "distributions": {metric: {value: round(p, 6) for value, p in distribution.items()}
+                          for metric, distribution in distributions.items()},
+        "bands": bands,
+    }
+
+
+def compare(observed: Dict, baseline: Dict) -> Dict[str, List[Dict]]:
+    """
+    实际统计与随机基线对照
+    
+    observed: {"odd_even": {比例: 期数}, "big_small": {比例: 期数},
+               "consecutive": 连号组数, "sum": 和值均值, "span": 跨度均值}
+    每行的 within 表示实际值落在置信区间内。
+    """
+    bands = baseline["bands"]
+    rows = {}
+    for metric in ("odd_even", "big_small"):
+        counts = observed.get(metric, {})
+        values = list(bands[metric]) + [v for v in counts if v not in bands[metric]]
+        rows[metric] = []
+        for value in values:
+            band = bands[metric].get(value, {"expected": 0.0, "low": 0, "high": 0})
+            count = counts.get(value, 0)
+            rows[metric].append({
+                "value": value,
+                "observed": count,
+                "probability": baseline["distributions"][metric].get(value, 0.0),
+                **band,
+                "within": band["low"] <= count <= band["high"],
+            })
+    for metric in ("consecutive", "sum", "span"):
+        value = observed.get(metric)
+        if value is None:
+            continue
+        band = bands[metric]
+        rows[metric] = [{"value": metric, "observed": value, **band,
+                         "within": band["low"] <= value <= band["high"]}]
+    return rows
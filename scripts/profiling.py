@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段性能剖析
+记录加载、各项分析、报告各部分生成、模板渲染和写文件等阶段的耗时与内存分配
+
+每个阶段记录墙钟时间、CPU 时间，以及 tracemalloc 开启时的净分配量和峰值。
+同名阶段多次执行时累加（峰值取最大）。
+
+钩子 API: 用 add_hook 注册的回调在任意阶段结束时收到 (阶段名, 统计)，
+不需要 --profile 也会触发，可用于接入监控指标；没有剖析器也没有钩子时阶段计时不产生开销。
+
+用法:
+    from profiling import StageProfiler
+    
+    with StageProfiler() as profiler:
+        analyzer = LotteryAnalyzer("ssq", profiler=profiler)
+        analyzer.full_analysis(100)
+        print(profiler.format_table())
+        profiler.dump("/tmp/ssq")      # /tmp/ssq.prof 和 /tmp/ssq.tracemalloc（需 cprofile=True）
+"""
+
+import cProfile
+import functools
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+# 全局钩子: hook(stage, stats)
+StageHook = Callable[[str, Dict], None]
+_hooks: List[StageHook] = []
+
+
+def add_hook(hook: StageHook) -> StageHook:
+    """注册阶段结束回调，返回 hook 本身（可作装饰器用）"""
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: StageHook):
+    """注销阶段结束回调"""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _notify(hooks: List[StageHook], name: str, stats: Dict):
+    """调用钩子；钩子出错不影响被测代码"""
+    for hook in hooks:
+        try:
+            hook(name, stats)
+        except Exception as e:
+            print(f"⚠️ 剖析钩子出错 ({name}): {e}", file=sys.stderr)
+
+
+class StageProfiler:
+    """
+    分阶段剖析器
+    
+    作为上下文管理器使用时按需开启 tracemalloc（记录分配）和 cProfile（dump 用），退出时关闭。
+    """
+    
+    def __init__(self, trace_alloc: bool = True, cprofile: bool = False):
+        self.trace_alloc = trace_alloc
+        self.timings: Dict[str, Dict] = {}
+        self.hooks: List[StageHook] = []
+        self._stack: List[Dict] = []
+        self._profile: Optional[cProfile.Profile] = cProfile.Profile() if cprofile else None
+        self._started_tracing = False
+    
+    def __enter__(self) -> "StageProfiler":
+        if self.trace_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self._profile:
+            self._profile.enable()
+        return self
+    
+    def __exit__(self, *exc):
+        if self._profile:
+            self._profile.disable()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+    
+    def add_hook(self, hook: StageHook) -> StageHook:
+        """注册只对本剖析器生效的阶段结束回调"""
+        self.hooks.append(hook)
+        return hook
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """记录一个阶段；可嵌套，外层阶段的峰值包含内层"""
+        tracing = tracemalloc.is_tracing()
+        frame = {"peak": 0}
+        if tracing:
+            tracemalloc.reset_peak()
+            frame["start"] = tracemalloc.get_traced_memory()[0]
+        self._stack.append(frame)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            stats = {
+                "wall_ms": (time.perf_counter() - wall) * 1000,
+                "cpu_ms": (time.process_time() - cpu) * 1000,
+                "alloc_kib": None,
+                "peak_kib": None,
+            }
+            self._stack.pop()
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame["peak"])
+                stats["alloc_kib"] = (current - frame["start"]) / 1024
+                stats["peak_kib"] = (peak - frame["start"]) / 1024
+                # reset_peak 会抹掉外层阶段到目前为止的峰值，转交给外层
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+                tracemalloc.reset_peak()
+            self._record(name, stats)
+            _notify(self.hooks + _hooks, name, stats)
+    
+    def _record(self, name: str, stats: Dict):
+        """累加同名阶段"""
+        entry = self.timings.get(name)
+        if entry is None:
+            self.timings[name] = dict(stats, calls=1)
+            return
+        entry["calls"] += 1
+        entry["wall_ms"] += stats["wall_ms"]
+        entry["cpu_ms"] += stats["cpu_ms"]
+        if stats["alloc_kib"] is not None:
+            entry["alloc_kib"] = (entry["alloc_kib"] or 0) + stats["alloc_kib"]
+            entry["peak_kib"] = max(entry["peak_kib"] or 0, stats["peak_kib"])
+    
+    def report(self) -> Dict[str, Dict]:
+        """按首次执行顺序返回各阶段统计（可序列化，数值保留 3 位小数）"""
+        return {
+            name: {key: round(value, 3) if isinstance(value, float) else value for key, value in entry.items()}
+            for name, entry in self.timings.items()
+        }
+    
+    def format_table(self) -> str:
+        """各阶段统计的文本表格"""
+        lines = [f"{'阶段':<28}{'次数':>4}{'墙钟(ms)':>10}{'CPU(ms)':>12}{'分配(KiB)':>10}{'峰值(KiB)':>10}"]
+        for name, entry in self.timings.items():
+            alloc = "-" if entry["alloc_kib"] is None else f"{entry['alloc_kib']:.1f}"
+            peak = "-" if entry["peak_kib"] is None else f"{entry['peak_kib']:.1f}"
+            lines.append(f"{name:<30}{entry['calls']:>6}{entry['wall_ms']:>12.2f}{entry['cpu_ms']:>12.2f}"
+                         f"{alloc:>12}{peak:>12}")
+        return "\n".join(lines)
+    
+    def dump(self, prefix: str) -> List[Path]:
+        """
+        导出 cProfile 统计 (<prefix>.prof) 和 tracemalloc 快照 (<prefix>.tracemalloc)
+        
+        需在剖析器退出前调用；.prof 可用 pstats/snakeviz 查看，
+        快照用 tracemalloc.Snapshot.load 读取。
+        """
+        written = []
+        base = Path(prefix)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        if self._profile:
+            path = base.with_name(base.name + ".prof")
+            self._profile.dump_stats(str(path))
+            written.append(path)
+        if tracemalloc.is_tracing():
+            path = base.with_name(base.name + ".tracemalloc")
+            tracemalloc.take_snapshot().dump(str(path))
+            written.append(path)
+        return written
+
+
+def stage(name: str, profiler: Optional[StageProfiler] = None):
+    """
+    阶段上下文: 有剖析器时记录到剖析器，否则只在注册了全局钩子时计时并通知钩子
+    """
+    if profiler is not None:
+        return profiler.stage(name)
+    if _hooks:
+        return _hooked_stage(name)
+    return nullcontext()
+
+
+@contextmanager
+def _hooked_stage(name: str) -> Iterator[None]:
+    """没有剖析器时的轻量计时，只通知全局钩子"""
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        _notify(list(_hooks), name, {
+            "wall_ms": (time.perf_counter() - wall) * 1000,
+            "cpu_ms": (time.process_time() - cpu) * 1000,
+            "alloc_kib": None,
+            "peak_kib": None,
+        })
+
+
+def profiled(name: str):
+    """方法装饰器: 用实例的 profiler 属性记录阶段 name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with stage(name, getattr(self, "profiler", None)):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
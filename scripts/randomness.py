@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖历史随机性检验
+检验历史开奖是否与"每期独立、所有号码等概率"的假设相符
+
+- 均匀性: 各号码出现次数的卡方检验，并列出偏离最大的号码（标准化残差）
+- 游程检验: 每期奇数个数、大号个数相对中位数的高低序列（Wald-Wolfowitz）
+- 序列相关: 相邻两期的重号个数与超几何分布期望比较，和值的一阶自相关
+- 间隔分布: 号码两次开出之间的间隔与几何分布的卡方拟合优度检验
+
+所有检验共用一次构建的位掩码（每期一个整数，相当于 one-hot 矩阵的一行），
+重号个数用 popcount，号码的出现位置一次遍历得到。p 值不依赖 scipy。
+"""
+
+import math
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from draw_bits import ZONE_SIZES, mask_of, mask_sum, zone_masks
+
+ALPHA = 0.05            # 显著性水平
+MIN_EXPECTED = 5        # 卡方检验每组的最小期望频数
+
+
+# ============ 分布函数 ============
+
+def _gamma_q(a: float, x: float) -> float:
+    """正则化上不完全伽马函数 Q(a, x)"""
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        # 级数展开求 P(a, x)
+        term = total = 1.0 / a
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # 连分式（Lentz 算法）
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def chi2_sf(statistic: float, df: int) -> float:
+    """卡方分布的上尾概率"""
+    return _gamma_q(df / 2, statistic / 2)
+
+
+def normal_two_sided(z: float) -> float:
+    """标准正态分布的双侧 p 值"""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _result(statistic_name: str, statistic: float, p_value: float, **extra) -> Dict:
+    result = {statistic_name: round(statistic, 4), "p_value": round(p_value, 4), "random": p_value >= ALPHA}
+    result.update(extra)
+    return result
+
+
+# ============ 检验 ============
+
+def uniformity_test(masks: Sequence[int], size: int) -> Dict:
+    """各号码出现次数的卡方均匀性检验"""
+    counts = [0] * (size + 1)
+    for mask in masks:
+        while mask:
+            low = mask & -mask
+            counts[low.bit_length() - 1] += 1
+            mask ^= low
+    counts = counts[1:]
+    draws = len(masks)
+    total = sum(counts)
+    expected = total / size
+    chi2 = sum((c - expected) ** 2 for c in counts) / expected
+    
+    # 每个号码的次数近似二项分布 B(期数, 每期开出概率)
+    p = total / draws / size
+    sd = math.sqrt(draws * p * (1 - p)) or 1.0
+    deviations = sorted(
+        ({"number": n, "count": c, "z": round((c - expected) / sd, 2)} for n, c in enumerate(counts, 1)),
+        key=lambda item: -abs(item["z"])
+    )
+    return _result("chi2", chi2, chi2_sf(chi2, size - 1), df=size - 1,
+                   expected=round(expected, 2), max_deviation=deviations[:3])
+
+
+def runs_test(values: Sequence[float]) -> Optional[Dict]:
+    """
+    相对中位数的游程检验（Wald-Wolfowitz），等于中位数的值剔除
+    
+    游程过少说明高低成片出现，过多说明交替过于频繁。
+    """
+    ordered = sorted(values)
+    median = ordered[len(ordered) // 2]
+    signs = [v > median for v in values if v != median]
+    above = sum(signs)
+    below = len(signs) - above
+    n = above + below
+    if above == 0 or below == 0 or n < 3:
+        return None
+    runs = 1 + sum(a != b for a, b in zip(signs, signs[1:]))
+    mean = 2 * above * below / n + 1
+    variance = 2 * above * below * (2 * above * below - n) / (n * n * (n - 1))
+    z = (runs - mean) / math.sqrt(variance) if variance > 0 else 0.0
+    return _result("z", z, normal_two_sided(z), runs=runs, expected=round(mean, 2), median=median)
+
+
+def overlap_test(masks: Sequence[int], size: int, pick: int) -> Optional[Dict]:
+    """相邻两期的重号个数与超几何分布期望比较"""
+    if len(masks) < 3:
+        return None
+    overlaps = [(a & b).bit_count() for a, b in zip(masks, masks[1:])]
+    # 从 size 个号码中选 pick 个，与上期 pick 个号码的重合数服从超几何分布
+    mean = pick * pick / size
+    variance = pick * (pick / size) * (1 - pick / size) * (size - pick) / (size - 1)
+    observed = sum(overlaps) / len(overlaps)
+    z = (observed - mean) / math.sqrt(variance / len(overlaps))
+    return _result("z", z, normal_two_sided(z), mean=round(observed, 4), expected=round(mean, 4))
+
+
+def autocorrelation_test(values: Sequence[float]) -> Optional[Dict]:
+    """一阶自相关系数，独立时近似 N(0, 1/n)"""
+    n = len(values)
+    if n < 3:
+        return None
+    mean = sum(values) / n
+    denominator = sum((v - mean) ** 2 for v in values)
+    if denominator == 0:
+        return None
+    r = sum((a - mean) * (b - mean) for a, b in zip(values, values[1:])) / denominator
+    z = r * math.sqrt(n)
+    return _result("z", z, normal_two_sided(z), r=round(r, 4))
+
+
+def gap_test(masks: Sequence[int], size: int, pick: int) -> Optional[Dict]:
+    """
+    号码相邻两次开出的间隔与几何分布的卡方拟合优度检验
+    
+    每期开出某号码的概率 p = pick / size，间隔 g 期（g >= 1）的概率为 p(1-p)^(g-1)。
+    间隔从 1 开始逐个分组，直到期望频数不足 MIN_EXPECTED，其余合并为尾部一组。
+    """
+    last = [-1] * (size + 1)
+    gaps: Dict[int, int] = {}
+    for i, mask in enumerate(masks):
+        while mask:
+            low = mask & -mask
+            number = low.bit_length() - 1
+            if last[number] >= 0:
+                gap = i - last[number]
+                gaps[gap] = gaps.get(gap, 0) + 1
+            last[number] = i
+            mask ^= low
+    total = sum(gaps.values())
+    p = pick / size
+    
+    observed, expected = [], []
+    seen = 0
+    g = 1
+    while True:
+        e = total * p * (1 - p) ** (g - 1)
+        tail = total * (1 - p) ** g
+        if e < MIN_EXPECTED or tail < MIN_EXPECTED:
+            break
+        observed.append(gaps.get(g, 0))
+        expected.append(e)
+        seen += observed[-1]
+        g += 1
+    # 尾部: 间隔 >= g
+    observed.append(total - seen)
+    expected.append(total * (1 - p) ** (g - 1))
+    if len(observed) < 2:
+        return None
+    chi2 = sum((o - e) ** 2 / e for o, e in zip(observed, expected))
+    df = len(observed) - 1
+    return _result("chi2", chi2, chi2_sf(chi2, df), df=df, gaps=total,
+                   mean_gap=round(sum(g * c for g, c in gaps.items()) / total, 3) if total else 0,
+                   expected_mean_gap=round(1 / p, 3))
+
+
+def randomness_tests(history: Sequence[Mapping], lottery_type: str, fields: Tuple[str, str],
+                     picks: Tuple[int, int], big_boundary: int) -> Dict:
+    """
+    对 history（顺序为时间正序）运行全部检验
+    
+    Args:
+        fields: 前区、后区字段名（结果按字段名分组）
+        picks: 前区、后区每期开出的号码个数
+        big_boundary: 大号下限（大小比的分界）
+    """
+    if len(history) < 2:
+        raise ValueError("随机性检验至少需要 2 期历史数据")
+    masks = zone_masks(history, lottery_type)
+    sizes = ZONE_SIZES[lottery_type]
+    front = masks[0]
+    
+    odd_mask = mask_of(range(1, sizes[0] + 1, 2))
+    big_mask = mask_of(range(big_boundary, sizes[0] + 1))
+    sums = [mask_sum(mask) for mask in front]
+    
+    result = {
+        "periods": len(history),
+        "alpha": ALPHA,
+        "uniformity": {},
+        "gaps": {},
+        "runs": {
+            "odd_even": runs_test([(m & odd_mask).bit_count() for m in front]),
+            "big_small": runs_test([(m & big_mask).bit_count() for m in front]),
+            "sum": runs_test(sums),
+        },
+        "serial": {
+            "overlap": overlap_test(front, sizes[0], picks[0]),
+            "sum_lag1": autocorrelation_test(sums),
+        },
+    }
+    for field, zone, size, pick in zip(fields, masks, sizes, picks):
+        result["uniformity"][field] = uniformity_test(zone, size)
+        result["gaps"][field] = gap_test(zone, size, pick)
+    
+    tests: List[Dict] = [
+        test for group in ("uniformity", "gaps", "runs", "serial")
+        for test in result[group].values() if test is not None
+    ]
+    result["summary"] = {
+        "tests": len(tests),
+        "rejected": sum(not test["random"] for test in tests),
+        # 多个检验时即使完全随机，也预期约 alpha 比例被拒绝
+        "expected_false_rejections": round(len(tests) * ALPHA, 2),
+    }
+    return result
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滚动窗口时间序列
+逐期计算最近 window 期内各号码的出现次数，以及和值、跨度的滚动均值和标准差
+
+窗口统计用累积和的差分: 窗口右移一期时加上新进入的一期、减去移出的一期，
+每期只改动开出的几个号码，不必对每个位置重新统计整个窗口。和值、跨度的方差由
+窗口内的 Σx、Σx² 得到，全程整数运算，没有浮点累积误差。
+
+导出格式:
+    NDJSON: 每个 (窗口, 期) 一行，可边算边写
+    .npy:   NumPy 1.0 格式的 float64 数组，形状 (窗口数, 期数, 列数)，不依赖 numpy
+
+用法:
+    python analyze_history.py --type ssq --metric rolling --periods 2000 --windows 10,30,100 --export /tmp/ssq.ndjson
+    python analyze_history.py --type ssq --metric rolling --periods 2000 --export /tmp/ssq.npy
+"""
+
+import json
+import struct
+import sys
+from array import array
+from typing import Dict, IO, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+from draw_bits import ZONE_SIZES, mask_sum, zone_masks
+
+DEFAULT_WINDOWS = (10, 30, 100)
+
+# 每期一组滚动统计: (位置, 前区各号码次数, 后区各号码次数, 和值均值, 和值标准差, 跨度均值, 跨度标准差)
+RollingRow = Tuple[int, List[int], List[int], float, float, float, float]
+
+
+def columns(lottery_type: str) -> List[str]:
+    """.npy 导出的列名"""
+    front, back = ZONE_SIZES[lottery_type]
+    return ([f"front_{n:02d}" for n in range(1, front + 1)] + [f"back_{n:02d}" for n in range(1, back + 1)]
+            + ["sum_mean", "sum_std", "span_mean", "span_std"])
+
+
+def _mean_std(total: int, squares: int, n: int) -> Tuple[float, float]:
+    """窗口内 n 个值的均值和总体标准差（由 Σx、Σx² 计算）"""
+    variance = (n * squares - total * total) / (n * n)
+    return total / n, max(variance, 0.0) ** 0.5
+
+
+def iter_rolling(history: Sequence[Mapping], lottery_type: str, window: int,
+                 start: int = 0) -> Iterator[RollingRow]:
+    """
+    history 按时间正序（最早一期在前），产出位置 i >= max(start, window - 1) 的滚动统计
+    
+    窗口为第 i - window + 1 到第 i 期（含）。
+    """
+    if window < 1:
+        raise ValueError(f"窗口期数需大于 0: {window}")
+    front_masks, back_masks = zone_masks(history, lottery_type)
+    front_size, back_size = ZONE_SIZES[lottery_type]
+    front_counts = [0] * (front_size + 1)
+    back_counts = [0] * (back_size + 1)
+    
+    # 每期前区号码的和值与跨度
+    sums = [mask_sum(mask) for mask in front_masks]
+    spans = [mask.bit_length() - (mask & -mask).bit_length() if mask else 0 for mask in front_masks]
+    
+    sum_total = sum_squares = span_total = span_squares = 0
+    first = max(start, window - 1)
+    for i in range(len(history)):
+        for counts, mask in ((front_counts, front_masks[i]), (back_counts, back_masks[i])):
+            while mask:
+                low = mask & -mask
+                counts[low.bit_length() - 1] += 1
+                mask ^= low
+        sum_total += sums[i]
+        sum_squares += sums[i] * sums[i]
+        span_total += spans[i]
+        span_squares += spans[i] * spans[i]
+        
+        old = i - window
+        if old >= 0:
+            for counts, mask in ((front_counts, front_masks[old]), (back_counts, back_masks[old])):
+                while mask:
+                    low = mask & -mask
+                    counts[low.bit_length() - 1] -= 1
+                    mask ^= low
+            sum_total -= sums[old]
+            sum_squares -= sums[old] * sums[old]
+            span_total -= spans[old]
+            span_squares -= spans[old] * spans[old]
+        
+        if i >= first:
+            sum_mean, sum_std = _mean_std(sum_total, sum_squares, window)
+            span_mean, span_std = _mean_std(span_total, span_squares, window)
+            yield i, front_counts[1:], back_counts[1:], sum_mean, sum_std, span_mean, span_std
+
+
+def rolling_series(history: Sequence[Mapping], lottery_type: str, windows: Iterable[int],
+                   periods: int) -> Dict:
+    """
+    最近 periods 期（history 末尾）在各窗口下的滚动统计
+    
+    history 需包含 periods + max(windows) - 1 期才能让每个窗口都是满的；
+    不足时从第一个满窗口开始，各窗口的期数可能少于 periods。
+    """
+    windows = sorted(set(windows))
+    start = max(len(history) - periods, 0)
+    series = {}
+    for window in windows:
+        front, back, sum_mean, sum_std, span_mean, span_std, positions = [], [], [], [], [], [], []
+        for i, front_counts, back_counts, *stats in iter_rolling(history, lottery_type, window, start):
+            positions.append(i)
+            front.append(front_counts)
+            back.append(back_counts)
+            for values, value in zip((sum_mean, sum_std, span_mean, span_std), stats):
+                values.append(round(value, 3))
+        series[str(window)] = {
+            "issues": [history[i]["issue"] for i in positions],
+            "front": front,
+            "back": back,
+            "sum_mean": sum_mean,
+            "sum_std": sum_std,
+            "span_mean": span_mean,
+            "span_std": span_std,
+        }
+    return {"windows": windows, "series": series}
+
+
+def write_ndjson(out: IO[str], history: Sequence[Mapping], lottery_type: str,
+                 windows: Iterable[int], periods: int) -> int:
+    """逐行写出滚动统计（边算边写），返回行数"""
+    start = max(len(history) - periods, 0)
+    written = 0
+    for window in sorted(set(windows)):
+        for i, front, back, sum_mean, sum_std, span_mean, span_std in iter_rolling(
+                history, lottery_type, window, start):
+            out.write(json.dumps({
+                "window": window,
+                "issue": history[i]["issue"],
+                "front": front,
+                "back": back,
+                "sum_mean": round(sum_mean, 3),
+                "sum_std": round(sum_std, 3),
+                "span_mean": round(span_mean, 3),
+                "span_std": round(span_std, 3),
+            }, separators=(",", ":")))
+            out.write("\n")
+            written += 1
+    return written
+
+
+def _npy_header(shape: Tuple[int, ...]) -> bytes:
+    """NumPy 1.0 格式文件头（总长度按 64 字节对齐）"""
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%s), }" % (
+        "".join(f"{n}," for n in shape) if len(shape) == 1 else ", ".join(map(str, shape)))
+    pad = 64 - (10 + len(header) + 1) % 64
+    header = header + " " * (pad % 64) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def write_npy(out: IO[bytes], history: Sequence[Mapping], lottery_type: str,
+              windows: Iterable[int], periods: int) -> Tuple[int, ...]:
+    """
+    写出 float64 数组，形状 (窗口数, 期数, 列数)，列见 columns()
+    
+    需要每个窗口的期数相同: history 至少包含 periods + max(windows) - 1 期。
+    """
+    windows = sorted(set(windows))
+    start = max(len(history) - periods, 0)
+    rows = len(history) - max(start, windows[-1] - 1)
+    if rows <= 0:
+        raise ValueError(f"历史期数不足: 窗口 {windows[-1]} 期至少需要 {windows[-1]} 期数据")
+    shape = (len(windows), rows, len(columns(lottery_type)))
+    out.write(_npy_header(shape))
+    
+    for window in windows:
+        for _, front, back, *stats in iter_rolling(history, lottery_type, window, len(history) - rows):
+            values = array("d", front + back + stats)
+            if sys.byteorder == "big":
+                values.byteswap()
+            out.write(values.tobytes())
+    return shape
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史最相似开奖查询
+对一注（或一批）号码，找出历史上与它重合最多的 K 期开奖: 先比前区命中个数，
+再比后区命中个数，同分时较新的一期在前
+
+开奖历史按号码转置成位列: 号码 n 的列是一个大整数，第 i 期开出 n 时第 i 个字节为
+该号码的权重（前区 8、后区 1）。一注号码与所有历史开奖的命中个数（即两个位掩码
+按位与后的 popcount）就是它所含号码各列之和，每个号码一次整数加法，全部期数的
+结果同时得到；转成 bytes 后按取值从高到低查找，取前 K 期，不逐期比较。
+前区命中个数确定时 Jaccard 系数（交集 / 并集）也随之确定，排序与按 Jaccard 相同。
+
+用法:
+    python generate_fixed_numbers.py --type ssq --fixed-red 07,18,25,30 --similar 5
+    python generate_fixed_numbers.py --type dlt --similar-file tickets.txt
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from draw_bits import ZONE_SIZES, mask_numbers, zone_masks
+
+DEFAULT_TOP_K = 5
+CHUNK_TICKETS = 5_000           # 批量查询每批的注数
+PARALLEL_TICKETS = 50_000       # 批量超过此注数才启用进程池
+BACK_BITS = 3                   # 每个字节低 3 位为后区命中个数，前区命中个数从第 3 位开始
+
+# 一注号码: (前区位掩码, 后区位掩码)
+Ticket = Tuple[int, int]
+
+
+def _columns(masks: Sequence[int], size: int, weight: int) -> List[int]:
+    """号码 1..size 的位列: 第 i 期开出该号码时第 i 个字节为 weight（下标 0 不用）"""
+    rows = [bytearray(len(masks)) for _ in range(size + 1)]
+    for i, mask in enumerate(masks):
+        while mask:
+            low = mask & -mask
+            rows[low.bit_length() - 1][i] = weight
+            mask ^= low
+    return [int.from_bytes(row, "little") for row in rows]
+
+
+def _top_indices(scores: bytes, k: int, candidates: Sequence[int]) -> List[int]:
+    """得分最高的 k 个下标，同分时下标小的在前；candidates 为可能的得分（降序）"""
+    found: List[int] = []
+    for value in candidates:
+        position = scores.find(value)
+        while position >= 0 and len(found) < k:
+            found.append(position)
+            position = scores.find(value, position + 1)
+        if len(found) == k:
+            break
+    return found
+
+
+def _search_chunk(front_columns: List[int], back_columns: List[int], periods: int,
+                  tickets: Sequence[Ticket], k: int) -> List[List[Tuple[int, int]]]:
+    """一批号码各自的前 k 期: [(期下标, 得分)]，得分 = 前区命中 << BACK_BITS | 后区命中"""
+    results = []
+    for front, back in tickets:
+        candidates = [(f << BACK_BITS) | b for f in range(front.bit_count(), -1, -1)
+                      for b in range(back.bit_count(), -1, -1)]
+        total = 0
+        while front:
+            low = front & -front
+            total += front_columns[low.bit_length() - 1]
+            front ^= low
+        while back:
+            low = back & -back
+            total += back_columns[low.bit_length() - 1]
+            back ^= low
+        scores = total.to_bytes(periods, "little")
+        results.append([(i, scores[i]) for i in _top_indices(scores, k, candidates)])
+    return results
+
+
+class DrawIndex:
+    """
+    开奖历史的位列索引（最新一期在前），对同一份历史数据构建一次，之后反复查询
+    """
+    
+    def __init__(self, records: Sequence[Mapping], lottery_type: str):
+        self.lottery_type = lottery_type
+        self.front, self.back = zone_masks(records, lottery_type)
+        self.issues = [record["issue"] for record in records]
+        self.dates = [record["draw_date"] for record in records]
+        self.numbers = [(mask_numbers(f), mask_numbers(b)) for f, b in zip(self.front, self.back)]
+        sizes = ZONE_SIZES[lottery_type]
+        self.front_columns = _columns(self.front, sizes[0], 1 << BACK_BITS)
+        self.back_columns = _columns(self.back, sizes[1], 1)
+    
+    def __len__(self) -> int:
+        return len(self.front)
+    
+    def _match(self, index: int, score: int, ticket: Ticket) -> Dict:
+        front_matches = score >> BACK_BITS
+        union = ticket[0].bit_count() + self.front[index].bit_count() - front_matches
+        return {
+            "issue": self.issues[index],
+            "draw_date": self.dates[index],
+            "front": self.numbers[index][0],
+            "back": self.numbers[index][1],
+            "front_matches": front_matches,
+            "back_matches": score & ((1 << BACK_BITS) - 1),
+            "jaccard": round(front_matches / union, 4) if union else 0.0,
+        }
+    
+    def similar(self, ticket: Ticket, k: int = DEFAULT_TOP_K) -> List[Dict]:
+        """与一注号码最相似的 k 期开奖"""
+        return self.similar_batch([ticket], k)[0]
+    
+    def similar_batch(self, tickets: Sequence[Ticket], k: int = DEFAULT_TOP_K,
+                      workers: Optional[int] = None) -> List[List[Dict]]:
+        """
+        每注号码最相似的 k 期开奖，顺序与 tickets 相同
+        
+        按 CHUNK_TICKETS 注一批，注数超过 PARALLEL_TICKETS 时分给进程池。
+        """
+        if not self.front or not tickets:
+            return [[] for _ in tickets]
+        chunks = [tickets[i:i + CHUNK_TICKETS] for i in range(0, len(tickets), CHUNK_TICKETS)]
+        args = (self.front_columns, self.back_columns, len(self.front))
+        workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+        if workers == 1 or len(tickets) < PARALLEL_TICKETS:
+            found = [result for chunk in chunks for result in _search_chunk(*args, chunk, k)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                found = [result for results in pool.map(_search_chunk, *zip(*((*args, chunk, k) for chunk in chunks)))
+                         for result in results]
+        return [[self._match(index, score, ticket) for index, score in matches]
+                for ticket, matches in zip(tickets, found)]
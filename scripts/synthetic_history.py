@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成开奖历史生成器（压力测试用）
+按开奖日历生成期号连续、日期正确的大规模历史数据，输出为流
+
+期号按年编号 yyyyNNN，每年从 001 开始；开奖日期按开奖日历（双色球周二、四、日，
+大乐透周一、三、六）。历史默认从 FIRST_YEAR 年起，期数超过这段日历的容量时自动加密为
+每年更多期（每年最多 999 期，日期在全年均匀分布），仍放不下时再往前延伸年份；
+未指定结束日期时，结束年份会顺延到放得下为止，因此最多可生成 9999 × 999 ≈ 10^7 期。
+大乐透 2000 年以前（或 2099 年以后）的期号写成 7 位，与官方 5 位期号不会相撞。
+
+号码从全部组合的打包表中按随机下标选取（每期独立、所有组合等概率），
+不在循环里逐期 random.sample 和排序。
+
+用法:
+    # 100 万期双色球，NDJSON 输出到文件
+    python synthetic_history.py --type ssq --count 1000000 -o /tmp/ssq.ndjson
+    
+    # 输出 JSON 数组到标准输出
+    python synthetic_history.py --type dlt --count 100000 --format json
+    
+    # 直接写成分片存储（data/<type> 布局）
+    python synthetic_history.py --type ssq --count 100000 --store /tmp/ssq
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import date
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from draw_store import Draw, format_issue, save_draws
+from update_scheduler import DRAW_CALENDAR
+
+MAX_PER_YEAR = 999          # 期号 NNN 三位
+MAX_YEAR = 9999
+FIRST_YEAR = 2000           # 合成历史默认的起始年份
+DEFAULT_END = date(2025, 12, 31)
+DEFAULT_SEED = 20260101
+
+# 号码组合表: 各区号码范围和个数
+BALL_ZONES = {
+    "ssq": ((33, 6), (16, 1)),
+    "dlt": ((35, 5), (12, 2)),
+}
+
+# 输出格式: 每期一行，字段顺序与存储格式一致
+LINE_TEMPLATES = {
+    "ssq": ('{"lottery_type": "ssq", "issue": "%s", "draw_date": "%s", '
+            '"red_balls": [%d, %d, %d, %d, %d, %d], "blue_ball": %d, "prize_info": {}}'),
+    "dlt": ('{"lottery_type": "dlt", "issue": "%s", "draw_date": "%s", '
+            '"front_zone": [%d, %d, %d, %d, %d], "back_zone": [%d, %d], "prize_info": {}}'),
+}
+
+_combo_tables: Dict[Tuple[int, int], bytes] = {}
+
+
+def combo_table(size: int, pick: int) -> bytes:
+    """从 1..size 中选 pick 个的全部升序组合，依次打包为 bytes（首次使用时构建并缓存）"""
+    key = (size, pick)
+    if key not in _combo_tables:
+        _combo_tables[key] = b"".join(map(bytes, combinations(range(1, size + 1), pick)))
+    return _combo_tables[key]
+
+
+def calendar_capacity(lottery_type: str, end: date, first_year: int = 1) -> int:
+    """first_year 年 1 月 1 日到 end（含）之间的开奖次数"""
+    def draws_until(last: int) -> int:
+        # date.fromordinal(1) 是周一，序数 o 的星期为 (o - 1) % 7
+        return sum((last - 1 - weekday) // 7 + 1 for weekday in DRAW_CALENDAR[lottery_type]["weekdays"])
+    
+    before = date(first_year, 1, 1).toordinal() - 1
+    return max(draws_until(end.toordinal()) - draws_until(before), 0)
+
+
+def _year_ordinals(lottery_type: str, year: int, per_year: Optional[int]) -> List[int]:
+    """某一年所有开奖日的日期序数（升序）"""
+    first = date(year, 1, 1).toordinal()
+    days = date(year + 1, 1, 1).toordinal() - first if year < 9999 else 365
+    if per_year is None:
+        weekdays = DRAW_CALENDAR[lottery_type]["weekdays"]
+        return [o for o in range(first, first + days) if (o - 1) % 7 in weekdays]
+    return [first + seq * days // per_year for seq in range(per_year)]
+
+
+def _schedule_blocks(lottery_type: str, count: int, end: Optional[date],
+                     per_year: Optional[int]) -> Iterator[Tuple[range, List[int]]]:
+    """
+    按年产出 (该年期号降序, 对应开奖日期序数)，最新一年在前
+    
+    end 为 None 时默认截至 DEFAULT_END，期数放不下时把结束年份往后顺延。
+    """
+    shiftable = end is None
+    end = end or DEFAULT_END
+    if per_year is None and count > calendar_capacity(lottery_type, end, FIRST_YEAR):
+        per_year = min(math.ceil(count / max(end.year - FIRST_YEAR + 1, 1)), MAX_PER_YEAR)
+    if per_year is not None:
+        if not 1 <= per_year <= MAX_PER_YEAR:
+            raise ValueError(f"每年期数需在 1-{MAX_PER_YEAR} 之间")
+        years = math.ceil(count / per_year)
+        if years > MAX_YEAR:
+            raise ValueError(f"每年 {per_year} 期最多生成 {MAX_YEAR * per_year} 期，放不下 {count} 期")
+        if shiftable and years > end.year:
+            end = date(years, 12, 31)
+    
+    end_ordinal = end.toordinal()
+    remaining = count
+    year = end.year
+    while remaining > 0:
+        if year < 1:
+            raise ValueError(f"{end.year} 年之前放不下 {count} 期，请增大 per_year 或推后结束日期")
+        ordinals = _year_ordinals(lottery_type, year, per_year)
+        if year == end.year:
+            ordinals = [o for o in ordinals if o <= end_ordinal]
+        last = year * 1000 + len(ordinals)
+        n = min(len(ordinals), remaining)
+        yield range(last, last - n, -1), ordinals[::-1][:n]
+        remaining -= n
+        year -= 1
+
+
+def draw_schedule(lottery_type: str, count: int, end: Optional[date] = None,
+                  per_year: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """
+    最新一期在前，逐期产出 (整数期号 yyyyNNN, 开奖日期序数)
+    
+    per_year 为 None 时按开奖日历；FIRST_YEAR 年以来的日历容量不足 count 期时自动改为
+    每年均匀分布 ceil(count / 年数) 期（最多 MAX_PER_YEAR 期，不够再往前延伸年份）。
+    """
+    for keys, ordinals in _schedule_blocks(lottery_type, count, end, per_year):
+        yield from zip(keys, ordinals)
+
+
+def _iter_packed(lottery_type: str, count: int, end: Optional[date], per_year: Optional[int],
+                 seed: int) -> Iterator[Tuple[int, int, bytes]]:
+    """逐期产出 (期号, 日期序数, 打包号码)"""
+    (size_a, pick_a), (size_b, pick_b) = BALL_ZONES[lottery_type]
+    table_a = combo_table(size_a, pick_a)
+    table_b = combo_table(size_b, pick_b)
+    combos_b = len(table_b) // pick_b
+    
+    # 一次随机数同时选出两区组合（53 位浮点数映射到 ~10^7 个组合，偏差可忽略）
+    rand = random.Random(seed).random
+    total = len(table_a) // pick_a * combos_b
+    for keys, ordinals in _schedule_blocks(lottery_type, count, end, per_year):
+        for key, ordinal in zip(keys, ordinals):
+            index_a, index_b = divmod(int(rand() * total), combos_b)
+            a = index_a * pick_a
+            b = index_b * pick_b
+            yield key, ordinal, table_a[a:a + pick_a] + table_b[b:b + pick_b]
+
+
+def synthetic_draws(lottery_type: str, count: int, end: Optional[date] = None,
+                    per_year: Optional[int] = None, seed: int = DEFAULT_SEED) -> Iterator[Draw]:
+    """
+    生成合成开奖历史（最新一期在前），逐期产出 Draw
+    
+    Args:
+        lottery_type: 彩票类型
+        count: 期数
+        end: 最后一期不晚于该日期，None 为 DEFAULT_END（期数放不下时顺延）
+        per_year: 每年期数，None 为按开奖日历
+        seed: 随机种子，相同参数生成相同的历史
+    """
+    for key, ordinal, balls in _iter_packed(lottery_type, count, end, per_year, seed):
+        yield Draw(lottery_type, key, ordinal, balls)
+
+
+def iter_lines(lottery_type: str, count: int, end: Optional[date] = None,
+               per_year: Optional[int] = None, seed: int = DEFAULT_SEED) -> Iterator[str]:
+    """与 synthetic_draws 相同的历史，逐期产出一行 JSON 文本（不构造记录对象）"""
+    template = LINE_TEMPLATES[lottery_type]
+    iso_dates: Dict[int, str] = {}
+    for key, ordinal, balls in _iter_packed(lottery_type, count, end, per_year, seed):
+        iso = iso_dates.get(ordinal)
+        if iso is None:
+            iso = iso_dates[ordinal] = date.fromordinal(ordinal).isoformat()
+        yield template % (format_issue(key, lottery_type), iso, *balls)
+
+
+def write_history(lines: Iterator[str], out: TextIO, fmt: str = "ndjson") -> int:
+    """把逐行记录写成 NDJSON 或 JSON 数组，返回写入期数"""
+    written = 0
+    if fmt == "json":
+        out.write("[")
+        for line in lines:
+            out.write(",\n" if written else "\n")
+            out.write(line)
+            written += 1
+        out.write("\n]\n")
+    else:
+        for line in lines:
+            out.write(line)
+            out.write("\n")
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成开奖历史生成器（压力测试用）")
+    parser.add_argument("--type", "-t", choices=list(BALL_ZONES), required=True, help="彩票类型")
+    parser.add_argument("--count", "-n", type=int, default=100000, help="期数 (默认: 100000)")
+    parser.add_argument("--end", help="最后一期不晚于该日期 (默认: 2025-12-31，期数放不下时顺延)")
+    parser.add_argument("--per-year", type=int, help="每年期数（默认按开奖日历，容量不足时自动加密）")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子")
+    parser.add_argument("--format", "-f", choices=["ndjson", "json"], default="ndjson", help="输出格式")
+    parser.add_argument("--output", "-o", help="输出文件（默认标准输出）")
+    parser.add_argument("--store", help="直接写成分片存储的目录")
+    
+    args = parser.parse_args()
+    
+    try:
+        end = date.fromisoformat(args.end) if args.end else None
+        started = time.perf_counter()
+        if args.store:
+            written = len(save_draws(Path(args.store),
+                                     synthetic_draws(args.type, args.count, end, args.per_year, args.seed),
+                                     args.type))
+            target = args.store
+        else:
+            lines = iter_lines(args.type, args.count, end, args.per_year, args.seed)
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    written = write_history(lines, f, args.format)
+            else:
+                written = write_history(lines, sys.stdout, args.format)
+            target = args.output or "stdout"
+        elapsed = time.perf_counter() - started
+        print(f"✅ 已生成 {written} 期 -> {target} ({elapsed:.2f} 秒, {written / max(elapsed, 1e-9):,.0f} 期/秒)",
+              file=sys.stderr)
+    except Exception as e:
+        print(f"❌ 错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
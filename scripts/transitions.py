@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相邻两期的号码转移统计
+- 转移矩阵: 上期开出号码 i 时，本期开出号码 j 的次数（K×K）
+- 重复概率: P(本期开出 i | 上期开出 i)
+- 间隔概率: P(本期开出 | 距上次开出已 g 期)，所有号码合并统计
+
+转移矩阵按行累加: 本期掩码展开为打包计数（每个号码一个字段），加到上期每个
+开出号码的行上，每期只做 k 次大整数加法，相当于逐期累加两个掩码的外积。
+间隔统计按"年龄掩码"分组: 向前第 g 期开出、且之后未再开出的号码正好间隔 g 期。
+
+用法:
+    python analyze_history.py --type ssq --metric transitions --periods 1000
+"""
+
+from typing import Dict, List, Sequence
+
+from draw_bits import spread_mask, unpack_counts
+
+GAP_LIMIT = 30      # 间隔统计逐期列出的上限，更长的间隔合并为一组
+
+
+def transition_matrix(masks: Sequence[int], size: int) -> List[List[int]]:
+    """masks 按时间正序，返回 matrix[i-1][j-1] = 上期含 i 且本期含 j 的次数"""
+    width = max(len(masks), 1).bit_length() + 1
+    rows = [0] * (size + 1)
+    spreads = [spread_mask(mask, width) for mask in masks]
+    for previous, packed in zip(masks, spreads[1:]):
+        while previous:
+            low = previous & -previous
+            rows[low.bit_length() - 1] += packed
+            previous ^= low
+    return [unpack_counts(row, width, size) for row in rows[1:]]
+
+
+def gap_hits(masks: Sequence[int], size: int, gap_limit: int = GAP_LIMIT) -> Dict[str, Dict]:
+    """
+    按距上次开出的期数 g 统计: 试验次数（号码处于间隔 g 的期数）与命中次数（该期开出）
+    
+    序列开头尚不知道间隔的号码不计入；间隔超过 gap_limit 的合并为 "<gap_limit + 1>+"。
+    """
+    full = (1 << (size + 1)) - 2
+    trials = [0] * (gap_limit + 2)
+    hits = [0] * (gap_limit + 2)
+    for t in range(1, len(masks)):
+        current = masks[t]
+        seen = 0
+        for g in range(1, min(t, gap_limit) + 1):
+            aged = masks[t - g] & ~seen
+            trials[g] += aged.bit_count()
+            hits[g] += (aged & current).bit_count()
+            seen |= masks[t - g]
+        if t > gap_limit:
+            rest = full & ~seen
+            trials[gap_limit + 1] += rest.bit_count()
+            hits[gap_limit + 1] += (rest & current).bit_count()
+    
+    result = {}
+    for g in range(1, gap_limit + 2):
+        if trials[g]:
+            key = str(g) if g <= gap_limit else f"{g}+"
+            result[key] = {"trials": trials[g], "hits": hits[g], "probability": round(hits[g] / trials[g], 4)}
+    return result
+
+
+def transition_stats(masks: Sequence[int], size: int, pick: int) -> Dict:
+    """masks 按时间正序（最早一期在前）的全部转移统计"""
+    matrix = transition_matrix(masks, size)
+    # 作为"上期"出现的次数（不含最后一期）
+    previous_counts = [0] * size
+    for mask in masks[:-1]:
+        while mask:
+            low = mask & -mask
+            previous_counts[low.bit_length() - 2] += 1
+            mask ^= low
+    return {
+        "periods": len(masks),
+        "transitions": max(len(masks) - 1, 0),
+        "numbers": size,
+        "expected": round(pick / size, 4),
+        "previous_counts": previous_counts,
+        "matrix": matrix,
+        "repeat_probability": {
+            i + 1: round(matrix[i][i] / previous_counts[i], 4) for i in range(size) if previous_counts[i]
+        },
+        "gap_probability": gap_hits(masks, size),
+    }
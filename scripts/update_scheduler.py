@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开奖日历感知的数据更新调度器
+双色球每周二、四、日开奖，大乐透每周一、三、六开奖
+
+调度器只在预计开奖之后的时间窗口内轮询数据源，拿到新一期后立即停止轮询，
+并触发开奖后的预计算（分析结果、HTML 报告），让开奖后的第一次查询直接命中结果。
+是否有新数据由分片清单判断: 数据集版本变化说明有写入，清单记录的最新开奖日期
+说明这次开奖是否已经入库。预计算结果写入共享分析缓存的磁盘层（data/cache/analysis）。
+
+用法:
+    # 常驻运行，调度所有彩种
+    python update_scheduler.py
+    
+    # 只调度双色球
+    python update_scheduler.py --type ssq
+    
+    # 只检查一轮后退出（适合 cron 定时调用）
+    python update_scheduler.py --once
+    
+    # 查看各彩种下一次轮询计划
+    python update_scheduler.py --plan
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import metrics
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 项目路径
+PROJECT_ROOT = Path(__file__).parent.parent
+REPORT_DIR = PROJECT_ROOT / "reports"
+
+# 开奖日历（weekday: 周一=0 ... 周日=6）
+DRAW_CALENDAR = {
+    "ssq": {
+        "name": "双色球",
+        "weekdays": (1, 3, 6),   # 周二、周四、周日
+        "draw_time": (21, 15),
+    },
+    "dlt": {
+        "name": "大乐透",
+        "weekdays": (0, 2, 5),   # 周一、周三、周六
+        "draw_time": (21, 25),
+    }
+}
+
+# 轮询配置
+POLL_DELAY = timedelta(minutes=30)      # 开奖后多久开始轮询
+POLL_WINDOW = timedelta(hours=18)       # 轮询窗口长度（数据源可能次日才更新）
+POLL_INTERVAL = timedelta(minutes=20)   # 窗口内的轮询间隔
+PRECOMPUTE_PERIODS = 100                # 开奖后预计算的分析期数
+
+
+def _draw_at(lottery_type: str, day: datetime) -> datetime:
+    """指定日期的开奖时刻"""
+    hour, minute = DRAW_CALENDAR[lottery_type]["draw_time"]
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def last_draw_time(lottery_type: str, now: datetime) -> datetime:
+    """now 之前（含）最近一次开奖时刻"""
+    weekdays = DRAW_CALENDAR[lottery_type]["weekdays"]
+    for days_back in range(8):
+        draw = _draw_at(lottery_type, now - timedelta(days=days_back))
+        if draw.weekday() in weekdays and draw <= now:
+            return draw
+    raise ValueError(f"开奖日历配置错误: {lottery_type}")
+
+
+def next_draw_time(lottery_type: str, now: datetime) -> datetime:
+    """now 之后最近一次开奖时刻"""
+    weekdays = DRAW_CALENDAR[lottery_type]["weekdays"]
+    for days_ahead in range(8):
+        draw = _draw_at(lottery_type, now + timedelta(days=days_ahead))
+        if draw.weekday() in weekdays and draw > now:
+            return draw
+    raise ValueError(f"开奖日历配置错误: {lottery_type}")
+
+
+def poll_window(draw: datetime) -> Tuple[datetime, datetime]:
+    """某次开奖对应的轮询窗口 [开始, 结束)"""
+    start = draw + POLL_DELAY
+    return start, start + POLL_WINDOW
+
+
+def fetch_from_source(lottery_type: str) -> int:
+    """默认的数据获取方式: 从 lottery_history 增量导入，返回新增条数"""
+    from import_from_lottery_history import import_lottery_data
+    added, _ = import_lottery_data(lottery_type)
+    return added
+
+
+def local_latest_date(lottery_type: str) -> str:
+    """本地最新开奖日期（YYYY-MM-DD，取自分片清单，不含日期乱序的记录），无数据时返回空字符串"""
+    from draw_store import has_draws, latest_draw_date
+    from import_from_lottery_history import DATA_SOURCES
+    data_dir = DATA_SOURCES[lottery_type]["data_dir"]
+    return latest_draw_date(data_dir) if has_draws(data_dir) else ""
+
+
+def local_dataset_version(lottery_type: str) -> str:
+    """本地数据集版本（分片清单摘要），无数据时返回空字符串"""
+    from draw_store import dataset_version, has_draws
+    from import_from_lottery_history import DATA_SOURCES
+    data_dir = DATA_SOURCES[lottery_type]["data_dir"]
+    return dataset_version(data_dir) if has_draws(data_dir) else ""
+
+
+def precompute_analysis(lottery_type: str):
+    """开奖后预计算分析结果，写入共享缓存的磁盘层，之后的分析和报告进程直接命中"""
+    from analysis_cache import SHARED_CACHE
+    from analyze_history import LotteryAnalyzer
+    
+    LotteryAnalyzer(lottery_type, cache=SHARED_CACHE).full_analysis(PRECOMPUTE_PERIODS)
+    logger.info(f"分析结果已预计算: {SHARED_CACHE.disk_dir}")
+
+
+def rebuild_report(lottery_type: str):
+    """开奖后重建 HTML 报告"""
+    from generate_report import ReportGenerator
+    
+    generator = ReportGenerator(lottery_type)
+    html = generator.generate(generator.load_analysis_data(PRECOMPUTE_PERIODS))
+    output = generator.save_report(html, str(REPORT_DIR / f"{lottery_type}_report_latest.html"))
+    logger.info(f"报告已重建: {output}")
+
+
+class UpdateScheduler:
+    """按开奖日历调度数据更新"""
+    
+    def __init__(self, lottery_types: List[str],
+                 fetcher: Callable[[str], int] = fetch_from_source,
+                 latest_date: Callable[[str], str] = local_latest_date,
+                 version: Callable[[str], str] = local_dataset_version,
+                 poll_interval: timedelta = POLL_INTERVAL,
+                 clock: Callable[[], datetime] = datetime.now,
+                 sleep: Callable[[float], None] = time.sleep,
+                 metrics_textfile: Optional[Path] = None):
+        for lottery_type in lottery_types:
+            if lottery_type not in DRAW_CALENDAR:
+                raise ValueError(f"不支持的彩票类型: {lottery_type}")
+        
+        self.lottery_types = lottery_types
+        self.fetcher = fetcher
+        self.latest_date = latest_date
+        self.version = version
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        # 每轮检查后写入的 node-exporter textfile（None 为不写）
+        self.metrics_textfile = metrics_textfile
+        self.hooks: List[Callable[[str], None]] = []
+        # 每个彩种已经处理完（拿到数据或窗口结束）的最近一次开奖
+        self.done: Dict[str, Optional[datetime]] = {t: None for t in lottery_types}
+    
+    def add_hook(self, hook: Callable[[str], None]):
+        """注册开奖数据入库后的回调，参数为彩票类型"""
+        self.hooks.append(hook)
+    
+    def pending_draw(self, lottery_type: str, now: datetime) -> Optional[datetime]:
+        """当前处于轮询窗口内且尚未处理的开奖，没有则返回 None"""
+        draw = last_draw_time(lottery_type, now)
+        start, end = poll_window(draw)
+        if start <= now < end and self.done[lottery_type] != draw:
+            return draw
+        return None
+    
+    def next_wakeup(self, now: datetime) -> datetime:
+        """下一次需要醒来的时刻"""
+        wakeups = []
+        for lottery_type in self.lottery_types:
+            if self.pending_draw(lottery_type, now):
+                wakeups.append(now + self.poll_interval)
+            else:
+                wakeups.append(poll_window(next_draw_time(lottery_type, now))[0])
+        return min(wakeups)
+    
+    def plan(self, now: datetime) -> List[Dict]:
+        """各彩种的下一次轮询计划"""
+        plans = []
+        for lottery_type in self.lottery_types:
+            draw = self.pending_draw(lottery_type, now) or next_draw_time(lottery_type, now)
+            start, end = poll_window(draw)
+            plans.append({
+                "lottery_type": lottery_type,
+                "name": DRAW_CALENDAR[lottery_type]["name"],
+                "draw_time": draw,
+                "window_start": max(start, now),
+                "window_end": end
+            })
+        return plans
+    
+    def run_once(self) -> Dict[str, int]:
+        """
+        检查一轮: 对处于轮询窗口内的彩种拉取一次数据
+        
+        Returns: {彩种: 新增条数}，只包含本轮实际轮询的彩种（获取失败计为 0）
+        """
+        now = self.clock()
+        results = {}
+        pending = {t: self.pending_draw(t, now) for t in self.lottery_types}
+        metrics.QUEUE_DEPTH.set(sum(draw is not None for draw in pending.values()), queue="scheduler")
+        
+        for lottery_type in self.lottery_types:
+            draw = pending[lottery_type]
+            if draw is None:
+                continue
+            
+            name = DRAW_CALENDAR[lottery_type]["name"]
+            draw_day = draw.strftime("%Y-%m-%d")
+            # 本地已有这次开奖（例如调度器重启），无需再拉取
+            if self.latest_date(lottery_type) >= draw_day:
+                logger.info(f"{name} {draw_day} 开奖数据已在本地")
+                self.done[lottery_type] = draw
+                continue
+            
+            logger.info(f"轮询 {name} {draw_day} 开奖数据...")
+            results[lottery_type] = 0
+            before = self.version(lottery_type)
+            try:
+                with metrics.track_request("fetch"):
+                    added = self.fetcher(lottery_type)
+            except Exception as e:
+                logger.error(f"{name} 数据获取失败: {e}")
+                continue
+            
+            results[lottery_type] = added
+            metrics.ROWS_INGESTED.inc(added, lottery_type=lottery_type)
+            if self.version(lottery_type) != before:
+                # 数据集有写入: 旧的预计算结果已失效（也可能只是补录了更早的记录）
+                self._run_hooks(lottery_type)
+            if self.latest_date(lottery_type) >= draw_day:
+                logger.info(f"{name} {draw_day} 开奖数据已入库（新增 {added} 条），停止本次轮询")
+                self.done[lottery_type] = draw
+            elif now + self.poll_interval >= poll_window(draw)[1]:
+                logger.warning(f"{name} 轮询窗口结束仍未获取到 {draw:%Y-%m-%d} 的开奖数据")
+                self.done[lottery_type] = draw
+        
+        if self.metrics_textfile:
+            try:
+                metrics.write_textfile(self.metrics_textfile)
+            except OSError as e:
+                logger.error(f"监控指标写入失败: {e}")
+        return results
+    
+    def _run_hooks(self, lottery_type: str):
+        """依次执行开奖后回调，单个回调失败不影响其他回调"""
+        for hook in self.hooks:
+            try:
+                with metrics.track_request(getattr(hook, '__name__', str(hook))):
+                    hook(lottery_type)
+            except Exception as e:
+                logger.error(f"开奖后处理 {getattr(hook, '__name__', hook)} 失败: {e}")
+    
+    def run_forever(self):
+        """常驻运行，在轮询窗口之间休眠"""
+        logger.info(f"调度器启动: {', '.join(self.lottery_types)}")
+        while True:
+            self.run_once()
+            now = self.clock()
+            wakeup = self.next_wakeup(now)
+            logger.info(f"下一次检查: {wakeup:%Y-%m-%d %H:%M}")
+            self.sleep(max((wakeup - now).total_seconds(), 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="开奖日历感知的数据更新调度器")
+    parser.add_argument("--type", "-t", choices=list(DRAW_CALENDAR),
+                        help="只调度指定彩种（默认全部）")
+    parser.add_argument("--once", action="store_true",
+                        help="只检查一轮后退出")
+    parser.add_argument("--plan", action="store_true",
+                        help="显示下一次轮询计划")
+    parser.add_argument("--interval", type=int, default=int(POLL_INTERVAL.total_seconds() // 60),
+                        help="轮询窗口内的轮询间隔（分钟）")
+    parser.add_argument("--no-precompute", action="store_true",
+                        help="数据更新后不预计算分析结果和报告")
+    parser.add_argument("--metrics-port", type=int,
+                        help="在该端口提供 Prometheus 指标 (/metrics)")
+    parser.add_argument("--metrics-host", default="127.0.0.1",
+                        help="指标端点监听的地址（默认只监听本机，0.0.0.0 为所有网卡）")
+    parser.add_argument("--metrics-textfile",
+                        help="每轮检查后写入 node-exporter textfile（.prom 文件）")
+    
+    args = parser.parse_args()
+    
+    types = [args.type] if args.type else list(DRAW_CALENDAR)
+    scheduler = UpdateScheduler(types, poll_interval=timedelta(minutes=args.interval),
+                                metrics_textfile=Path(args.metrics_textfile) if args.metrics_textfile else None)
+    if args.metrics_port or args.metrics_textfile:
+        # 分析和报告的各阶段耗时也计入指标
+        metrics.install_stage_hook()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port, host=args.metrics_host)
+        logger.info(f"监控指标: http://{args.metrics_host}:{args.metrics_port}/metrics")
+    if not args.no_precompute:
+        scheduler.add_hook(precompute_analysis)
+        scheduler.add_hook(rebuild_report)
+    
+    try:
+        if args.plan:
+            for plan in scheduler.plan(datetime.now()):
+                print(f"{plan['name']}: 开奖 {plan['draw_time']:%Y-%m-%d %H:%M}，"
+                      f"轮询 {plan['window_start']:%m-%d %H:%M} ~ {plan['window_end']:%m-%d %H:%M}")
+        elif args.once:
+            results = scheduler.run_once()
+            if not results:
+                print("当前没有需要轮询的彩种")
+            for lottery_type, added in results.items():
+                print(f"{DRAW_CALENDAR[lottery_type]['name']}: 新增 {added} 条")
+        else:
+            scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("调度器已停止")
+    except Exception as e:
+        print(f"❌ 错误: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
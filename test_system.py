@@ -5,8 +5,12 @@
 运行方式: python test_system.py
 """
 
+import gzip
 import json
 import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from datetime import datetime
 
@@ -62,15 +66,17 @@ def test_data_files():
     print_info("测试1: 检查数据文件...")
     
     try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from draw_store import MANIFEST_FILE, load_draws
+        
         # 检查双色球
-        ssq_file = PROJECT_ROOT / "data" / "ssq" / "history.json"
-        if not ssq_file.exists():
-            print_error(f"文件不存在: {ssq_file}")
+        ssq_dir = PROJECT_ROOT / "data" / "ssq"
+        if not (ssq_dir / MANIFEST_FILE).exists():
+            print_error(f"文件不存在: {ssq_dir / MANIFEST_FILE}")
             counter.add_fail()
             return False
         
-        with open(ssq_file, 'r', encoding='utf-8') as f:
-            ssq_data = json.load(f)
+        ssq_data = load_draws(ssq_dir)
         
         if len(ssq_data) < 5:
             print_error(f"双色球数据不足: {len(ssq_data)} 期")
@@ -87,14 +93,13 @@ def test_data_files():
         print_success(f"双色球数据: {len(ssq_data)} 期，字段完整")
         
         # 检查大乐透
-        dlt_file = PROJECT_ROOT / "data" / "dlt" / "history.json"
-        if not dlt_file.exists():
-            print_error(f"文件不存在: {dlt_file}")
+        dlt_dir = PROJECT_ROOT / "data" / "dlt"
+        if not (dlt_dir / MANIFEST_FILE).exists():
+            print_error(f"文件不存在: {dlt_dir / MANIFEST_FILE}")
             counter.add_fail()
             return False
         
-        with open(dlt_file, 'r', encoding='utf-8') as f:
-            dlt_data = json.load(f)
+        dlt_data = load_draws(dlt_dir)
         
         if len(dlt_data) < 5:
             print_error(f"大乐透数据不足: {len(dlt_data)} 期")
@@ -110,7 +115,7 @@ def test_data_files():
         print_success(f"大乐透数据: {len(dlt_data)} 期，字段完整")
         counter.add_pass()
         return True
-        
+    
     except Exception as e:
         print_error(f"数据文件测试失败: {e}")
         counter.add_fail()
@@ -148,7 +153,7 @@ def test_analyzer():
         print_success("大乐透分析正常")
         counter.add_pass()
         return result
-        
+    
     except Exception as e:
         print_error(f"分析器测试失败: {e}")
         import traceback
@@ -186,7 +191,7 @@ def test_fixed_numbers(analysis_result):
         print_success(f"生成 {len(numbers)} 组号码")
         counter.add_pass()
         return True
-        
+    
     except Exception as e:
         print_error(f"固定号码测试失败: {e}")
         import traceback
@@ -206,7 +211,11 @@ def test_report_generator(analysis_result):
         from generate_report import ReportGenerator
         
         generator = ReportGenerator("ssq")
+        created = []
+        new_analyzer = generator._new_analyzer
+        generator._new_analyzer = lambda: created.append(1) or new_analyzer()
         html = generator.generate(analysis_result, fixed_red=[7, 18, 25], fixed_blue=[14])
+        assert len(created) == 1, "各节应共用同一个分析器"
         
         # 检查HTML内容
         checks = [
@@ -242,7 +251,7 @@ def test_report_generator(analysis_result):
         
         counter.add_pass()
         return True
-        
+    
     except Exception as e:
         print_error(f"报告生成测试失败: {e}")
         import traceback
@@ -298,12 +307,1187 @@ def test_config():
         print_success("配置文件完整")
         counter.add_pass()
         return True
-        
+    
     except Exception as e:
         print_error(f"配置文件测试失败: {e}")
         counter.add_fail()
         return False
 
+# ============ 测试7: 增量导入 ============
+def test_incremental_import():
+    print_info("\n测试7: 测试增量导入...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from draw_store import append_draws, load_manifest, read_head, save_draws
+        from import_from_lottery_history import convert_dlt_data, merge_new_records
+        
+        existing = [
+            {"lottery_type": "dlt", "issue": "26002", "draw_date": "2026-01-03",
+             "front_zone": [1, 2, 3, 4, 5], "back_zone": [1, 2], "prize_info": {}},
+            {"lottery_type": "dlt", "issue": "26001", "draw_date": "2026-01-01",
+             "front_zone": [6, 7, 8, 9, 10], "back_zone": [3, 4], "prize_info": {}},
+        ]
+        old_year = {"lottery_type": "dlt", "issue": "25150", "draw_date": "2025-12-31",
+                    "front_zone": [11, 12, 13, 14, 15], "back_zone": [5, 6], "prize_info": {}}
+        source = [
+            {"issueNumber": "26004", "drawDate": "2026-01-07", "frontBalls": [1, 3, 5, 7, 9], "backBalls": [5, 6]},
+            {"issueNumber": "26003", "drawDate": "2026-01-05", "frontBalls": [2, 4, 6, 8, 10], "backBalls": [7, 8]},
+            {"issueNumber": "26002", "drawDate": "2026-01-03", "frontBalls": [1, 2, 3, 4, 5], "backBalls": [1, 2]},
+            {"issueNumber": "26001", "drawDate": "2026-01-01", "frontBalls": [6, 7, 8, 9, 10], "backBalls": [3, 4]},
+        ]
+        
+        consumed = []
+        def stream():
+            for record in source:
+                consumed.append(record["issueNumber"])
+                yield record
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            save_draws(data_dir, existing + [old_year], "dlt")
+            old_shard = (data_dir / "2025.json").read_bytes()
+            
+            head = read_head(data_dir)
+            delta = merge_new_records(convert_dlt_data(stream()), head["issue"])
+            assert [r["issue"] for r in delta] == ["26004", "26003"], "增量记录不正确"
+            assert len(consumed) == 3, "遇到已有期号后未停止读取"
+            
+            assert append_draws(data_dir, delta, "dlt") == 5, "追加后总数不正确"
+            with open(data_dir / "2026.json", 'r', encoding='utf-8') as f:
+                merged_text = f.read()
+            assert merged_text == json.dumps(delta + existing, ensure_ascii=False, indent=2), "写入结果与全量序列化不一致"
+            assert (data_dir / "2025.json").read_bytes() == old_shard, "追加时不应改写往年分片"
+            assert load_manifest(data_dir)["shards"][0]["newest_issue"] == "26004", "分片清单未更新"
+        
+        print_success("增量导入正常（只读取并写入新增记录）")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"增量导入测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+# ============ 测试8: 条件/压缩/流式下载 ============
+def test_streaming_download():
+    print_info("\n测试8: 测试条件请求、gzip 和流式下载（本地 HTTP 服务）...")
+    
+    records = [
+        {"issueNumber": f"26{i:03d}", "drawDate": "2026-01-01",
+         "redBalls": [1, 2, 3, 4, 5, 6], "blueBall": i % 16 + 1}
+        for i in range(500, 0, -1)
+    ]
+    body = gzip.compress(json.dumps(records).encode("utf-8"))
+    state = {"requests": 0, "fail_first": True}
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"] += 1
+            if state["fail_first"]:
+                state["fail_first"] = False
+                self.send_response(503)
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from import_from_lottery_history import download_data
+        
+        url = f"http://127.0.0.1:{server.server_address[1]}/ssq.json"
+        
+        # 首次请求 503，退避重试后成功，流式解析出全部记录
+        meta = {}
+        downloaded = list(download_data(url, meta, backoff=0.01))
+        assert downloaded == records, "解析结果与源数据不一致"
+        assert state["requests"] == 2, "未按预期重试"
+        assert meta["status"] == 200 and meta["etag"] == '"v1"', "未记录 ETag"
+        print_success(f"重试后下载成功，流式解析 {len(downloaded)} 条记录")
+        
+        # 带 ETag 再次请求，返回 304，不产出记录
+        downloaded = list(download_data(url, meta, backoff=0.01))
+        assert downloaded == [] and meta["status"] == 304, "条件请求未生效"
+        print_success("条件请求返回 304，跳过下载")
+        
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"流式下载测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+# ============ 测试9: 开奖日历调度 ============
+def test_update_scheduler():
+    print_info("\n测试9: 测试开奖日历调度...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from datetime import timedelta
+        from update_scheduler import UpdateScheduler, next_draw_time
+        
+        # 2026-02-09 是周一: 双色球下一次开奖为周二 21:15
+        monday = datetime(2026, 2, 9, 18, 0)
+        assert next_draw_time("ssq", monday) == datetime(2026, 2, 10, 21, 15), "双色球开奖日历错误"
+        assert next_draw_time("dlt", monday) == datetime(2026, 2, 9, 21, 25), "大乐透开奖日历错误"
+        
+        clock = {"now": monday}
+        fetched = []
+        refreshed = []
+        # 模拟数据源: 第一次只补录更早的一期（版本变化但本次开奖未入库），第二次才拿到本次开奖
+        store = {"version": "v0", "latest": "2026-02-08"}
+        
+        def fetch(lottery_type):
+            fetched.append(lottery_type)
+            store["version"] = f"v{len(fetched)}"
+            if len(fetched) >= 2:
+                store["latest"] = "2026-02-10"
+            return 1
+        
+        scheduler = UpdateScheduler(
+            ["ssq"],
+            fetcher=fetch,
+            latest_date=lambda t: store["latest"],
+            version=lambda t: store["version"],
+            clock=lambda: clock["now"]
+        )
+        scheduler.add_hook(refreshed.append)
+        
+        # 不在轮询窗口内，不拉取
+        assert scheduler.run_once() == {} and not fetched, "窗口外不应轮询"
+        
+        # 开奖后进入窗口: 第一次无新数据，第二次拿到数据后触发回调并停止
+        clock["now"] = datetime(2026, 2, 10, 22, 0)
+        scheduler.run_once()
+        clock["now"] += timedelta(minutes=20)
+        scheduler.run_once()
+        clock["now"] += timedelta(minutes=20)
+        scheduler.run_once()
+        assert fetched == ["ssq", "ssq"], "本次开奖入库后应停止轮询"
+        assert refreshed == ["ssq", "ssq"], "数据集版本变化后应触发预计算"
+        
+        # 预计算写入共享缓存的磁盘层，另一个进程（新的缓存实例）直接命中
+        from analysis_cache import SHARED_CACHE, AnalysisCache
+        from analyze_history import LotteryAnalyzer
+        from update_scheduler import PRECOMPUTE_PERIODS, precompute_analysis
+        assert SHARED_CACHE.disk_dir is not None, "共享缓存默认应带磁盘层"
+        with tempfile.TemporaryDirectory() as tmp:
+            default_dir, SHARED_CACHE.disk_dir = SHARED_CACHE.disk_dir, Path(tmp)
+            try:
+                precompute_analysis("ssq")
+            finally:
+                SHARED_CACHE.disk_dir = default_dir
+            reader = AnalysisCache(disk_dir=Path(tmp))
+            LotteryAnalyzer("ssq", cache=reader).full_analysis(PRECOMPUTE_PERIODS)
+            assert reader.stats()["disk_hits"] == 1 and reader.stats()["misses"] == 0, "预计算结果未被读取方命中"
+        
+        print_success("只在开奖后窗口内轮询，按分片清单判断入库，预计算结果写入磁盘缓存供后续进程命中")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"调度器测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_draw_store():
+    print_info("\n测试10: 测试期号归一化和降序存储...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from draw_store import (
+            append_draws, date_range_slice, date_violations, find_by_issue, find_draw, issue_key,
+            load_draws, load_manifest, read_draw, read_head, save_draws
+        )
+        
+        assert issue_key("26016") == issue_key("2026016") == 2026016, "5位期号应补全世纪"
+        assert issue_key("25999") < issue_key("2026001"), "跨年期号比较错误"
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            records = [
+                {"issue": "25150", "draw_date": "2025-12-30"},
+                {"issue": "2026002", "draw_date": "2026-01-04"},
+                {"issue": "26001", "draw_date": "演示数据"},
+                {"issue": "2026001", "draw_date": "2026-01-01"},
+                {"issue": "25149", "draw_date": "2026-01-02"},
+            ]
+            save_draws(data_dir, records, "ssq")
+            saved = load_draws(data_dir)
+            
+            assert [r["issue"] for r in saved] == ["2026002", "2026001", "2025150", "2025149"], "应按期号降序去重存储"
+            assert saved[1]["draw_date"] == "2026-01-01", "期号冲突应保留规范格式期号的记录"
+            # 开奖日期与期号顺序不一致的记录写入时记入清单，日期范围二分查找后单独核对
+            assert load_manifest(data_dir)["shards"][1]["unordered"] == {"2025149": "2026-01-02"}, "乱序日期记录未记入分片清单"
+            assert date_violations(saved) == [3], "乱序日期记录识别错误"
+            assert date_range_slice(saved, "2026-01-01", "2026-01-04", {2025149}) == (0, 2), "日期二分区间错误"
+            assert [r["issue"] for r in load_draws(data_dir, start="2025-12-31")] == ["2026002", "2026001", "2025149"], "乱序日期筛选错误"
+            assert [r["issue"] for r in load_draws(data_dir, end="2025-12-31")] == ["2025150"], "乱序日期筛选错误"
+            assert find_by_issue(saved, "26001") is saved[1], "按期号二分查找失败"
+            assert find_by_issue(saved, "2026003") is None, "不存在的期号应返回 None"
+            
+            # 偏移索引: 按序号/期号只解析命中的记录，追加后索引随分片更新
+            append_draws(data_dir, [{"issue": "2026003", "draw_date": "2026-01-06"}], "ssq")
+            assert read_head(data_dir)["issue"] == "2026003", "最新一期读取错误"
+            assert read_draw(data_dir, -1)["issue"] == "2025149", "最早一期读取错误"
+            assert find_draw(data_dir, "26002")["draw_date"] == "2026-01-04", "按期号读取错误"
+            assert [r["issue"] for r in load_draws(data_dir, periods=2)] == ["2026003", "2026002"], "最近 N 期读取错误"
+            append_draws(data_dir, [{"issue": "2026004", "draw_date": "2026-01-03"}], "ssq")
+            assert load_manifest(data_dir)["shards"][0]["unordered"] == {"2026004": "2026-01-03"}, "追加的乱序记录未记入清单"
+            assert [r["issue"] for r in load_draws(data_dir, start="2026-01-02", end="2026-01-03")] \
+                == ["2026004", "2025149"], "追加乱序记录后日期筛选错误"
+            assert [r["issue"] for r in load_draws(data_dir, start="2026-01-05")] == ["2026003"], "追加乱序记录后日期筛选错误"
+            (data_dir / "2026.idx").write_bytes(b"stale")
+            assert find_draw(data_dir, "2026001")["draw_date"] == "2026-01-01", "索引损坏后未重建"
+            
+            # 按年份分片: 最近 N 期只需打开当年分片，日期范围只打开对应年份
+            assert sorted(p.name for p in data_dir.glob("*.json")) == ["2025.json", "2026.json", "manifest.json"]
+            (data_dir / "2025.json").write_text("损坏的分片", encoding="utf-8")
+            assert [r["issue"] for r in load_draws(data_dir, periods=3)] == ["2026004", "2026003", "2026002"], "最近 N 期加载错误"
+            assert len(load_draws(data_dir, start="2026-01-04", end="2026-01-06")) == 2, "按日期范围加载错误"
+        
+        print_success("期号统一为整数比较，写入时降序去重并标记日期乱序记录，按年份分片、偏移索引和日期二分只读取所需记录")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"存储不变量测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_synthetic_history():
+    print_info("\n测试11: 测试合成历史生成器...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from datetime import date
+        from draw_store import load_draws, save_draws
+        from synthetic_history import draw_schedule, iter_lines, synthetic_draws
+        
+        # 超过每年 999 期的旧实现会产生重复期号；这里 3000 期跨越多年
+        draws = list(synthetic_draws("ssq", 3000, end=date(2025, 12, 31)))
+        keys = [d.key for d in draws]
+        assert all(a > b for a, b in zip(keys, keys[1:])), "期号应严格降序且不重复"
+        assert all(date.fromordinal(d.ordinal).weekday() in (1, 3, 6) for d in draws), "开奖日期不在开奖日历上"
+        assert draws[0]["issue"] == "2025156" and draws[155]["issue"] == "2025001", "期号应按年从 001 连续编号"
+        
+        # 超出日历容量时自动加密，期号仍然连续
+        dense = list(synthetic_draws("dlt", 400000, end=date(2025, 12, 31)))
+        assert len({d.key for d in dense}) == 400000, "加密后期号重复"
+        assert [json.loads(line) for line in iter_lines("dlt", 50)] == list(synthetic_draws("dlt", 50)), "NDJSON 输出与记录不一致"
+        
+        # 大乐透 5 位期号只能表示 2000-2099 年，更早的年份写成 7 位，存取后期数不变
+        with tempfile.TemporaryDirectory() as tmp:
+            save_draws(Path(tmp), synthetic_draws("dlt", 100000), "dlt")
+            stored = load_draws(Path(tmp))
+            assert len(stored) == 100000, f"存储后期数应为 100000，实际 {len(stored)}"
+            assert date.fromisoformat(stored[-1]["draw_date"]).year >= 1900, "加密后的历史不应回溯到公元初年"
+        
+        # 未指定结束日期时顺延结束年份；yyyyNNN 期号最多容纳 9999 × 999 期，超出时报错
+        assert next(draw_schedule("ssq", 9_000_000))[0] // 1000 == 9010, "结束年份未顺延"
+        try:
+            next(draw_schedule("ssq", 10 ** 7))
+            raise AssertionError("超出容量应报错")
+        except ValueError:
+            pass
+        
+        print_success("合成历史期号连续、日期符合开奖日历，NDJSON 输出一致，存取后期号不重复")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"合成历史测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_stage_profiler():
+    print_info("\n测试12: 测试分阶段性能剖析...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        import profiling
+        from analyze_history import LotteryAnalyzer
+        from profiling import StageProfiler
+        
+        seen = []
+        hook = profiling.add_hook(lambda stage, stats: seen.append(stage))
+        try:
+            with StageProfiler() as profiler:
+                analyzer = LotteryAnalyzer("ssq", profiler=profiler, cache=None)
+                analyzer.full_analysis(30)
+                analyzer.analyze_sum(30)
+            timings = profiler.report()
+        finally:
+            profiling.remove_hook(hook)
+        
+        for stage in ("load", "analyze.hot_cold", "analyze.span", "full_analysis"):
+            assert stage in timings, f"缺少阶段 {stage}"
+        assert timings["analyze.sum"]["calls"] == 2, "同名阶段应累加"
+        assert timings["full_analysis"]["wall_ms"] >= timings["analyze.hot_cold"]["wall_ms"], "外层阶段应包含内层"
+        assert timings["full_analysis"]["peak_kib"] is not None, "开启 tracemalloc 时应记录分配"
+        assert seen.count("analyze.sum") == 2 and seen[-1] == "analyze.sum", "全局钩子未按阶段触发"
+        
+        # 没有剖析器时仍会通知全局钩子
+        seen.clear()
+        profiling.add_hook(hook)
+        try:
+            LotteryAnalyzer("ssq", cache=None).analyze_span(10)
+        finally:
+            profiling.remove_hook(hook)
+        assert "analyze.span" in seen, "未注册剖析器时全局钩子未触发"
+        
+        print_success(f"记录 {len(timings)} 个阶段，钩子正常触发")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"性能剖析测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_metrics_export():
+    print_info("\n测试13: 测试 Prometheus 监控指标导出...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        import tempfile
+        import urllib.request
+        import metrics
+        import profiling
+        from analyze_history import LotteryAnalyzer
+        
+        registry = metrics.Registry()
+        latency = registry.histogram("demo_seconds", "demo", ("endpoint",), buckets=(0.1, 1.0))
+        latency.observe(0.05, endpoint="a")
+        latency.observe(0.5, endpoint="a")
+        latency.observe(5, endpoint="a")
+        text = registry.exposition()
+        for line in ('demo_seconds_bucket{endpoint="a",le="0.1"} 1', 'demo_seconds_bucket{endpoint="a",le="1"} 2',
+                     'demo_seconds_bucket{endpoint="a",le="+Inf"} 3', 'demo_seconds_count{endpoint="a"} 3'):
+            assert line in text, f"直方图输出缺少: {line}"
+        
+        # 失败的请求计入错误数，延迟照常记录
+        try:
+            with metrics.track_request("test_endpoint"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        assert metrics.REQUEST_ERRORS.value(endpoint="test_endpoint") == 1, "请求失败未计数"
+        assert metrics.REQUEST_LATENCY.count(endpoint="test_endpoint") == 1, "请求延迟未记录"
+        
+        # 分析器的阶段通过钩子计入指标
+        metrics.install_stage_hook()
+        try:
+            loads = metrics.DATASET_LOAD.count()
+            LotteryAnalyzer("ssq", cache=None).full_analysis(20)
+        finally:
+            profiling.remove_hook(metrics.observe_stage)
+        assert metrics.DATASET_LOAD.count() == loads + 1, "数据加载耗时未记录"
+        assert metrics.STAGE_LATENCY.count(stage="analyze.hot_cold") >= 1, "分析阶段耗时未记录"
+        
+        server = metrics.serve(0)
+        try:
+            assert server.server_address[0] == "127.0.0.1", "指标端点默认应只监听本机"
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as resp:
+                body = resp.read().decode("utf-8")
+                assert resp.headers["Content-Type"].startswith("text/plain"), "Content-Type 不正确"
+        finally:
+            server.shutdown()
+        assert "# TYPE lottery_dataset_load_seconds histogram" in body, "HTTP 端点缺少指标"
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = metrics.write_textfile(Path(tmp) / "lottery.prom")
+            assert "lottery_stage_duration_seconds_bucket" in path.read_text(encoding="utf-8"), "textfile 内容不完整"
+            assert [p.name for p in Path(tmp).iterdir()] == ["lottery.prom"], "临时文件未清理"
+        
+        print_success("指标格式正确，HTTP 端点和 textfile 导出正常")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"监控指标测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_analysis_cache():
+    print_info("\n测试14: 测试分析结果缓存...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from analysis_cache import AnalysisCache
+        from analyze_history import LotteryAnalyzer
+        from draw_store import append_draws, load_draws, save_draws
+        
+        # LRU: 按条目数和字节数淘汰最久未用的条目
+        lru = AnalysisCache(max_entries=2, max_bytes=10**6)
+        lru.put(("a",), 1)
+        lru.put(("b",), 2)
+        lru.get(("a",))
+        lru.put(("c",), 3)
+        assert lru.get(("b",)) is None and lru.get(("a",)) == 1, "未按最近最少使用淘汰"
+        small = AnalysisCache(max_bytes=200)
+        small.put(("x",), "x" * 120)
+        small.put(("y",), "y" * 120)
+        assert small.stats()["entries"] == 1 and small.stats()["bytes"] <= 200, "未按字节数淘汰"
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "dlt"
+            records = [dict(r) for r in load_draws(PROJECT_ROOT / "data" / "dlt")]
+            save_draws(data_dir, records[1:], "dlt")
+            
+            cache = AnalysisCache(disk_dir=Path(tmp) / "cache")
+            first = LotteryAnalyzer("dlt", data_dir, cache=cache).full_analysis(50)
+            first["hot_cold"] = None
+            second = LotteryAnalyzer("dlt", data_dir, cache=cache).full_analysis(50)
+            assert second["hot_cold"] is not None, "调用方修改返回值污染了缓存"
+            assert cache.hits == 1, "相同查询未命中缓存"
+            # 分析时间不进入缓存，每次调用重新填入
+            analyzer = LotteryAnalyzer("dlt", data_dir, cache=cache)
+            assert second["analysis_time"] and analyzer._full_analysis(50)["analysis_time"] is None, "分析时间不应缓存"
+            
+            # 位置参数与关键字参数写法得到同一个键
+            hits = cache.hits
+            assert analyzer.analyze_rolling(50, (10,)) == analyzer.analyze_rolling(periods=50, windows=(10,)), "额外位置参数处理错误"
+            assert cache.hits == hits + 1, "参数写法不同时未命中缓存"
+            
+            # 磁盘层: 新的缓存实例（模拟进程重启）直接读取
+            restarted = AnalysisCache(disk_dir=Path(tmp) / "cache")
+            third = LotteryAnalyzer("dlt", data_dir, cache=restarted).full_analysis(50)
+            assert {**third, "analysis_time": None} == {**second, "analysis_time": None}, "磁盘层结果不一致"
+            assert restarted.disk_hits == 1 and restarted.misses == 0, "磁盘层未命中"
+            
+            # 新数据入库后数据集版本变化，旧结果失效
+            append_draws(data_dir, records[:1], "dlt")
+            fresh = LotteryAnalyzer("dlt", data_dir, cache=cache).full_analysis(50)
+            assert fresh["date_range"]["end_issue"] == records[0]["issue"], "数据更新后返回了旧结果"
+        
+        print_success("LRU 淘汰、参数绑定、磁盘层和数据集版本失效正常，分析时间不缓存")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"分析缓存测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_trend_chart():
+    print_info("\n测试15: 测试遗漏走势图...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from analyze_history import LotteryAnalyzer
+        from generate_report import ReportGenerator
+        from draw_store import load_draws
+        
+        periods = 40
+        trend = LotteryAnalyzer("dlt", cache=None).analyze_trend(periods)
+        history = [dict(r) for r in load_draws(PROJECT_ROOT / "data" / "dlt")][::-1]
+        assert trend["issues"] == [r["issue"] for r in history[-periods:]], "走势图期号不正确"
+        
+        # 与逐期回溯的遗漏值比较
+        for offset in (0, periods - 1):
+            index = len(history) - periods + offset
+            for number in range(1, 36):
+                expected = 0
+                while index - expected >= 0 and number not in history[index - expected]["front_zone"]:
+                    expected += 1
+                if index - expected >= 0:
+                    assert trend["front_zone"]["rows"][offset][number - 1] == expected, f"号码 {number} 遗漏值不正确"
+        
+        generator = ReportGenerator("dlt")
+        html = generator.generate(generator.load_analysis_data(periods))
+        assert 'id="trendChart"' in html and "{{" not in html, "走势图未渲染"
+        assert 'class="trend-hit red"' not in html, "走势图行应在客户端渲染，不应输出单元格标记"
+        assert "固定号码分析</h2>" not in html, "未指定固定号码时不应输出固定号码部分"
+        
+        print_success(f"{periods} 期走势图遗漏值正确，行数据紧凑编码")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"走势图测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_rolling_series():
+    print_info("\n测试16: 测试滚动窗口时间序列...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        import ast
+        import statistics
+        import struct
+        from collections import Counter
+        from analyze_history import LotteryAnalyzer
+        from draw_store import load_draws
+        from rolling_stats import columns
+        
+        analyzer = LotteryAnalyzer("ssq", cache=None)
+        result = analyzer.analyze_rolling(20, windows=(7, 15))
+        history = [dict(r) for r in load_draws(PROJECT_ROOT / "data" / "ssq")][::-1]
+        
+        # 与逐窗口重新统计的结果比较
+        for window in (7, 15):
+            series = result["series"][str(window)]
+            assert len(series["issues"]) == 20 and series["issues"][-1] == history[-1]["issue"], "期数不正确"
+            for offset in (0, 19):
+                end = len(history) - 20 + offset + 1
+                draws = history[end - window:end]
+                counts = Counter(n for r in draws for n in r["red_balls"])
+                assert series["front"][offset] == [counts[n] for n in range(1, 34)], "窗口号码次数不正确"
+                assert sum(series["back"][offset]) == window, "后区次数合计应等于窗口期数"
+                sums = [sum(r["red_balls"]) for r in draws]
+                assert abs(series["sum_mean"][offset] - statistics.fmean(sums)) < 1e-3, "和值均值不正确"
+                assert abs(series["sum_std"][offset] - statistics.pstdev(sums)) < 1e-3, "和值标准差不正确"
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            npy = Path(tmp) / "rolling.npy"
+            assert analyzer.export_rolling(str(npy), 20, (7, 15)) == 40, "导出行数不正确"
+            raw = npy.read_bytes()
+            assert raw[:8] == b"\x93NUMPY\x01\x00", "不是 .npy 文件"
+            header_len = struct.unpack("<H", raw[8:10])[0]
+            header = ast.literal_eval(raw[10:10 + header_len].decode("latin1"))
+            assert (10 + header_len) % 64 == 0 and header["shape"] == (2, 20, len(columns("ssq"))), "文件头不正确"
+            assert len(raw) - 10 - header_len == 2 * 20 * len(columns("ssq")) * 8, "数据长度不正确"
+            
+            ndjson = Path(tmp) / "rolling.ndjson"
+            analyzer.export_rolling(str(ndjson), 20, (7, 15))
+            lines = [json.loads(line) for line in ndjson.read_text(encoding="utf-8").splitlines()]
+            assert lines[-1]["front"] == result["series"]["15"]["front"][-1], "NDJSON 与分析结果不一致"
+        
+        print_success("滚动窗口次数、均值、标准差正确，.npy / NDJSON 导出正常")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"滚动窗口测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_randomness_suite():
+    print_info("\n测试17: 测试随机性检验...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from analyze_history import LotteryAnalyzer
+        from generate_report import ReportGenerator
+        from randomness import chi2_sf, normal_two_sided, randomness_tests
+        
+        assert abs(chi2_sf(3.841, 1) - 0.05) < 1e-3, "卡方分布上尾概率不正确"
+        assert abs(chi2_sf(18.307, 10) - 0.05) < 1e-3, "卡方分布上尾概率不正确"
+        assert abs(normal_two_sided(1.96) - 0.05) < 1e-3, "正态分布 p 值不正确"
+        
+        analyzer = LotteryAnalyzer("ssq", cache=None)
+        result = analyzer.analyze_randomness(100)
+        summary = result["summary"]
+        assert summary["tests"] >= 7 and 0 <= summary["rejected"] <= summary["tests"], "检验汇总不正确"
+        tests = [t for group in ("uniformity", "gaps", "runs", "serial") for t in result[group].values() if t]
+        assert all(0 <= t["p_value"] <= 1 for t in tests), "p 值超出范围"
+        
+        # 每期开出同一组号码: 均匀性和重号检验都应拒绝
+        repeated = [{"issue": str(i), "red_balls": [1, 2, 3, 4, 5, 6], "blue_ball": 1} for i in range(50)]
+        rigged = randomness_tests(repeated, "ssq", ("red_balls", "blue_ball"), (6, 1), 17)
+        assert not rigged["uniformity"]["red_balls"]["random"], "均匀性检验应拒绝"
+        assert not rigged["serial"]["overlap"]["random"], "重号检验应拒绝"
+        
+        generator = ReportGenerator("ssq")
+        html = generator.generate(generator.load_analysis_data(100))
+        assert "随机性检验" in html, "报告缺少随机性检验部分"
+        
+        print_success(f"随机性检验正常: {summary['tests']} 项检验，{summary['rejected']} 项拒绝")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"随机性检验测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_monte_carlo_baseline():
+    print_info("\n测试18: 测试蒙特卡洛随机基线...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from math import comb
+        from analysis_cache import AnalysisCache
+        from analyze_history import LotteryAnalyzer
+        from generate_report import ReportGenerator
+        from monte_carlo import exact_baseline, simulate
+        
+        # 随机流按批次派生，结果与进程数无关
+        serial = simulate((33, 6, 17), 50, 120000, seed=7, workers=1, label="ssq")
+        parallel = simulate((33, 6, 17), 50, 120000, seed=7, workers=2, label="ssq")
+        assert serial == parallel, "多进程结果与单进程不一致"
+        
+        # 与精确概率比较: 6 个红球中 3 奇 3 偶
+        exact = comb(17, 3) * comb(16, 3) / comb(33, 6)
+        assert abs(serial["distributions"]["odd_even"]["3:3"] - exact) < 0.01, "奇偶比概率偏差过大"
+        assert abs(serial["bands"]["sum"]["expected"] - 102) < 0.5, "和值期望应为 6 × 17"
+        band = serial["bands"]["odd_even"]["3:3"]
+        assert band["low"] < exact * 50 < band["high"], "置信区间应包含期望值"
+        
+        cache = AnalysisCache()
+        analyzer = LotteryAnalyzer("dlt", cache=cache)
+        result = analyzer.analyze_baseline(100, simulations=20000, workers=1)
+        assert result["periods"] == 100 and result["comparison"]["odd_even"], "对照结果不完整"
+        assert {"consecutive", "sum", "span"} <= set(result["comparison"]), "缺少连号/和值/跨度对照"
+        hits = cache.hits
+        analyzer.simulate_baseline(100, simulations=20000, workers=1)
+        assert cache.hits == hits + 1, "相同配置的模拟应命中缓存"
+        
+        # 模拟总期数不超过 simulations，窗口再大也不会放大成本
+        assert simulate((33, 6, 17), 1000, 5000, workers=1)["simulations"] == 5000, "模拟期数超出预算"
+        
+        # 精确基线不做模拟，与模拟结果一致
+        exact = exact_baseline((33, 6, 17), 50)
+        assert exact["simulations"] == 0 and list(exact["bands"]) == list(serial["bands"]), "精确基线结构不一致"
+        assert abs(exact["bands"]["odd_even"]["3:3"]["expected"] - band["expected"]) < 0.5, "精确基线期望偏差过大"
+        assert abs(exact["bands"]["sum"]["low"] - serial["bands"]["sum"]["low"]) < 0.5, "精确基线区间偏差过大"
+        
+        # 报告中的基线对照默认关闭，开启时使用精确基线
+        generator = ReportGenerator("ssq")
+        analysis = generator.load_analysis_data(100)
+        assert "实际 vs 随机期望" not in generator.generate(analysis), "随机基线对比应默认关闭"
+        assert "实际 vs 随机期望" in generator.generate(analysis, baseline=True), "报告缺少随机基线对比"
+        
+        print_success("蒙特卡洛基线可复现，概率与精确值一致，精确基线、缓存和报告正常")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"蒙特卡洛基线测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_exact_distributions():
+    print_info("\n测试19: 测试精确概率分布...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from collections import Counter
+        from itertools import combinations
+        from analyze_history import LotteryAnalyzer
+        from exact_distributions import consecutive, span, sum_distribution
+        from generate_fixed_numbers import LotteryPredictor
+        
+        # 小规模配置与穷举比较
+        combos = list(combinations(range(1, 13), 4))
+        brute = {
+            "sum": Counter(sum(c) for c in combos),
+            "span": Counter(c[-1] - c[0] for c in combos),
+            "consecutive": Counter(sum(1 for n in c if n + 1 in c and n - 1 not in c) for c in combos),
+        }
+        for name, exact in (("sum", sum_distribution(12, 4)), ("span", span(12, 4)),
+                            ("consecutive", consecutive(12, 4))):
+            assert exact == {k: v / len(combos) for k, v in sorted(brute[name].items())}, f"{name} 分布与穷举不一致"
+        
+        analyzer = LotteryAnalyzer("ssq")
+        for metric in ("odd_even", "big_small", "zones", "sum", "span", "consecutive"):
+            distribution = analyzer.expected_distribution(metric)
+            assert abs(sum(distribution.values()) - 1) < 1e-9, f"{metric} 概率之和应为 1"
+        assert abs(analyzer.expected_distribution("odd_even")["3:3"] - 0.3438) < 1e-4, "双色球 3:3 概率不正确"
+        assert LotteryAnalyzer("dlt").expected_distribution("span")[34] == 1 * 33 * 32 * 31 / 6 / 324632, "大乐透跨度不正确"
+        
+        # 固定号码评分使用精确概率: 大乐透 4:1 是常见形态
+        predictor = LotteryPredictor("dlt")
+        evaluation = predictor.analyze_fixed_numbers([1, 3, 5, 7, 10], [])["evaluation"]
+        assert evaluation["odd_even_ratio"] == "4:1" and evaluation["odd_even_score"] == 2, "4:1 应计 2 分"
+        assert abs(evaluation["odd_even_probability"] - 0.1603) < 1e-3, "奇偶比概率不正确"
+        evaluation = predictor.analyze_fixed_numbers([1, 3, 5, 7, 9], [])["evaluation"]
+        assert evaluation["odd_even_score"] == 1, "5:0 应计 1 分"
+        # 没有前区号码时形态无从评判，不应得满分
+        evaluation = predictor.analyze_fixed_numbers([], [8])["evaluation"]
+        assert evaluation["odd_even_ratio"] == "0:0" and evaluation["odd_even_score"] == 1, "未选前区号码应计中性分"
+        assert evaluation["big_small_score"] == 1 and evaluation["total_score"] == 2, "未选前区号码不应得满分"
+        
+        print_success("精确分布与穷举一致，固定号码评分使用真实概率")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"精确概率分布测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_bootstrap_intervals():
+    print_info("\n测试20: 测试热冷号 bootstrap 置信区间...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from collections import Counter
+        from analyze_history import LotteryAnalyzer
+        from bootstrap import block_bootstrap
+        from draw_store import load_draws
+        from generate_report import ReportGenerator
+        
+        analyzer = LotteryAnalyzer("dlt", cache=None)
+        result = analyzer.analyze_bootstrap(80, resamples=400)
+        assert result["periods"] == 80 and result["resamples"] == 400, "重抽样参数不正确"
+        history = load_draws(PROJECT_ROOT / "data" / "dlt", periods=80)
+        counts = Counter(n for r in history for n in r["back_zone"])
+        for item in result["back_zone"]["numbers"]:
+            assert item["count"] == counts[item["number"]], "号码次数与历史数据不一致"
+            assert item["low"] <= item["frequency"] <= item["high"], "区间应包含观测频率"
+        
+        # 进程数不影响结果；总抽块次数有上限
+        records = [dict(r) for r in history][::-1]
+        args = (records, "dlt", ("front_zone", "back_zone"), (5, 2))
+        assert block_bootstrap(*args, resamples=600, workers=1) == block_bootstrap(*args, resamples=600, workers=3), \
+            "多进程结果不一致"
+        assert block_bootstrap(*args, resamples=10 ** 9, block=1)["resamples"] <= 2_000_000 // 80, "重抽样次数未受限"
+        
+        # 每期开出同一组号码: 这些号码的区间整体高于理论频率
+        rigged = [{"red_balls": [1, 2, 3, 4, 5, 6], "blue_ball": 1} for _ in range(60)]
+        labels = block_bootstrap(rigged, "ssq", ("red_balls", "blue_ball"), (6, 1), resamples=200)
+        assert [item["label"] for item in labels["red_balls"]["numbers"][:7]] == ["hot"] * 6 + ["cold"], "标签不正确"
+        
+        generator = ReportGenerator("ssq")
+        assert "hot_cold_intervals" not in LotteryAnalyzer("ssq", cache=None).full_analysis(30), "置信区间应按需计算"
+        data = generator.load_analysis_data(100, intervals=True)
+        assert "hot_cold_intervals" in data, "全面分析缺少置信区间"
+        html = generator.generate(data)
+        assert "区间" in html and "bootstrap" in html, "热力图缺少置信区间"
+        
+        print_success("bootstrap 区间覆盖观测频率，结果可复现，热力图显示区间")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"bootstrap 置信区间测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_repeat_neighbor():
+    print_info("\n测试21: 测试重号/邻号/斜连号...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from analyze_history import LotteryAnalyzer
+        from draw_bits import draw_relations, mask_of, mask_numbers
+        
+        # 05 → 06 → 07 为斜连号；12 重号；20 与上期 21 相邻
+        masks = [mask_of([5, 12, 30]), mask_of([6, 12, 21]), mask_of([7, 12, 20])]
+        repeat, neighbor, diagonal = next(draw_relations(masks))
+        assert mask_numbers(repeat) == [12], "重号不正确"
+        assert mask_numbers(neighbor) == [7, 20], "邻号不正确"
+        assert mask_numbers(diagonal) == [7], "斜连号不正确"
+        
+        analyzer = LotteryAnalyzer("ssq", cache=None)
+        result = analyzer.analyze_repeats(60)
+        assert result["periods"] == 60, "期数不正确"
+        history = analyzer.get_periods(62)
+        expected = sum(len(set(history[i]["red_balls"]) & set(history[i + 1]["red_balls"])) for i in range(60))
+        assert abs(result["repeat"]["average"] - round(expected / 60, 3)) < 1e-9, "重号平均数与逐期比较不一致"
+        assert sum(result["neighbor"]["distribution"].values()) == 60, "邻号分布期数不正确"
+        assert result["latest"]["issue"] == history[0]["issue"], "最新一期不正确"
+        
+        print_success(f"重号平均 {result['repeat']['average']} 个/期，邻号、斜连号统计正确")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"重号/邻号测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_ac_and_tails():
+    print_info("\n测试22: 测试 AC 值和尾数分析...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        import random
+        from itertools import combinations
+        from analyze_history import LotteryAnalyzer
+        from draw_bits import ac_value, mask_of, tail_counts
+        from generate_fixed_numbers import LotteryPredictor
+        
+        # 与逐对求差比较
+        rng = random.Random(5)
+        for _ in range(500):
+            numbers = rng.sample(range(1, 34), 6)
+            differences = {abs(a - b) for a, b in combinations(numbers, 2)}
+            assert ac_value(mask_of(numbers)) == len(differences) - 5, "AC 值不正确"
+        assert ac_value(mask_of([1, 2, 3, 4, 5, 6])) == 0 and ac_value(mask_of([1, 2, 4, 8, 16, 32])) == 10, "AC 边界值不正确"
+        assert tail_counts(mask_of([3, 13, 23, 30])) == [1, 0, 0, 3, 0, 0, 0, 0, 0, 0], "尾数统计不正确"
+        
+        analyzer = LotteryAnalyzer("dlt", cache=None)
+        ac = analyzer.analyze_ac(50)
+        tails = analyzer.analyze_tails(50)
+        assert sum(ac["distribution"].values()) == 50 and 0 <= ac["min"] <= ac["max"] <= 6, "AC 分布不正确"
+        assert sum(tails["digits"].values()) == 250 and sum(tails["distinct"].values()) == 50, "尾数分布不正确"
+        
+        predictor = LotteryPredictor("ssq")
+        evaluation = predictor.analyze_fixed_numbers([1, 5, 12, 18, 25, 33], [3])["evaluation"]
+        assert evaluation["ac_value"] == 8 and evaluation["tail_digits"] == {1: 1, 2: 1, 3: 1, 5: 2, 8: 1}, "固定号码 AC/尾数不正确"
+        # 历史 AC 比较由已加载的历史数据统计，与分析器的 AC 分布一致
+        full = LotteryAnalyzer("ssq", cache=None).analyze_ac(len(predictor.history_data))["distribution"]
+        assert evaluation["ac_history_rate"] == round(full.get(8, 0) / len(predictor.history_data) * 100, 2), "历史 AC 比较不正确"
+        
+        print_success(f"AC 值与逐对求差一致，最近 50 期大乐透平均 AC {ac['average']}")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"AC 值/尾数测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_transition_matrix():
+    print_info("\n测试23: 测试号码转移矩阵...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from analysis_cache import AnalysisCache
+        from analyze_history import LotteryAnalyzer
+        from generate_report import ReportGenerator
+        from transitions import gap_hits
+        from draw_bits import mask_of
+        
+        cache = AnalysisCache()
+        analyzer = LotteryAnalyzer("dlt", cache=cache)
+        stats = analyzer.analyze_transitions(120)
+        history = analyzer.get_periods(120)[::-1]
+        
+        # 与逐对计数比较
+        matrix = [[0] * 35 for _ in range(35)]
+        for previous, current in zip(history, history[1:]):
+            for i in previous["front_zone"]:
+                for j in current["front_zone"]:
+                    matrix[i - 1][j - 1] += 1
+        assert stats["matrix"] == matrix, "转移矩阵与逐对计数不一致"
+        assert stats["transitions"] == 119 and sum(stats["previous_counts"]) == 119 * 5, "上期次数不正确"
+        
+        # 间隔: 号码 1 每 3 期开出一次，间隔 3 必然开出，间隔 1、2 从不开出
+        gaps = gap_hits([mask_of([1]) if t % 3 == 0 else 0 for t in range(30)], 1, gap_limit=5)
+        assert gaps["3"]["hits"] == gaps["3"]["trials"] == 9, "间隔统计不正确"
+        assert gaps["1"]["hits"] == gaps["2"]["hits"] == 0, "间隔统计不正确"
+        
+        hits = cache.hits
+        analyzer.analyze_transitions(120)
+        assert cache.hits == hits + 1, "转移矩阵应按数据集版本缓存"
+        
+        generator = ReportGenerator("ssq")
+        html = generator.generate(generator.load_analysis_data(100))
+        assert "号码转移热力图" in html, "报告缺少转移热力图"
+        
+        print_success("转移矩阵与逐对计数一致，间隔统计和缓存正常")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"转移矩阵测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_date_grouping():
+    print_info("\n测试24: 测试按开奖日期分组统计...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from collections import Counter
+        from datetime import date
+        from analysis_cache import AnalysisCache
+        from analyze_history import LotteryAnalyzer
+        from date_groups import group_ids
+        
+        analyzer = LotteryAnalyzer("ssq", cache=AnalysisCache())
+        result = analyzer.analyze_grouped(None, group_by="weekday", metric="odd_even")
+        history = analyzer.get_periods(10000)
+        
+        # 与逐期按 date.weekday() 分组计数比较
+        expected = {}
+        for record in history:
+            if record["draw_date"]:
+                weekday = date.fromisoformat(record["draw_date"]).weekday()
+                odd = sum(n % 2 for n in record["red_balls"])
+                ratios = expected.setdefault(weekday, Counter())
+                ratios[f"{odd}:{6 - odd}"] += 1
+        groups = {g["group"]: g for g in result["groups"]}
+        names = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+        assert set(groups) == {names[w] for w in expected}, "分组与开奖星期不一致"
+        for weekday, ratios in expected.items():
+            assert groups[names[weekday]]["stats"] == dict(ratios), f"{names[weekday]} 奇偶比不一致"
+        
+        # 年份编号按年份升序，缺失日期为 -1
+        ids, labels = group_ids([date(2024, 5, 1).toordinal(), 0, date(2023, 1, 1).toordinal()], "year")
+        assert ids == [1, -1, 0] and labels == ["2023", "2024"], "年份分组编号不正确"
+        
+        # 日期范围: 与逐条过滤一致
+        start, end = history[-1]["draw_date"], history[len(history) // 2]["draw_date"]
+        ranged = analyzer.analyze_grouped(None, group_by="month", metric="sum", start=start, end=end)
+        inside = [r for r in history if r["draw_date"] and start <= r["draw_date"] <= end]
+        assert ranged["periods"] == len(inside), "日期范围内的期数不正确"
+        assert sum(g["periods"] for g in ranged["groups"]) == len(inside), "分组期数之和不正确"
+        # 跨过日期与期号顺序不一致的区段（清单中标记的乱序记录），二分结果仍与逐条过滤一致
+        for start, end in [("2026-01-01", "2026-01-31"), ("2025-12-20", "2026-02-06"), ("2025-09-15", "2025-09-22")]:
+            inside = [r["issue"] for r in history if r["draw_date"] and start <= r["draw_date"] <= end]
+            assert [r["issue"] for r in analyzer.get_date_range(start, end)] == inside, f"{start}~{end} 日期范围筛选错误"
+        
+        print_success(f"分组统计与逐期计数一致（{len(result['groups'])} 个星期组），日期范围筛选正常")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"日期分组测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_similar_draws():
+    print_info("\n测试25: 测试历史最相似开奖查询...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        import random
+        from generate_fixed_numbers import LotteryPredictor, parse_ticket
+        
+        predictor = LotteryPredictor("dlt")
+        history = predictor.history_data
+        rng = random.Random(7)
+        tickets = [(rng.sample(range(1, 36), rng.randint(1, 5)), rng.sample(range(1, 13), rng.randint(0, 2)))
+                   for _ in range(50)]
+        results = predictor.find_similar(tickets, 4)
+        
+        # 与逐期比较集合交集的排序一致（先前区、再后区，同分较新的在前）
+        for (front, back), matches in zip(tickets, results):
+            ranked = sorted(
+                ((len(set(front) & set(r["front_zone"])), len(set(back) & set(r["back_zone"])), -i)
+                 for i, r in enumerate(history)), reverse=True)[:4]
+            assert [(m["front_matches"], m["back_matches"], m["issue"]) for m in matches] == \
+                [(f, b, history[-i]["issue"]) for f, b, i in ranked], f"相似开奖排序不正确: {front}+{back}"
+        
+        # 历史开奖本身的最相似开奖是它自己
+        latest = history[0]
+        best = predictor.find_similar([(latest["front_zone"], latest["back_zone"])], 1)[0][0]
+        assert best["issue"] == latest["issue"] and best["jaccard"] == 1.0, "完全相同的开奖应排第一"
+        
+        assert parse_ticket("07,18 25+03 09") == ([7, 18, 25], [3, 9]), "号码解析不正确"
+        analysis = predictor.analyze_fixed_numbers([5, 12, 20], [3], similar=3)
+        assert len(analysis["similar_draws"]) == 3, "固定号码分析缺少相似开奖"
+        assert "历史最相似开奖" in predictor.generate_report(analysis), "报告缺少相似开奖"
+        
+        print_success("相似开奖与逐期比较一致，批量查询和报告正常")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"相似开奖测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_drawn_index():
+    print_info("\n测试26: 测试历史开奖组合索引...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        from draw_bits import mask_of
+        from draw_store import append_draws, load_draws, save_draws
+        from drawn_index import INDEX_FILE, _read_sections, load_drawn_index
+        from generate_fixed_numbers import LotteryPredictor
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "dlt"
+            records = [dict(r) for r in load_draws(PROJECT_ROOT / "data" / "dlt")]
+            save_draws(data_dir, records[1:], "dlt")
+            index = load_drawn_index(data_dir, "dlt")
+            assert load_drawn_index(data_dir, "dlt") is index, "同一数据集版本应只构建一次"
+            assert not (data_dir / INDEX_FILE).exists(), "只读加载不应写数据目录"
+            load_drawn_index(data_dir, "dlt", persist=True)
+            assert len(index) == len({(tuple(r["front_zone"]), tuple(r["back_zone"])) for r in records[1:]}), \
+                "组合个数不正确"
+            
+            latest = records[0]
+            front, back = mask_of(latest["front_zone"]), mask_of(latest["back_zone"])
+            before = _read_sections(data_dir / INDEX_FILE)
+            assert not index.contains(front, back), "新一期不应在追加前的索引中"
+            
+            # 追加后只重建新记录所在年份的一节
+            append_draws(data_dir, [latest], "dlt")
+            updated = load_drawn_index(data_dir, "dlt", persist=True)
+            assert updated.contains(front) and updated.contains(front, back), "追加后索引未更新"
+            after = _read_sections(data_dir / INDEX_FILE)
+            changed = [year for year in after if before.get(year) != after[year]]
+            assert changed == [int(latest["issue"][:2]) + 2000], f"应只重建当年一节: {changed}"
+            assert updated.contains_batch([front, 0], [back, back]) == [True, False], "批量查询不正确"
+            
+            # 固定 4 个前区号码，剩余 1 个号码只有 31 种可能；排除后不会生成历史开奖组合
+            predictor = LotteryPredictor("dlt", data_dir)
+            fixed = latest["front_zone"][:4]
+            combos = predictor.generate_combinations(fixed, None, count=200, exclude_drawn=True)
+            assert not any(c["drawn_before"] or c["front_zone"] == latest["front_zone"] for c in combos), \
+                "排除历史开奖组合后仍生成了开出过的组合"
+            combos = predictor.generate_combinations(fixed, None, count=200)
+            assert any(c["drawn_before"] for c in combos), "未标记开出过的组合"
+            
+            checks = predictor.check_drawn([(latest["front_zone"], latest["back_zone"]),
+                                            (latest["front_zone"], []), ([1, 2, 3, 4, 5], [])])
+            assert checks[0] == {"front_drawn": True, "full_drawn": True}, "整注查询不正确"
+            assert checks[1] == {"front_drawn": True, "full_drawn": False}, "前区查询不正确"
+            
+            # 生成和批量查询是只读命令: 索引文件过期时只在内存中补齐
+            (data_dir / INDEX_FILE).unlink()
+            append_draws(data_dir, [{**latest, "issue": "26161", "front_zone": [1, 2, 3, 4, 5]}], "dlt")
+            assert predictor.check_drawn([([1, 2, 3, 4, 5], [])])[0]["front_drawn"], "新数据未进入索引"
+            predictor.generate_combinations(fixed, None, count=5, exclude_drawn=True)
+            assert not (data_dir / INDEX_FILE).exists(), "只读命令修改了数据目录"
+        
+        print_success("组合索引按数据集版本构建一次，追加时只重建当年分片，只读命令不写数据目录，生成时可排除历史组合")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"组合索引测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_benchmark_smoke():
+    print_info("\n测试27: 测试性能基准冒烟运行...")
+    
+    try:
+        import subprocess
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "bench.json"
+            subprocess.run(
+                [sys.executable, str(PROJECT_ROOT / "benchmarks" / "run_benchmarks.py"), "--type", "dlt",
+                 "--sizes", "200", "--repeat", "1", "--only", "load_data,report_generate",
+                 "--data-cache", tmp, "--baseline", str(Path(tmp) / "none.json"), "--output", str(output)],
+                check=True, capture_output=True, timeout=120
+            )
+            result = json.loads(output.read_text(encoding="utf-8"))
+        
+        cases = result["results"]["200"]
+        assert set(cases) == {"load_data", "report_generate"}, f"--only 未生效: {sorted(cases)}"
+        assert all(stats["runs"] == 1 and stats["median_ms"] > 0 for stats in cases.values()), "计时结果不完整"
+        
+        print_success("基准测试可在极小规模下只跑指定项并输出 JSON")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"性能基准冒烟测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
+def test_concurrent_fetch():
+    print_info("\n测试28: 测试多彩种并发处理...")
+    
+    try:
+        sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+        import io
+        from argparse import Namespace
+        from contextlib import redirect_stdout
+        from draw_store import load_draws
+        from fetch_lottery_data import LotteryDataManager, process_all
+        
+        stub_history = {
+            "ssq": [{"lottery_type": "ssq", "issue": f"2025{i:03d}", "draw_date": f"2025-01-{i:02d}",
+                     "red_balls": [1, 2, 3, 4, 5, i + 5], "blue_ball": i, "prize_info": {}} for i in range(1, 4)],
+            "dlt": [{"lottery_type": "dlt", "issue": f"25{i:03d}", "draw_date": f"2025-02-{i:02d}",
+                     "front_zone": [1, 2, 3, 4, i + 4], "back_zone": [1, i + 1], "prize_info": {}} for i in range(1, 6)],
+        }
+        args = Namespace(history=True, limit=10, update=False, import_file=None, export_file=None,
+                         stats=False, latest=False, issue=None)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            managers = []
+            for lottery_type in ("ssq", "dlt"):
+                manager = LotteryDataManager(lottery_type, Path(tmp) / lottery_type)
+                # 替换数据源: 每个彩种返回各自的固定记录
+                manager._generate_mock_history_data = lambda limit, t=lottery_type: stub_history[t]
+                managers.append(manager)
+            
+            output = io.StringIO()
+            with redirect_stdout(output):
+                results = process_all(managers, args, max_workers=2)
+            
+            assert results == {"ssq": (3, 3), "dlt": (5, 5)}, f"并发结果错误: {results}"
+            for lottery_type in ("ssq", "dlt"):
+                stored = load_draws(Path(tmp) / lottery_type)
+                assert {r["lottery_type"] for r in stored} == {lottery_type}, f"{lottery_type} 数据串入了其他彩种"
+            lines = output.getvalue().splitlines()
+            assert lines and all(line.startswith(("[双色球] ", "[大乐透] ")) for line in lines), "进度行应带彩种前缀"
+            assert "[双色球]    新增: 3 条" in lines and "[大乐透]    新增: 5 条" in lines, "进度输出缺失"
+            
+            # 统计信息: 空存储不报错，内存中修改过的数据以内存为准
+            assert LotteryDataManager("ssq", Path(tmp) / "empty").get_stats()["count"] == 0, "空存储统计错误"
+            manager = LotteryDataManager("ssq", Path(tmp) / "ssq")
+            manager.data = manager.data[:2]
+            stats = manager.get_stats()
+            assert (stats["count"], stats["oldest_issue"]) == (2, "2025002"), f"未使用内存中的数据: {stats}"
+        
+        print_success("多彩种并发处理结果互不干扰，进度按彩种前缀实时输出，统计信息与内存数据一致")
+        counter.add_pass()
+        return True
+    
+    except Exception as e:
+        print_error(f"多彩种并发处理测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        counter.add_fail()
+        return False
+
 # ============ 主函数 ============
 def main():
     print(f"{'='*60}")
@@ -325,6 +1509,28 @@ def main():
     
     test_skills()
     test_config()
+    test_incremental_import()
+    test_streaming_download()
+    test_update_scheduler()
+    test_draw_store()
+    test_synthetic_history()
+    test_stage_profiler()
+    test_metrics_export()
+    test_analysis_cache()
+    test_trend_chart()
+    test_rolling_series()
+    test_randomness_suite()
+    test_monte_carlo_baseline()
+    test_exact_distributions()
+    test_bootstrap_intervals()
+    test_repeat_neighbor()
+    test_ac_and_tails()
+    test_transition_matrix()
+    test_date_grouping()
+    test_similar_draws()
+    test_drawn_index()
+    test_benchmark_smoke()
+    test_concurrent_fetch()
     
     # 打印总结
     counter.summary()